@@ -1,14 +1,24 @@
-from fastapi import APIRouter, Depends
+import base64
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, List, Optional
 from datetime import datetime
 from pydantic import BaseModel
 
 from app.core.database import SessionLocal
-from app.models.audit import AuditEvent
+from app.models.audit import ActorType, AuditEvent
+from app.models.project import Project
+from app.services.audit_sink import audit_sink
+from app.services.audit_store import archive_audit_payloads, get_audit_payload, get_audit_payloads
 
 router = APIRouter(prefix="/audit", tags=["Audit"])
 
+# Events fetched from the DB per round-trip while streaming a project's audit trail.
+AUDIT_STREAM_CHUNK_SIZE = 500
+
 def get_db():
     db = SessionLocal()
     try:
@@ -28,30 +38,203 @@ class AuditEventOut(BaseModel):
     class Config:
         orm_mode = True
 
+@router.get("/sink/stats")
+def get_audit_sink_stats():
+    return audit_sink.stats()
+
 @router.get("/record/{record_id}", response_model=List[AuditEventOut])
 def get_audit_for_record(record_id: str, db: Session = Depends(get_db)):
+    # Read-your-writes: rows still queued in the background writer are committed first.
+    audit_sink.flush()
+    # Slim columns only; payloads are fetched per event from /audit/event/{id}/payload.
     events = (
-        db.query(AuditEvent)
+        db.query(
+            AuditEvent.id,
+            AuditEvent.created_at,
+            AuditEvent.actor_type,
+            AuditEvent.action,
+            AuditEvent.model_name,
+            AuditEvent.prompt_version,
+            AuditEvent.summary,
+        )
         .filter(AuditEvent.record_id == record_id)
         .order_by(AuditEvent.created_at.asc())
         .all()
     )
-    result: list[AuditEventOut] = []
-    for ev in events:
-        summary = ev.action
-        if ev.response_payload and isinstance(ev.response_payload, dict):
-            reasons = ev.response_payload.get("reasons")
-            if isinstance(reasons, list) and reasons:
-                summary += " – " + "; ".join(reasons[:2])
-        result.append(
-            AuditEventOut(
-                id=ev.id,
-                time=ev.created_at,
-                actor_type=ev.actor_type.value if hasattr(ev.actor_type, "value") else ev.actor_type,
-                action=ev.action,
-                model_name=ev.model_name,
-                prompt_version=ev.prompt_version,
-                summary=summary,
-            )
+    return [
+        AuditEventOut(
+            id=ev.id,
+            time=ev.created_at,
+            actor_type=ev.actor_type.value if hasattr(ev.actor_type, "value") else ev.actor_type,
+            action=ev.action,
+            model_name=ev.model_name,
+            prompt_version=ev.prompt_version,
+            summary=ev.summary or ev.action,
         )
-    return result
+        for ev in events
+    ]
+
+class AuditPayloadOut(BaseModel):
+    id: str
+    archived: bool
+    request_payload: Any = None
+    response_payload: Any = None
+
+@router.get("/event/{event_id}/payload", response_model=AuditPayloadOut)
+def get_audit_event_payload(event_id: str, db: Session = Depends(get_db)):
+    audit_sink.flush()
+    payload = get_audit_payload(db, event_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Audit event not found")
+    return payload
+
+@router.post("/archive")
+def archive_audit(older_than_days: int | None = None, project_id: str | None = None, db: Session = Depends(get_db)):
+    """
+    Compact payloads of old events into per-project segments now, instead of
+    waiting for the background archiver.
+    """
+    audit_sink.flush()
+    return archive_audit_payloads(db, older_than_days=older_than_days, project_id=project_id)
+
+class ProjectAuditEventOut(AuditEventOut):
+    record_id: Optional[str] = None
+    decision_id: Optional[str] = None
+    actor_id: Optional[str] = None
+    request_payload: Any = None
+    response_payload: Any = None
+
+class ProjectAuditPage(BaseModel):
+    items: List[ProjectAuditEventOut]
+    next_cursor: Optional[str] = None
+    limit: int
+
+def _encode_cursor(created_at: datetime, event_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), event_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), str(event_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _project_events_page(
+    db: Session,
+    project_id: str,
+    after: tuple[datetime, str] | None,
+    limit: int,
+    actor_type: ActorType | None,
+    action: str | None,
+    model_name: str | None,
+):
+    # Keyset on (created_at, id), served by ix_audit_events_project_created.
+    q = db.query(
+        AuditEvent.id,
+        AuditEvent.created_at,
+        AuditEvent.record_id,
+        AuditEvent.decision_id,
+        AuditEvent.actor_type,
+        AuditEvent.actor_id,
+        AuditEvent.action,
+        AuditEvent.model_name,
+        AuditEvent.prompt_version,
+        AuditEvent.summary,
+        AuditEvent.archive_segment_id,
+    ).filter(AuditEvent.project_id == project_id)
+    if actor_type is not None:
+        q = q.filter(AuditEvent.actor_type == actor_type)
+    if action is not None:
+        q = q.filter(AuditEvent.action == action)
+    if model_name is not None:
+        q = q.filter(AuditEvent.model_name == model_name)
+    if after is not None:
+        after_time, after_id = after
+        q = q.filter(
+            or_(AuditEvent.created_at > after_time, and_(AuditEvent.created_at == after_time, AuditEvent.id > after_id))
+        )
+    return q.order_by(AuditEvent.created_at, AuditEvent.id).limit(limit).all()
+
+def _project_event_out(ev, payloads: dict | None) -> ProjectAuditEventOut:
+    payload = payloads.get(ev.id, {}) if payloads is not None else {}
+    return ProjectAuditEventOut(
+        id=ev.id,
+        time=ev.created_at,
+        actor_type=ev.actor_type.value if hasattr(ev.actor_type, "value") else ev.actor_type,
+        action=ev.action,
+        model_name=ev.model_name,
+        prompt_version=ev.prompt_version,
+        summary=ev.summary or ev.action,
+        record_id=ev.record_id,
+        decision_id=ev.decision_id,
+        actor_id=ev.actor_id,
+        request_payload=payload.get("request"),
+        response_payload=payload.get("response"),
+    )
+
+def _stream_project_events(
+    project_id: str,
+    after: tuple[datetime, str] | None,
+    actor_type: ActorType | None,
+    action: str | None,
+    model_name: str | None,
+    include_payloads: bool,
+):
+    db = SessionLocal()
+    try:
+        while True:
+            events = _project_events_page(db, project_id, after, AUDIT_STREAM_CHUNK_SIZE, actor_type, action, model_name)
+            if not events:
+                break
+            payloads = get_audit_payloads(db, events) if include_payloads else None
+            buf: list[str] = []
+            for ev in events:
+                row = _project_event_out(ev, payloads).dict()
+                row["time"] = row["time"].isoformat() if row["time"] else None
+                # Lets a client resume an interrupted stream from this event.
+                row["cursor"] = _encode_cursor(ev.created_at, ev.id)
+                buf.append(json.dumps(row, ensure_ascii=False, default=str))
+                buf.append("\n")
+            yield "".join(buf)
+            if len(events) < AUDIT_STREAM_CHUNK_SIZE:
+                break
+            after = (events[-1].created_at, events[-1].id)
+    finally:
+        db.close()
+
+@router.get("/project/{project_id}", response_model=ProjectAuditPage)
+def get_audit_for_project(
+    project_id: str,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(500, ge=1, le=5000),
+    actor_type: Optional[ActorType] = Query(None),
+    action: Optional[str] = Query(None),
+    model_name: Optional[str] = Query(None),
+    include_payloads: bool = Query(False),
+    format: str = Query("json", description="json (one page) | ndjson (everything after the cursor, streamed)"),
+    db: Session = Depends(get_db),
+):
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be one of: json, ndjson")
+    if not db.get(Project, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    after = _decode_cursor(cursor) if cursor else None
+    audit_sink.flush()
+
+    if format == "ndjson":
+        return StreamingResponse(
+            _stream_project_events(project_id, after, actor_type, action, model_name, include_payloads),
+            media_type="application/x-ndjson",
+            headers={
+                "Content-Disposition": f'attachment; filename="towardevidence_{project_id}_audit.jsonl"'
+            },
+        )
+
+    events = _project_events_page(db, project_id, after, limit + 1, actor_type, action, model_name)
+    has_more = len(events) > limit
+    events = events[:limit]
+    payloads = get_audit_payloads(db, events) if include_payloads else None
+    items = [_project_event_out(ev, payloads) for ev in events]
+    next_cursor = _encode_cursor(events[-1].created_at, events[-1].id) if has_more else None
+    return ProjectAuditPage(items=items, next_cursor=next_cursor, limit=limit)
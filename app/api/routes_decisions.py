@@ -1,3 +1,5 @@
+import uuid
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from datetime import datetime
@@ -7,8 +9,10 @@ from pydantic import BaseModel
 from app.core.database import SessionLocal
 from app.models.decision import Decision, DecisionStage, DecisionOutcome
 from app.models.record import Record
-from app.models.audit import AuditEvent, ActorType
+from app.models.audit import ActorType
 from app.models.file import File
+from app.services.current_decisions import set_current_decision
+from app.services.audit_sink import audit_sink, build_audit_row
 
 router = APIRouter(prefix="/decisions", tags=["Decisions"])
 
@@ -25,6 +29,8 @@ class DecisionOverrideRequest(BaseModel):
     decision: DecisionOutcome
     reasons: List[str]
     created_by: str
+    # Wait until the audit row is committed instead of leaving it to the background writer.
+    durable_audit: bool = False
 
 class DecisionOverrideResponse(BaseModel):
     decision_id: str
@@ -40,9 +46,15 @@ def override_decision(payload: DecisionOverrideRequest, db: Session = Depends(ge
         raise HTTPException(status_code=404, detail="Record not found")
 
     stage_enum = DecisionStage(payload.stage)
+    record_id = rec.id
+    file_row = db.get(File, rec.file_id)
+    project_id = file_row.project_id if file_row else None
 
+    # Client-side id: nothing has to be read back after the commit.
+    decision_id = str(uuid.uuid4())
     dec = Decision(
-        record_id=rec.id,
+        id=decision_id,
+        record_id=record_id,
         stage=stage_enum,
         decision=payload.decision,
         reasons=payload.reasons,
@@ -53,35 +65,33 @@ def override_decision(payload: DecisionOverrideRequest, db: Session = Depends(ge
         prompt_version="manual",
     )
     db.add(dec)
+    set_current_decision(db, dec)
     db.commit()
-    db.refresh(dec)
-
-    file_row = db.get(File, rec.file_id)
-    project_id = file_row.project_id if file_row else None
 
-    audit = AuditEvent(
-        decision_id=dec.id,
-        record_id=rec.id,
-        project_id=project_id,
-        actor_type=ActorType.HUMAN,
-        actor_id=payload.created_by,
-        action="HUMAN_OVERRIDE",
-        model_name="human_reviewer",
-        prompt_version="manual",
-        request_payload={
-            "stage": payload.stage,
-            "new_decision": payload.decision.value,
-            "reasons": payload.reasons,
-        },
-        response_payload={"decision_id": dec.id},
+    audit_sink.emit(
+        build_audit_row(
+            decision_id=decision_id,
+            record_id=record_id,
+            project_id=project_id,
+            actor_type=ActorType.HUMAN,
+            actor_id=payload.created_by,
+            action="HUMAN_OVERRIDE",
+            model_name="human_reviewer",
+            prompt_version="manual",
+            request_payload={
+                "stage": payload.stage,
+                "new_decision": payload.decision.value,
+                "reasons": payload.reasons,
+            },
+            response_payload={"decision_id": decision_id},
+        ),
+        durable=payload.durable_audit,
     )
-    db.add(audit)
-    db.commit()
 
     return DecisionOverrideResponse(
-        decision_id=dec.id,
-        record_id=rec.id,
+        decision_id=decision_id,
+        record_id=record_id,
         stage=stage_enum.value,
-        decision=dec.decision.value,
-        reasons=dec.reasons or [],
+        decision=payload.decision.value,
+        reasons=payload.reasons,
     )
@@ -1,15 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Response
+import csv
+import io
+import json
+import os
+import tempfile
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
 
 from app.core.database import SessionLocal
 from app.models.project import Project
 from app.models.file import File
 from app.models.record import Record
 from app.models.decision import Decision, DecisionStage
+from app.models.current_decision import CurrentDecision
+from app.services.current_decisions import current_decision_join
 
 router = APIRouter(prefix="/export", tags=["Export"])
 
+# Rows fetched from the DB per round-trip while streaming an export.
+EXPORT_CHUNK_SIZE = 500
+# Rows per Parquet row group (also the most rows held in memory at once).
+PARQUET_ROW_GROUP_SIZE = 10000
+
+TABULAR_COLUMNS = [
+    "record_id",
+    "order_index",
+    "title",
+    "authors",
+    "journal",
+    "year",
+    "language",
+    "doi",
+    "abstract",
+    "stage",
+    "decision",
+    "reasons",
+    "verbatim_quote",
+    "quote_location",
+    "qc_flag",
+    "decided_by",
+    "decided_at",
+    "model_name",
+    "prompt_version",
+]
+
 def get_db():
     db = SessionLocal()
     try:
@@ -64,12 +98,158 @@ def _build_ris_for_record(record: Record, decision: Decision | None, stage: Deci
 
     return "\n".join(lines)
 
-@router.get("/ris")
-def export_ris_with_decisions(
-    project_id: str = Query(...),
-    stage: str = Query("title_abstract"),
-    db: Session = Depends(get_db),
-):
+def _iter_records_with_decisions(project_id: str, stage: DecisionStage, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Yield (Record, Decision | None) for the project in export order, reading
+    `chunk_size` rows at a time. Uses its own session because it is consumed
+    while the response is being streamed.
+    """
+    db = SessionLocal()
+    try:
+        q = (
+            db.query(Record, Decision)
+            .join(File, Record.file_id == File.id)
+            .outerjoin(CurrentDecision, current_decision_join(stage))
+            .outerjoin(Decision, Decision.id == CurrentDecision.decision_id)
+            .filter(File.project_id == project_id)
+            # File by file in upload order, as GET /records and screening; walks
+            # ix_files_project_created, then ix_records_file_order per file.
+            .order_by(File.created_at, File.id, Record.order_index, Record.id)
+            .yield_per(chunk_size)
+        )
+        for rec, dec in q:
+            yield rec, dec
+            # Each chunk's objects can be dropped once they have been written out.
+            db.expunge(rec)
+            if dec is not None:
+                db.expunge(dec)
+    finally:
+        db.close()
+
+def _stream_ris(project_id: str, stage: DecisionStage):
+    buf: list[str] = []
+    first = True
+    for rec, dec in _iter_records_with_decisions(project_id, stage):
+        if not first:
+            buf.append("\n\n")
+        first = False
+        buf.append(_build_ris_for_record(rec, dec, stage))
+        if len(buf) >= 2 * EXPORT_CHUNK_SIZE:
+            yield "".join(buf)
+            buf = []
+    buf.append("\n")
+    yield "".join(buf)
+
+def _tabular_row(rec: Record, dec: Decision | None, stage: DecisionStage) -> dict:
+    return {
+        "record_id": rec.id,
+        "order_index": rec.order_index,
+        "title": rec.title,
+        "authors": rec.authors,
+        "journal": rec.journal,
+        "year": rec.year,
+        "language": rec.language,
+        "doi": rec.doi,
+        "abstract": rec.abstract,
+        "stage": stage.value,
+        "decision": dec.decision.value if dec and dec.decision else None,
+        "reasons": list(dec.reasons or []) if dec else [],
+        "verbatim_quote": dec.verbatim_quote if dec else None,
+        "quote_location": dec.quote_location if dec else None,
+        "qc_flag": bool(dec.qc_flag) if dec else None,
+        "decided_by": dec.created_by if dec else None,
+        "decided_at": dec.created_at if dec else None,
+        "model_name": dec.model_name if dec else None,
+        "prompt_version": dec.prompt_version if dec else None,
+    }
+
+def _stream_csv(project_id: str, stage: DecisionStage):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(TABULAR_COLUMNS)
+    n = 0
+    for rec, dec in _iter_records_with_decisions(project_id, stage):
+        row = _tabular_row(rec, dec, stage)
+        row["reasons"] = "; ".join(row["reasons"])
+        row["decided_at"] = row["decided_at"].isoformat() if row["decided_at"] else None
+        writer.writerow([row[c] for c in TABULAR_COLUMNS])
+        n += 1
+        if n % EXPORT_CHUNK_SIZE == 0:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate(0)
+    yield out.getvalue()
+
+def _stream_jsonl(project_id: str, stage: DecisionStage):
+    buf: list[str] = []
+    for rec, dec in _iter_records_with_decisions(project_id, stage):
+        row = _tabular_row(rec, dec, stage)
+        row["decided_at"] = row["decided_at"].isoformat() if row["decided_at"] else None
+        buf.append(json.dumps(row, ensure_ascii=False))
+        buf.append("\n")
+        if len(buf) >= 2 * EXPORT_CHUNK_SIZE:
+            yield "".join(buf)
+            buf = []
+    yield "".join(buf)
+
+def _parquet_schema(pa):
+    return pa.schema(
+        [
+            ("record_id", pa.string()),
+            ("order_index", pa.int64()),
+            ("title", pa.string()),
+            ("authors", pa.string()),
+            ("journal", pa.string()),
+            ("year", pa.int64()),
+            ("language", pa.string()),
+            ("doi", pa.string()),
+            ("abstract", pa.string()),
+            ("stage", pa.string()),
+            ("decision", pa.string()),
+            ("reasons", pa.list_(pa.string())),
+            ("verbatim_quote", pa.string()),
+            ("quote_location", pa.string()),
+            ("qc_flag", pa.bool_()),
+            ("decided_by", pa.string()),
+            ("decided_at", pa.timestamp("us")),
+            ("model_name", pa.string()),
+            ("prompt_version", pa.string()),
+        ]
+    )
+
+def _stream_parquet(project_id: str, stage: DecisionStage, pa, pq):
+    """
+    Write row groups to a temporary file as rows arrive (the Parquet footer
+    needs the whole file), then stream the file back and delete it.
+    """
+    schema = _parquet_schema(pa)
+    fd, path = tempfile.mkstemp(suffix=".parquet")
+    os.close(fd)
+    try:
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            columns: dict[str, list] = {c: [] for c in TABULAR_COLUMNS}
+            n = 0
+            for rec, dec in _iter_records_with_decisions(project_id, stage):
+                row = _tabular_row(rec, dec, stage)
+                for c in TABULAR_COLUMNS:
+                    columns[c].append(row[c])
+                n += 1
+                if n % PARQUET_ROW_GROUP_SIZE == 0:
+                    writer.write_table(pa.table(columns, schema=schema))
+                    columns = {c: [] for c in TABULAR_COLUMNS}
+            if columns["record_id"] or n == 0:
+                writer.write_table(pa.table(columns, schema=schema))
+
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(1024 * 1024)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+def _check_export_request(db: Session, project_id: str, stage: str) -> DecisionStage:
     project = db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -79,39 +259,91 @@ def export_ris_with_decisions(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid stage")
 
-    records: List[Record] = (
-        db.query(Record)
+    if not _project_has_records(db, project_id):
+        raise HTTPException(status_code=400, detail="No records found for this project")
+    return stage_enum
+
+def _project_has_records(db: Session, project_id: str) -> bool:
+    return (
+        db.query(Record.id)
         .join(File, Record.file_id == File.id)
         .filter(File.project_id == project_id)
-        .order_by(Record.order_index)
-        .all()
+        .first()
+        is not None
     )
 
-    if not records:
-        raise HTTPException(status_code=400, detail="No records found for this project")
+@router.get("/ris")
+def export_ris_with_decisions(
+    project_id: str = Query(...),
+    stage: str = Query("title_abstract"),
+    db: Session = Depends(get_db),
+):
+    stage_enum = _check_export_request(db, project_id, stage)
+    filename = f"towardevidence_{project_id}_{stage}.ris"
 
-    ris_records: list[str] = []
-
-    for rec in records:
-        dec = (
-            db.query(Decision)
-            .filter(
-                Decision.record_id == rec.id,
-                Decision.stage == stage_enum,
-            )
-            .order_by(Decision.created_at.desc())
-            .first()
-        )
+    return StreamingResponse(
+        _stream_ris(project_id, stage_enum),
+        media_type="application/x-research-info-systems",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"'
+        },
+    )
 
-        ris_rec_text = _build_ris_for_record(rec, dec, stage_enum)
-        ris_records.append(ris_rec_text)
+@router.get("/csv")
+def export_csv_with_decisions(
+    project_id: str = Query(...),
+    stage: str = Query("title_abstract"),
+    db: Session = Depends(get_db),
+):
+    stage_enum = _check_export_request(db, project_id, stage)
+    filename = f"towardevidence_{project_id}_{stage}.csv"
 
-    content = "\n\n".join(ris_records) + "\n"
-    filename = f"towardevidence_{project_id}_{stage}.ris"
+    return StreamingResponse(
+        _stream_csv(project_id, stage_enum),
+        media_type="text/csv",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"'
+        },
+    )
 
-    return Response(
-        content=content,
-        media_type="application/x-research-info-systems",
+@router.get("/jsonl")
+def export_jsonl_with_decisions(
+    project_id: str = Query(...),
+    stage: str = Query("title_abstract"),
+    db: Session = Depends(get_db),
+):
+    stage_enum = _check_export_request(db, project_id, stage)
+    filename = f"towardevidence_{project_id}_{stage}.jsonl"
+
+    return StreamingResponse(
+        _stream_jsonl(project_id, stage_enum),
+        media_type="application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"'
+        },
+    )
+
+@router.get("/parquet")
+def export_parquet_with_decisions(
+    project_id: str = Query(...),
+    stage: str = Query("title_abstract"),
+    db: Session = Depends(get_db),
+):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise HTTPException(
+            status_code=501,
+            detail="Parquet export requires the 'pyarrow' package on the server.",
+        )
+
+    stage_enum = _check_export_request(db, project_id, stage)
+    filename = f"towardevidence_{project_id}_{stage}.parquet"
+
+    return StreamingResponse(
+        _stream_parquet(project_id, stage_enum, pa, pq),
+        media_type="application/vnd.apache.parquet",
         headers={
             "Content-Disposition": f'attachment; filename="{filename}"'
         },
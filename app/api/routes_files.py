@@ -1,14 +1,18 @@
-import os
-import uuid
 from fastapi import APIRouter, Depends, UploadFile, File as FastAPIFile, HTTPException
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.core.database import SessionLocal
 from app.core.config import settings
 from app.models.project import Project, ProtocolStatus
 from app.models.file import File, FileType
+from app.models.record import Record
+from app.models.record_fulltext import RecordFullText
+from app.services.file_storage import store_upload
 from app.services.ris_importer import import_ris_for_file
+from app.services.dedup import deduplicate_project
 from app.services.protocol_extractor import extract_protocol_config
+from app.services.llm_scheduler import LLMUnavailableError
 
 router = APIRouter(prefix="/files", tags=["Files"])
 
@@ -21,6 +25,18 @@ def get_db():
     finally:
         db.close()
 
+def _find_same_content(db: Session, project_id: str, file_type: FileType, sha256: str) -> File | None:
+    return (
+        db.query(File)
+        .filter(
+            File.project_id == project_id,
+            File.type == file_type,
+            File.sha256 == sha256,
+        )
+        .order_by(File.created_at)
+        .first()
+    )
+
 @router.post("/ris/upload")
 async def upload_ris_file(
     project_id: str,
@@ -31,31 +47,47 @@ async def upload_ris_file(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    ext = os.path.splitext(upload.filename or "")[1] or ".ris"
-    safe_name = f"ris_{project_id}_{uuid.uuid4()}{ext}"
-    file_path = os.path.join(UPLOAD_DIR, safe_name)
+    file_path, sha256, size = await store_upload(upload, UPLOAD_DIR, ".ris")
 
-    contents = await upload.read()
-    with open(file_path, "wb") as f:
-        f.write(contents)
+    existing = _find_same_content(db, project.id, FileType.ris, sha256)
+    if existing:
+        imported = db.query(Record).filter(Record.file_id == existing.id).count()
+        return {
+            "file_id": existing.id,
+            "original_name": existing.name,
+            "imported_records": imported,
+            "reused": True,
+            "message": "Identical RIS file was already uploaded; existing records reused.",
+        }
 
     file_row = File(
         project_id=project.id,
-        name=upload.filename or safe_name,
+        name=upload.filename or f"{sha256}.ris",
         type=FileType.ris,
         path=file_path,
+        sha256=sha256,
+        size_bytes=size,
     )
+    # Not committed on its own: the row and its records commit together in the
+    # import, so a failed import leaves no empty file for _find_same_content to reuse.
     db.add(file_row)
-    db.commit()
-    db.refresh(file_row)
+    db.flush()
 
-    imported = import_ris_for_file(db, file_row)
+    try:
+        import_stats = await run_in_threadpool(import_ris_for_file, db, file_row)
+    except Exception:
+        db.rollback()
+        raise
+    dedup_stats = await run_in_threadpool(deduplicate_project, db, project.id)
 
     return {
         "file_id": file_row.id,
         "original_name": file_row.name,
-        "imported_records": imported,
+        "imported_records": import_stats["imported"],
+        "import_seconds": import_stats["seconds"],
+        "import_records_per_second": import_stats["records_per_second"],
+        "project_duplicates": dedup_stats["duplicates"],
+        "reused": False,
         "message": "RIS file uploaded and records imported.",
     }
 
@@ -69,35 +101,86 @@ async def upload_protocol_file(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    ext = os.path.splitext(upload.filename or "")[1] or ".pdf"
-    safe_name = f"protocol_{project_id}_{uuid.uuid4()}{ext}"
-    file_path = os.path.join(UPLOAD_DIR, safe_name)
-
-    contents = await upload.read()
-    with open(file_path, "wb") as f:
-        f.write(contents)
-
-    file_row = File(
-        project_id=project.id,
-        name=upload.filename or safe_name,
-        type=FileType.protocol,
-        path=file_path,
-    )
-    db.add(file_row)
-    db.commit()
-    db.refresh(file_row)
-
-    config = extract_protocol_config(file_path)
-    project.protocol_config = config
-    project.protocol_status = ProtocolStatus.extracted if config else ProtocolStatus.not_uploaded
-    db.commit()
-    db.refresh(project)
+    file_path, sha256, size = await store_upload(upload, UPLOAD_DIR, ".pdf")
+
+    file_row = _find_same_content(db, project.id, FileType.protocol, sha256)
+    reused = file_row is not None
+    if file_row is None:
+        file_row = File(
+            project_id=project.id,
+            name=upload.filename or f"{sha256}.pdf",
+            type=FileType.protocol,
+            path=file_path,
+            sha256=sha256,
+            size_bytes=size,
+        )
+        db.add(file_row)
+        db.commit()
+        db.refresh(file_row)
+
+    # Same protocol bytes as the ones the current configuration came from: keep
+    # it (it may have been edited). Any other protocol is extracted again.
+    if project.protocol_config and project.protocol_sha256 == sha256:
+        config = project.protocol_config
+    else:
+        try:
+            config = await run_in_threadpool(extract_protocol_config, file_row.path, file_row.sha256)
+        except LLMUnavailableError as e:
+            headers = {"Retry-After": str(int(e.retry_after) + 1)} if e.retry_after else None
+            raise HTTPException(
+                status_code=503,
+                detail=f"Protocol extraction is temporarily unavailable: {e}",
+                headers=headers,
+            )
+        project.protocol_config = config
+        project.protocol_sha256 = sha256
+        project.protocol_status = ProtocolStatus.extracted if config else ProtocolStatus.not_uploaded
+        db.commit()
+        db.refresh(project)
 
     return {
         "file_id": file_row.id,
         "project_id": project.id,
         "protocol_status": project.protocol_status,
         "protocol_config": config,
+        "reused": reused,
         "message": "Protocol uploaded and configuration extracted.",
     }
+
+@router.post("/fulltext/upload")
+async def upload_fulltext_file(
+    record_id: str,
+    db: Session = Depends(get_db),
+    upload: UploadFile = FastAPIFile(...),
+):
+    record = db.get(Record, record_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Record not found")
+    project_id = db.query(File.project_id).filter(File.id == record.file_id).scalar()
+
+    file_path, sha256, size = await store_upload(upload, UPLOAD_DIR, ".pdf")
+
+    file_row = _find_same_content(db, project_id, FileType.fulltext_pdf, sha256)
+    reused = file_row is not None
+    if file_row is None:
+        file_row = File(
+            project_id=project_id,
+            name=upload.filename or f"{sha256}.pdf",
+            type=FileType.fulltext_pdf,
+            path=file_path,
+            sha256=sha256,
+            size_bytes=size,
+        )
+        db.add(file_row)
+        db.flush()
+    # Replaces any PDF attached to the record before; its full-text decision is left as it was.
+    db.merge(RecordFullText(record_id=record.id, file_id=file_row.id))
+    db.commit()
+
+    return {
+        "file_id": file_row.id,
+        "record_id": record.id,
+        "original_name": file_row.name,
+        "reused": reused,
+        "message": "Full-text PDF attached to the record.",
+    }
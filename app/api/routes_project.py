@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.core.database import SessionLocal
 from app.models.project import Project, ProtocolStatus
@@ -19,6 +19,12 @@ def get_db():
 class ProjectCreate(BaseModel):
     name: str
     description: Optional[str] = None
+    screening_batch_size: Optional[int] = Field(None, ge=1, le=50)
+
+class ProjectUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    screening_batch_size: Optional[int] = Field(None, ge=1, le=50)
 
 class ProjectRead(BaseModel):
     id: str
@@ -26,13 +32,18 @@ class ProjectRead(BaseModel):
     description: Optional[str] = None
     created_at: datetime
     protocol_status: Optional[ProtocolStatus] = None
+    screening_batch_size: Optional[int] = None
 
     class Config:
         orm_mode = True
 
 @router.post("/", response_model=ProjectRead)
 def create_project(payload: ProjectCreate, db: Session = Depends(get_db)):
-    p = Project(name=payload.name, description=payload.description)
+    p = Project(
+        name=payload.name,
+        description=payload.description,
+        screening_batch_size=payload.screening_batch_size,
+    )
     db.add(p)
     db.commit()
     db.refresh(p)
@@ -49,3 +60,18 @@ def get_project(project_id: str, db: Session = Depends(get_db)):
     if not p:
         raise HTTPException(status_code=404, detail="Project not found")
     return p
+
+@router.patch("/{project_id}", response_model=ProjectRead)
+def update_project(project_id: str, payload: ProjectUpdate, db: Session = Depends(get_db)):
+    p = db.get(Project, project_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if payload.name is not None:
+        p.name = payload.name
+    if payload.description is not None:
+        p.description = payload.description
+    if payload.screening_batch_size is not None:
+        p.screening_batch_size = payload.screening_batch_size
+    db.commit()
+    db.refresh(p)
+    return p
@@ -1,13 +1,21 @@
+import base64
+import json
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel
 
 from app.core.database import SessionLocal
+from app.models.project import Project
 from app.models.record import Record
 from app.models.file import File
-from app.models.decision import Decision, DecisionStage
+from app.models.decision import Decision, DecisionStage, DecisionOutcome
+from app.models.current_decision import CurrentDecision
+from app.services.current_decisions import current_decision_join
+from app.services.dedup import deduplicate_project
+from app.services.search_index import search_records
 
 router = APIRouter(prefix="/records", tags=["Records"])
 
@@ -27,10 +35,31 @@ class RecordWithDecision(BaseModel):
     verbatim_quote: Optional[str] = None
     quote_location: Optional[str] = None
     qc_flag: bool = False
+    decided_by: Optional[str] = None
+    duplicate_of: Optional[str] = None
 
     class Config:
         orm_mode = True
 
+class RecordPage(BaseModel):
+    items: List[RecordWithDecision]
+    next_cursor: Optional[str] = None
+    limit: int
+
+class SearchHit(BaseModel):
+    id: str
+    title: Optional[str]
+    year: Optional[int]
+    rank: float
+    title_snippet: Optional[str] = None
+    abstract_snippet: Optional[str] = None
+
+class SearchPage(BaseModel):
+    items: List[SearchHit]
+    limit: int
+    offset: int
+    next_offset: Optional[int] = None
+
 class DecisionInfo(BaseModel):
     stage: str
     decision: Optional[str]
@@ -52,67 +81,145 @@ class RecordDetail(BaseModel):
     language: Optional[str]
     sample_size: Optional[int]
     abstract: Optional[str]
+    duplicate_of: Optional[str] = None
+    duplicate_reason: Optional[str] = None
     decision_ta: Optional[DecisionInfo] = None
 
     class Config:
         orm_mode = True
 
-@router.get("/", response_model=List[RecordWithDecision])
+DECIDED_BY_CREATORS = {"ai": "AI", "rules": "SYSTEM_RULES"}
+
+def _decided_by(created_by: Optional[str]) -> Optional[str]:
+    if created_by is None:
+        return None
+    for label, creator in DECIDED_BY_CREATORS.items():
+        if created_by == creator:
+            return label
+    return "human"
+
+def _encode_cursor(file_created_at: datetime, file_id: str, order_index: int, record_id: str) -> str:
+    raw = json.dumps([file_created_at.isoformat(), file_id, order_index, record_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str, int, str]:
+    try:
+        created_at, file_id, order_index, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), str(file_id), int(order_index), str(record_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/", response_model=RecordPage)
 def list_records(
     project_id: str = Query(...),
     stage: str = Query("title_abstract"),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    decision: Optional[DecisionOutcome] = Query(None),
+    qc_flag: Optional[bool] = Query(None),
+    year_min: Optional[int] = Query(None),
+    year_max: Optional[int] = Query(None),
+    undecided_only: bool = Query(False),
+    decided_by: Optional[str] = Query(None, description="ai | rules | human"),
     db: Session = Depends(get_db),
 ):
-    rows = db.execute(
-        """
-        SELECT r.id, r.title, r.year
-        FROM records r
-        JOIN files f ON r.file_id = f.id
-        WHERE f.project_id = :pid
-        ORDER BY r.order_index
-        """,
-        {"pid": project_id},
-    ).fetchall()
-
-    results: list[RecordWithDecision] = []
-    for row in rows:
-        rec_id = row.id
-        dec = (
-            db.query(Decision)
-            .filter(
-                Decision.record_id == rec_id,
-                Decision.stage == DecisionStage(stage),
-            )
-            .order_by(Decision.created_at.desc())
-            .first()
+    try:
+        stage_enum = DecisionStage(stage)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid stage")
+    if decided_by is not None and decided_by not in ("ai", "rules", "human"):
+        raise HTTPException(status_code=400, detail="decided_by must be one of: ai, rules, human")
+
+    # Records with their current decision in one query, file by file in upload order.
+    # The keyset walks ix_files_project_created, then ix_records_file_order per file.
+    order_key = (File.created_at, File.id, Record.order_index, Record.id)
+    q = (
+        db.query(
+            Record.id,
+            Record.title,
+            Record.year,
+            Record.canonical_id,
+            Record.order_index,
+            File.created_at.label("file_created_at"),
+            Record.file_id,
+            Decision.decision,
+            Decision.reasons,
+            Decision.verbatim_quote,
+            Decision.quote_location,
+            Decision.qc_flag,
+            Decision.created_by,
         )
-        if dec:
-            results.append(
-                RecordWithDecision(
-                    id=rec_id,
-                    title=row.title,
-                    year=row.year,
-                    decision=dec.decision.value if dec.decision else None,
-                    reasons=dec.reasons or [],
-                    verbatim_quote=dec.verbatim_quote,
-                    quote_location=dec.quote_location,
-                    qc_flag=dec.qc_flag,
-                )
-            )
-        else:
-            results.append(
-                RecordWithDecision(
-                    id=rec_id,
-                    title=row.title,
-                    year=row.year,
-                    decision=None,
-                    reasons=[],
-                    verbatim_quote=None,
-                    quote_location=None,
-                    qc_flag=False,
-                )
-            )
-    return results
+        .join(File, Record.file_id == File.id)
+        .outerjoin(CurrentDecision, current_decision_join(stage_enum))
+        .outerjoin(Decision, Decision.id == CurrentDecision.decision_id)
+        .filter(File.project_id == project_id)
+    )
+
+    if undecided_only:
+        q = q.filter(CurrentDecision.record_id.is_(None))
+    if decision is not None:
+        q = q.filter(Decision.decision == decision)
+    if qc_flag is not None:
+        q = q.filter(Decision.qc_flag == qc_flag)
+    if year_min is not None:
+        q = q.filter(Record.year >= year_min)
+    if year_max is not None:
+        q = q.filter(Record.year <= year_max)
+    if decided_by == "human":
+        q = q.filter(Decision.created_by.notin_(list(DECIDED_BY_CREATORS.values())))
+    elif decided_by is not None:
+        q = q.filter(Decision.created_by == DECIDED_BY_CREATORS[decided_by])
+
+    if cursor:
+        q = q.filter(tuple_(*order_key) > tuple_(*_decode_cursor(cursor)))
+
+    rows = q.order_by(*order_key).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = [
+        RecordWithDecision(
+            id=row.id,
+            title=row.title,
+            year=row.year,
+            decision=row.decision.value if row.decision else None,
+            reasons=row.reasons or [],
+            verbatim_quote=row.verbatim_quote,
+            quote_location=row.quote_location,
+            qc_flag=bool(row.qc_flag),
+            decided_by=_decided_by(row.created_by),
+            duplicate_of=row.canonical_id,
+        )
+        for row in rows
+    ]
+    last = rows[-1] if has_more else None
+    next_cursor = (
+        _encode_cursor(last.file_created_at, last.file_id, last.order_index, last.id) if last is not None else None
+    )
+    return RecordPage(items=items, next_cursor=next_cursor, limit=limit)
+
+@router.get("/search", response_model=SearchPage)
+def search_project_records(
+    project_id: str = Query(...),
+    q: str = Query(..., min_length=1),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    hits = search_records(db, project_id, q, limit + 1, offset)
+    has_more = len(hits) > limit
+    return SearchPage(
+        items=[SearchHit(**hit) for hit in hits[:limit]],
+        limit=limit,
+        offset=offset,
+        next_offset=offset + limit if has_more else None,
+    )
+
+@router.post("/dedup")
+def deduplicate_records(project_id: str = Query(...), db: Session = Depends(get_db)):
+    if not db.get(Project, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return deduplicate_project(db, project_id)
 
 @router.get("/{record_id}", response_model=RecordDetail)
 def get_record_detail(record_id: str, db: Session = Depends(get_db)):
@@ -126,11 +233,11 @@ def get_record_detail(record_id: str, db: Session = Depends(get_db)):
 
     dec_ta = (
         db.query(Decision)
+        .join(CurrentDecision, CurrentDecision.decision_id == Decision.id)
         .filter(
-            Decision.record_id == rec.id,
-            Decision.stage == DecisionStage.title_abstract,
+            CurrentDecision.record_id == rec.id,
+            CurrentDecision.stage == DecisionStage.title_abstract,
         )
-        .order_by(Decision.created_at.desc())
         .first()
     )
 
@@ -158,5 +265,7 @@ def get_record_detail(record_id: str, db: Session = Depends(get_db)):
         language=rec.language,
         sample_size=rec.sample_size,
         abstract=rec.abstract,
+        duplicate_of=rec.canonical_id,
+        duplicate_reason=rec.duplicate_reason,
         decision_ta=dec_info,
     )
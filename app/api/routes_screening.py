@@ -1,10 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+from pydantic import BaseModel
 
 from app.core.database import SessionLocal
 from app.core.config import settings
+from app.models.decision import DecisionStage
 from app.models.project import Project
-from app.services.screening_ta import run_title_abstract_screening_for_project
+from app.models.screening_job import ScreeningJob
+from app.models.llm_cache import LLMCacheEntry
+from app.services.llm_cache import cache_stats
+from app.services.llm_provider import get_provider
+from app.services.llm_scheduler import scheduler_stats
+from app.services.screening_rules import dry_run_rules
+from app.services.screening_jobs import (
+    create_screening_job,
+    get_active_job_for_project,
+    request_cancel,
+    start_screening_job,
+)
 
 router = APIRouter(prefix="/screening", tags=["Screening"])
 
@@ -15,8 +30,53 @@ def get_db():
     finally:
         db.close()
 
-@router.post("/title_abstract")
-def run_title_abstract_screening(project_id: str, db: Session = Depends(get_db)):
+class ScreeningJobOut(BaseModel):
+    id: str
+    project_id: str
+    stage: str
+    status: str
+    total_records: int = 0
+    processed_records: int = 0
+    skipped_already_decided: int = 0
+    screened_by_rules: int = 0
+    screened_by_llm: int = 0
+    attempts: int = 0
+    use_cache: bool = True
+    cancel_requested: bool = False
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+def _job_out(job: ScreeningJob) -> ScreeningJobOut:
+    return ScreeningJobOut(
+        id=job.id,
+        project_id=job.project_id,
+        stage=job.stage.value if hasattr(job.stage, "value") else job.stage,
+        status=job.status.value if hasattr(job.status, "value") else job.status,
+        total_records=job.total_records or 0,
+        processed_records=job.processed_records or 0,
+        skipped_already_decided=job.skipped_already_decided or 0,
+        screened_by_rules=job.screened_by_rules or 0,
+        screened_by_llm=job.screened_by_llm or 0,
+        attempts=job.attempts or 0,
+        use_cache=job.use_cache is not False,
+        cancel_requested=bool(job.cancel_requested),
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        updated_at=job.updated_at,
+    )
+
+@router.post("/title_abstract", status_code=202)
+def run_title_abstract_screening(
+    project_id: str,
+    max_concurrency: int | None = Query(None, ge=1, le=64),
+    use_cache: bool = Query(True),
+    db: Session = Depends(get_db),
+):
     project = db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -27,18 +87,128 @@ def run_title_abstract_screening(project_id: str, db: Session = Depends(get_db))
             detail="Protocol configuration is missing. Upload protocol first.",
         )
 
-    if not settings.OPENAI_API_KEY:
+    unavailable = get_provider().unavailable_reason()
+    if unavailable:
         raise HTTPException(
             status_code=500,
-            detail="OPENAI_API_KEY is not configured on the server.",
+            detail=f"{unavailable} on the server.",
         )
 
-    try:
-        summary = run_title_abstract_screening_for_project(db, project_id)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Screening failed: {e}")
+    job = get_active_job_for_project(db, project_id)
+    created = False
+    if job is None:
+        job, created = create_screening_job(db, project_id, max_concurrency=max_concurrency, use_cache=use_cache)
+    if not created:
+        return {
+            "message": "A title/abstract screening job is already active for this project.",
+            "job": _job_out(job),
+        }
+    start_screening_job(job.id)
+    db.refresh(job)
+
+    return {
+        "message": "Title/abstract screening started.",
+        "job": _job_out(job),
+    }
+
+@router.post("/full_text", status_code=202)
+def run_full_text_screening(
+    project_id: str,
+    max_concurrency: int | None = Query(None, ge=1, le=64),
+    use_cache: bool = Query(True),
+    db: Session = Depends(get_db),
+):
+    project = db.get(Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if not project.protocol_config:
+        raise HTTPException(
+            status_code=400,
+            detail="Protocol configuration is missing. Upload protocol first.",
+        )
+
+    unavailable = get_provider().unavailable_reason()
+    if unavailable:
+        raise HTTPException(
+            status_code=500,
+            detail=f"{unavailable} on the server.",
+        )
+
+    job = get_active_job_for_project(db, project_id, DecisionStage.full_text)
+    created = False
+    if job is None:
+        job, created = create_screening_job(
+            db, project_id, max_concurrency=max_concurrency, use_cache=use_cache, stage=DecisionStage.full_text
+        )
+    if not created:
+        return {
+            "message": "A full-text screening job is already active for this project.",
+            "job": _job_out(job),
+        }
+    start_screening_job(job.id)
+    db.refresh(job)
+
+    return {
+        "message": "Full-text screening started.",
+        "job": _job_out(job),
+    }
+
+@router.get("/title_abstract/rules_dry_run")
+def title_abstract_rules_dry_run(project_id: str = Query(...), db: Session = Depends(get_db)):
+    project = db.get(Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if not project.protocol_config:
+        raise HTTPException(
+            status_code=400,
+            detail="Protocol configuration is missing. Upload protocol first.",
+        )
+
+    return dry_run_rules(db, project_id, project.protocol_config)
+
+@router.get("/jobs", response_model=List[ScreeningJobOut])
+def list_screening_jobs(project_id: str = Query(...), db: Session = Depends(get_db)):
+    jobs = (
+        db.query(ScreeningJob)
+        .filter(ScreeningJob.project_id == project_id)
+        .order_by(ScreeningJob.created_at.desc())
+        .all()
+    )
+    return [_job_out(job) for job in jobs]
+
+@router.get("/jobs/{job_id}", response_model=ScreeningJobOut)
+def get_screening_job(job_id: str, db: Session = Depends(get_db)):
+    job = db.get(ScreeningJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Screening job not found")
+    return _job_out(job)
+
+@router.post("/jobs/{job_id}/cancel", response_model=ScreeningJobOut)
+def cancel_screening_job(job_id: str, db: Session = Depends(get_db)):
+    job = db.get(ScreeningJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Screening job not found")
+    return _job_out(request_cancel(db, job))
+
+@router.get("/cache/stats")
+def get_llm_cache_stats(db: Session = Depends(get_db)):
+    return {
+        "enabled": settings.LLM_CACHE_ENABLED,
+        "entries": db.query(LLMCacheEntry).count(),
+        "ttl_seconds": settings.LLM_CACHE_TTL_SECONDS,
+        "max_entries": settings.LLM_CACHE_MAX_ENTRIES,
+        **cache_stats(),
+    }
 
+@router.get("/llm/stats")
+def get_llm_scheduler_stats():
     return {
-        "message": "Title/abstract screening completed.",
-        **summary,
+        "provider": get_provider().name,
+        "requests_per_minute": settings.LLM_REQUESTS_PER_MINUTE,
+        "tokens_per_minute": settings.LLM_TOKENS_PER_MINUTE,
+        "timeout_seconds": settings.LLM_TIMEOUT_SECONDS,
+        "max_retries": settings.LLM_MAX_RETRIES,
+        "models": scheduler_stats(),
     }
@@ -6,6 +6,58 @@ load_dotenv()
 class Settings:
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./slr.db")
     OPENAI_API_KEY: str | None = os.getenv("OPENAI_API_KEY")
+    # "openai", "http" (OpenAI-compatible server at LLM_HTTP_BASE_URL) or "fake" (offline, deterministic).
+    LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "openai").lower()
+    LLM_HTTP_BASE_URL: str = os.getenv("LLM_HTTP_BASE_URL", "http://localhost:8080")
+    LLM_HTTP_API_KEY: str | None = os.getenv("LLM_HTTP_API_KEY")
+    LLM_HTTP_MODEL: str | None = os.getenv("LLM_HTTP_MODEL")
+    LLM_FAKE_LATENCY_MS: float = float(os.getenv("LLM_FAKE_LATENCY_MS", "0"))
+    LLM_FAKE_LATENCY_JITTER_MS: float = float(os.getenv("LLM_FAKE_LATENCY_JITTER_MS", "0"))
+    LLM_FAKE_ERROR_RATE: float = float(os.getenv("LLM_FAKE_ERROR_RATE", "0"))
+    LLM_FAKE_ERROR_STATUS: int = int(os.getenv("LLM_FAKE_ERROR_STATUS", "503"))
+    LLM_FAKE_SEED: int = int(os.getenv("LLM_FAKE_SEED", "0"))
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "uploads")
+    # Processes extracting PDF text; 0 extracts in the calling thread.
+    PDF_EXTRACTION_WORKERS: int = int(os.getenv("PDF_EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+    # Pages handed to one worker at a time; a long PDF is split across workers in runs of this size.
+    PDF_PAGES_PER_TASK: int = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+    SCREENING_MAX_CONCURRENCY: int = int(os.getenv("SCREENING_MAX_CONCURRENCY", "8"))
+    SCREENING_BATCH_SIZE: int = int(os.getenv("SCREENING_BATCH_SIZE", "1"))
+    # Screened records written per transaction; a crash re-screens at most this many on resume.
+    SCREENING_COMMIT_BATCH_SIZE: int = int(os.getenv("SCREENING_COMMIT_BATCH_SIZE", "200"))
+    # Full-text screening sends the model only the best-ranked passages of each paper:
+    # at most SCREENING_FT_TOP_K_CHUNKS chunks of about SCREENING_FT_CHUNK_TOKENS tokens.
+    SCREENING_FT_TOP_K_CHUNKS: int = int(os.getenv("SCREENING_FT_TOP_K_CHUNKS", "8"))
+    SCREENING_FT_CHUNK_TOKENS: int = int(os.getenv("SCREENING_FT_CHUNK_TOKENS", "350"))
+    # Audit rows are written by a background thread unless disabled; see services/audit_sink.py.
+    AUDIT_ASYNC_ENABLED: bool = os.getenv("AUDIT_ASYNC_ENABLED", "true").lower() in ("1", "true", "yes")
+    AUDIT_QUEUE_MAX_SIZE: int = int(os.getenv("AUDIT_QUEUE_MAX_SIZE", "10000"))
+    AUDIT_BATCH_SIZE: int = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+    AUDIT_ENQUEUE_TIMEOUT_SECONDS: float = float(os.getenv("AUDIT_ENQUEUE_TIMEOUT_SECONDS", "1.0"))
+    # How long durable emits and flushes wait for the writer before writing queued rows themselves.
+    AUDIT_WAIT_TIMEOUT_SECONDS: float = float(os.getenv("AUDIT_WAIT_TIMEOUT_SECONDS", "10.0"))
+    # "zstd" needs the zstandard package and falls back to zlib without it.
+    AUDIT_PAYLOAD_CODEC: str = os.getenv("AUDIT_PAYLOAD_CODEC", "zstd")
+    # Payloads of older events are compacted into per-project archive segments; 0 disables.
+    AUDIT_ARCHIVE_AFTER_DAYS: int = int(os.getenv("AUDIT_ARCHIVE_AFTER_DAYS", "90"))
+    AUDIT_ARCHIVE_SEGMENT_MAX_EVENTS: int = int(os.getenv("AUDIT_ARCHIVE_SEGMENT_MAX_EVENTS", "5000"))
+    AUDIT_ARCHIVE_INTERVAL_SECONDS: int = int(os.getenv("AUDIT_ARCHIVE_INTERVAL_SECONDS", str(24 * 3600)))
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    # Requests running more SQL statements than this are logged (likely N+1); 0 disables.
+    METRICS_QUERY_COUNT_THRESHOLD: int = int(os.getenv("METRICS_QUERY_COUNT_THRESHOLD", "50"))
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "200000"))
+    # Abstracts longer than this (estimated tokens) are truncated and flagged for QC; 0 disables.
+    LLM_MAX_ABSTRACT_TOKENS: int = int(os.getenv("LLM_MAX_ABSTRACT_TOKENS", "3000"))
+    # Client-side limits per model; keep them at or below the provider account's RPM/TPM. 0 disables a bucket.
+    LLM_REQUESTS_PER_MINUTE: int = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+    LLM_TOKENS_PER_MINUTE: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", "150000"))
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "5"))
+    LLM_BACKOFF_BASE_SECONDS: float = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+    LLM_BACKOFF_MAX_SECONDS: float = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "60"))
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    LLM_CIRCUIT_RESET_SECONDS: float = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
 
 settings = Settings()
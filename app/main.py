@@ -5,8 +5,11 @@
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from app.core.database import Base, engine
+from app.core.config import settings
+from app.core.database import Base, engine, SessionLocal
+from app.core.metrics import MetricsMiddleware, instrument_engine, render_metrics
 from app.api import (
     routes_project,
     routes_files,
@@ -16,12 +19,27 @@ from app.api import (
     routes_screening,
     routes_export,
 )
+from app.services.screening_jobs import job_lease_worker
+from app.services.audit_sink import audit_sink
+from app.services.audit_store import archive_worker, ensure_audit_storage
+from app.services.pdf_extractor import shutdown_pool as shutdown_pdf_pool
+from app.services.current_decisions import ensure_current_decisions
+from app.services.schema import ensure_schema
+from app.services.search_index import ensure_search_index
 
 # ---------------------------------------------------
 # 1. Database Initialization
 # ---------------------------------------------------
 # اگر دیتابیس SQLite باشد، در اولین اجرا فایل slr.db ساخته می‌شود.
 Base.metadata.create_all(bind=engine)
+# create_all never alters existing tables; columns added since are added here.
+ensure_schema(engine)
+ensure_search_index(engine)
+ensure_audit_storage(engine)
+
+# جدول current_decisions برای دیتابیس‌های قدیمی یک بار از روی decisions ساخته می‌شود.
+with SessionLocal() as _db:
+    ensure_current_decisions(_db)
 
 # ---------------------------------------------------
 # 2. FastAPI Application
@@ -44,7 +62,18 @@ app.add_middleware(
 )
 
 # ---------------------------------------------------
-# 4. Include Routers
+# 4. Metrics (per-route latency, SQL statements per request, LLM calls)
+# ---------------------------------------------------
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# ---------------------------------------------------
+# 5. Include Routers
 # ---------------------------------------------------
 app.include_router(routes_project.router)
 app.include_router(routes_files.router)
@@ -55,7 +84,42 @@ app.include_router(routes_screening.router)
 app.include_router(routes_export.router)
 
 # ---------------------------------------------------
-# 5. Root Endpoint (Health Check)
+# 6. Background Jobs (resume screening interrupted by a restart, audit writer and archiver, PDF workers)
+# ---------------------------------------------------
+@app.on_event("startup")
+def start_screening_job_leases():
+    # Also resumes jobs whose process died; in every worker, each job is claimed by one.
+    job_lease_worker.start()
+
+@app.on_event("shutdown")
+def stop_screening_job_leases():
+    job_lease_worker.stop()
+
+@app.on_event("startup")
+def start_audit_sink():
+    if settings.AUDIT_ASYNC_ENABLED:
+        audit_sink.start()
+
+@app.on_event("shutdown")
+def stop_audit_sink():
+    # Queued audit rows are written before the process exits.
+    audit_sink.stop()
+
+@app.on_event("startup")
+def start_audit_archiver():
+    if settings.AUDIT_ARCHIVE_AFTER_DAYS > 0:
+        archive_worker.start(settings.AUDIT_ARCHIVE_INTERVAL_SECONDS)
+
+@app.on_event("shutdown")
+def stop_audit_archiver():
+    archive_worker.stop()
+
+@app.on_event("shutdown")
+def stop_pdf_extraction_pool():
+    shutdown_pdf_pool()
+
+# ---------------------------------------------------
+# 7. Root Endpoint (Health Check)
 # ---------------------------------------------------
 @app.get("/")
 def read_root():
@@ -65,7 +129,7 @@ def read_root():
     return {"message": "TowardEvidence backend is running"}
 
 # ---------------------------------------------------
-# 6. Main Entrypoint (optional for local debug)
+# 8. Main Entrypoint (optional for local debug)
 # ---------------------------------------------------
 if __name__ == "__main__":
     import uvicorn
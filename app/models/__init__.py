@@ -3,6 +3,11 @@ from .project import Project
 from .file import File
 from .record import Record
 from .decision import Decision
-from .audit import AuditEvent
+from .current_decision import CurrentDecision
+from .audit import AuditEvent, AuditPayload, AuditArchiveSegment
+from .screening_job import ScreeningJob
+from .llm_cache import LLMCacheEntry
+from .pdf_text import PdfDocument, PdfPageText
+from .record_fulltext import RecordFullText
 
-__all__ = ["Base", "Project", "File", "Record", "Decision", "AuditEvent"]
+__all__ = ["Base", "Project", "File", "Record", "Decision", "CurrentDecision", "AuditEvent", "AuditPayload", "AuditArchiveSegment", "ScreeningJob", "LLMCacheEntry", "PdfDocument", "PdfPageText", "RecordFullText"]
@@ -1,6 +1,7 @@
 import enum
+import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Enum, JSON, ForeignKey
+from sqlalchemy import Column, String, DateTime, Enum, ForeignKey, Index, Integer, LargeBinary
 from app.core.database import Base
 
 class ActorType(str, enum.Enum):
@@ -10,8 +11,12 @@ class ActorType(str, enum.Enum):
 
 class AuditEvent(Base):
     __tablename__ = "audit_events"
+    __table_args__ = (
+        # keyset pagination of GET /audit/project/{project_id}
+        Index("ix_audit_events_project_created", "project_id", "created_at", "id"),
+    )
 
-    id = Column(String, primary_key=True)
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=True)
     record_id = Column(String, ForeignKey("records.id", ondelete="CASCADE"), nullable=True)
     decision_id = Column(String, ForeignKey("decisions.id", ondelete="SET NULL"), nullable=True)
@@ -22,7 +27,33 @@ class AuditEvent(Base):
     model_name = Column(String, nullable=True)
     prompt_version = Column(String, nullable=True)
 
-    request_payload = Column(JSON, nullable=True)
-    response_payload = Column(JSON, nullable=True)
+    # One-line description computed at write time; the payloads live in audit_payloads
+    # or, once compacted, in an audit_archive_segments row.
+    summary = Column(String, nullable=True)
+    archive_segment_id = Column(String, ForeignKey("audit_archive_segments.id", ondelete="SET NULL"), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# Compressed {"request": ..., "response": ...} JSON for one recent audit event.
+class AuditPayload(Base):
+    __tablename__ = "audit_payloads"
+
+    event_id = Column(String, ForeignKey("audit_events.id", ondelete="CASCADE"), primary_key=True)
+    codec = Column(String, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    raw_size = Column(Integer, nullable=False)
+
+# Payloads of many old events of one project, compressed together as {event_id: payload}.
+class AuditArchiveSegment(Base):
+    __tablename__ = "audit_archive_segments"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    codec = Column(String, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    raw_size = Column(Integer, nullable=False)
+    event_count = Column(Integer, nullable=False)
+    first_event_at = Column(DateTime, nullable=True)
+    last_event_at = Column(DateTime, nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,14 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Enum, ForeignKey
+from app.core.database import Base
+from app.models.decision import DecisionStage
+
+# Latest Decision per (record, stage); written in the same transaction as the Decision.
+class CurrentDecision(Base):
+    __tablename__ = "current_decisions"
+
+    record_id = Column(String, ForeignKey("records.id", ondelete="CASCADE"), primary_key=True)
+    stage = Column(Enum(DecisionStage), primary_key=True)
+    decision_id = Column(String, ForeignKey("decisions.id", ondelete="CASCADE"), nullable=False)
+
+    updated_at = Column(DateTime, default=datetime.utcnow)
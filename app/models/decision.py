@@ -1,4 +1,5 @@
 import enum
+import uuid
 from datetime import datetime
 from sqlalchemy import Column, String, DateTime, Enum, JSON, Boolean, Text, ForeignKey
 from app.core.database import Base
@@ -15,8 +16,8 @@ class DecisionOutcome(str, enum.Enum):
 class Decision(Base):
     __tablename__ = "decisions"
 
-    id = Column(String, primary_key=True)
-    record_id = Column(String, ForeignKey("records.id", ondelete="CASCADE"), nullable=False)
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    record_id = Column(String, ForeignKey("records.id", ondelete="CASCADE"), nullable=False, index=True)
 
     stage = Column(Enum(DecisionStage), nullable=False)
     decision = Column(Enum(DecisionOutcome), nullable=False)
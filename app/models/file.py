@@ -1,6 +1,7 @@
 import enum
+import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, String, DateTime, Enum, ForeignKey, Index, Integer
 from app.core.database import Base
 
 class FileType(str, enum.Enum):
@@ -10,10 +11,17 @@ class FileType(str, enum.Enum):
 
 class File(Base):
     __tablename__ = "files"
+    __table_args__ = (
+        # keyset pagination of GET /records: files in upload order, then ix_records_file_order.
+        # Unique (id is) and created_at NOT NULL, so SQLite walks both indexes without a sort.
+        Index("ix_files_project_created", "project_id", "created_at", "id", unique=True),
+    )
 
-    id = Column(String, primary_key=True)
-    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String, nullable=False)
     type = Column(Enum(FileType), nullable=False)
     path = Column(String, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    sha256 = Column(String(64), nullable=True, index=True)
+    size_bytes = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
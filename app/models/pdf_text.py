@@ -0,0 +1,19 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey
+from app.core.database import Base
+
+# Extracted PDF text, keyed by the file's sha256 so identical uploads share one extraction.
+class PdfDocument(Base):
+    __tablename__ = "pdf_documents"
+
+    sha256 = Column(String(64), primary_key=True)
+    page_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class PdfPageText(Base):
+    __tablename__ = "pdf_page_texts"
+
+    sha256 = Column(String(64), ForeignKey("pdf_documents.sha256", ondelete="CASCADE"), primary_key=True)
+    # 1-based, as shown to users and stored in quote locations
+    page = Column(Integer, primary_key=True)
+    text = Column(Text, nullable=False)
@@ -1,7 +1,7 @@
 import enum
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Enum, JSON
+from sqlalchemy import Column, String, DateTime, Enum, JSON, Integer
 from app.core.database import Base
 
 
@@ -28,3 +28,8 @@ class Project(Base):
 
     protocol_config = Column(JSON, nullable=True)
     protocol_status = Column(Enum(ProtocolStatus), default=ProtocolStatus.not_uploaded)
+    # sha256 of the protocol file protocol_config was extracted from
+    protocol_sha256 = Column(String(64), nullable=True)
+
+    # تعداد رکوردهایی که در یک پرامپت به مدل ارسال می‌شوند (خالی = مقدار پیش‌فرض سرور)
+    screening_batch_size = Column(Integer, nullable=True)
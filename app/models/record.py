@@ -1,11 +1,16 @@
-from sqlalchemy import Column, String, Integer, Float, Text, ForeignKey
+import uuid
+from sqlalchemy import Column, String, Integer, Float, Text, ForeignKey, Index
 from app.core.database import Base
 
 class Record(Base):
     __tablename__ = "records"
+    __table_args__ = (
+        # keyset pagination of GET /records, within each file (see ix_files_project_created)
+        Index("ix_records_file_order", "file_id", "order_index", "id"),
+    )
 
-    id = Column(String, primary_key=True)
-    file_id = Column(String, ForeignKey("files.id", ondelete="CASCADE"), nullable=False)
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    file_id = Column(String, ForeignKey("files.id", ondelete="CASCADE"), nullable=False, index=True)
 
     order_index = Column(Integer, nullable=True)
 
@@ -20,3 +25,7 @@ class Record(Base):
     authors = Column(Text, nullable=True)
 
     metadata_quality = Column(Float, nullable=True)
+
+    # Set when this record duplicates another one in the same project; null for canonical records.
+    canonical_id = Column(String, ForeignKey("records.id", ondelete="SET NULL"), nullable=True, index=True)
+    duplicate_reason = Column(String, nullable=True)
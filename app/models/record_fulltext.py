@@ -0,0 +1,12 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, ForeignKey
+from app.core.database import Base
+
+# The full-text PDF attached to a record for full-text screening (at most one per record).
+class RecordFullText(Base):
+    __tablename__ = "record_fulltexts"
+
+    record_id = Column(String, ForeignKey("records.id", ondelete="CASCADE"), primary_key=True)
+    file_id = Column(String, ForeignKey("files.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    attached_at = Column(DateTime, default=datetime.utcnow)
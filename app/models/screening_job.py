@@ -0,0 +1,50 @@
+import enum
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Enum, Integer, Boolean, Text, ForeignKey, Index
+from app.core.database import Base
+from app.models.decision import DecisionStage
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+    cancelled = "cancelled"
+
+ACTIVE_JOB_STATUSES = (JobStatus.queued, JobStatus.running)
+
+class ScreeningJob(Base):
+    __tablename__ = "screening_jobs"
+    __table_args__ = (
+        # At most one active job per project and stage: active_key is "<project_id>:<stage>"
+        # while the job is queued or running and NULL once it finishes (NULLs never collide).
+        Index("ux_screening_jobs_active", "active_key", unique=True),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    stage = Column(Enum(DecisionStage), nullable=False, default=DecisionStage.title_abstract)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.queued)
+    max_concurrency = Column(Integer, nullable=True)
+    use_cache = Column(Boolean, default=True)
+
+    total_records = Column(Integer, default=0)
+    processed_records = Column(Integer, default=0)
+    skipped_already_decided = Column(Integer, default=0)
+    screened_by_rules = Column(Integer, default=0)
+    screened_by_llm = Column(Integer, default=0)
+    attempts = Column(Integer, default=0)
+
+    cancel_requested = Column(Boolean, default=False)
+    active_key = Column(String, nullable=True)
+    # Process running the job and when it last renewed its lease (see screening_jobs.JOB_LEASE_SECONDS).
+    owner = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,260 @@
+import logging
+import queue
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable
+
+from app.core.config import settings
+from app.core.database import engine
+from app.services.audit_store import AUDIT_ROW_FIELDS, insert_audit_rows
+
+logger = logging.getLogger(__name__)
+
+# How often an idle writer checks whether it has been asked to stop.
+_STOP_POLL_SECONDS = 0.2
+
+
+def build_audit_row(**values: Any) -> Dict[str, Any]:
+    """
+    A complete audit row (every field present, so rows can share one
+    executemany), with a client-side id and created_at filled in.
+    """
+    unknown = set(values) - set(AUDIT_ROW_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown audit row field(s): {sorted(unknown)}")
+    row = {key: values.get(key) for key in AUDIT_ROW_FIELDS}
+    row["id"] = row["id"] or str(uuid.uuid4())
+    row["created_at"] = row["created_at"] or datetime.utcnow()
+    return row
+
+
+def _insert_rows(rows: list[Dict[str, Any]]) -> None:
+    with engine.begin() as conn:
+        insert_audit_rows(conn, rows)
+
+
+class _Waiter:
+    __slots__ = ("done", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error: BaseException | None = None
+
+
+class AuditSink:
+    """
+    Takes audit rows off the request path. Rows go into a bounded queue and a
+    background thread writes whatever has accumulated, up to `batch_size`
+    rows, with one executemany and commit.
+
+    When the queue is full, `emit` waits up to `enqueue_timeout` for room and
+    then writes the rows itself: back-pressure slows producers down, but
+    audit rows are never dropped. `durable=True` blocks until the rows are
+    committed; if the writer has not got to them within `wait_timeout`, the
+    caller writes what is still queued itself. Before `start()` and once
+    `stop()` has begun every emit is synchronous.
+    """
+
+    def __init__(self, max_queue: int, batch_size: int, enqueue_timeout: float, wait_timeout: float):
+        self.batch_size = max(1, batch_size)
+        self.enqueue_timeout = enqueue_timeout
+        self.wait_timeout = wait_timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_queue))
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        # Held while putting on the queue and while stop() sets _stopping, so
+        # nothing is queued once the writer may already have drained and exited.
+        self._enqueue_lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "written_synchronously": 0,
+            "backpressure_waits": 0,
+            "failed": 0,
+            "max_queue_depth": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stopping.is_set()
+
+    def _bump(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+        out["queue_depth"] = self._queue.qsize()
+        out["running"] = self.running
+        return out
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop accepting queued rows and write everything still in the queue."""
+        if self._thread is None:
+            return
+        with self._enqueue_lock:
+            self._stopping.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(
+                "Audit sink did not drain within %.1fs; writing %d queued row(s) here",
+                timeout,
+                self._queue.qsize(),
+            )
+        # Whatever the writer left behind; each queued item is taken by exactly one thread.
+        self._drain()
+        self._thread = None
+
+    def _write_now(self, rows: list[Dict[str, Any]]) -> None:
+        _insert_rows(rows)
+        self._bump("written", len(rows))
+        self._bump("written_synchronously", len(rows))
+
+    def emit(self, row: Dict[str, Any], durable: bool = False) -> None:
+        self.emit_many([row], durable=durable)
+
+    def emit_many(self, rows: Iterable[Dict[str, Any]], durable: bool = False) -> None:
+        rows = list(rows)
+        if not rows:
+            return
+        if not self.running:
+            self._write_now(rows)
+            return
+
+        waiter = _Waiter() if durable else None
+        for i, row in enumerate(rows):
+            # Only the last row carries the waiter: the writer keeps queue order.
+            item = (row, waiter if i == len(rows) - 1 else None)
+            if not self._enqueue(item):
+                # Stopping, or the writer can't keep up: write the rest here rather than drop them.
+                if not self._stopping.is_set():
+                    logger.warning("Audit queue full; writing %d row(s) synchronously", len(rows) - i)
+                if waiter is not None and i > 0:
+                    # Earlier rows are queued ahead of us; wait for them before returning.
+                    self._wait_for_queue()
+                self._write_now(rows[i:])
+                return
+            self._bump("enqueued")
+            with self._lock:
+                depth = self._queue.qsize()
+                if depth > self._stats["max_queue_depth"]:
+                    self._stats["max_queue_depth"] = depth
+
+        if waiter is not None:
+            self._wait(waiter)
+            if waiter.error is not None:
+                raise waiter.error
+
+    def _enqueue(self, item: tuple) -> bool:
+        """Queue `item`; False if the sink is stopping or the queue stayed full, and the caller must write it."""
+        with self._enqueue_lock:
+            if self._stopping.is_set():
+                return False
+            try:
+                self._queue.put_nowait(item)
+                return True
+            except queue.Full:
+                pass
+            self._bump("backpressure_waits")
+            try:
+                self._queue.put(item, timeout=self.enqueue_timeout)
+                return True
+            except queue.Full:
+                return False
+
+    def _wait(self, waiter: _Waiter) -> None:
+        """Wait for the writer to reach `waiter`; past `wait_timeout`, write what is still queued here."""
+        if waiter.done.wait(self.wait_timeout):
+            return
+        logger.warning("Audit writer is behind by %.1fs; writing queued rows synchronously", self.wait_timeout)
+        self._drain(waiter)
+        # What is left is in the batch the writer is committing right now.
+        if not waiter.done.wait(self.wait_timeout):
+            raise TimeoutError(f"Audit rows were not written within {2 * self.wait_timeout:.1f}s")
+
+    def _wait_for_queue(self) -> None:
+        marker = _Waiter()
+        if self._enqueue((None, marker)):
+            self._wait(marker)
+        else:
+            self._drain()
+
+    def _drain(self, waiter: _Waiter | None = None) -> None:
+        """Write queued items on this thread until `waiter` is done, or the queue is empty."""
+        while waiter is None or not waiter.done.is_set():
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._write_batch(batch)
+
+    def flush(self) -> None:
+        """Block until everything queued so far is written."""
+        if self.running:
+            self._wait_for_queue()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=_STOP_POLL_SECONDS)
+            except queue.Empty:
+                # Nothing is queued once _stopping is set, so an empty queue then is final.
+                if self._stopping.is_set() and self._queue.empty():
+                    return
+                continue
+            # Take whatever else is already waiting: batches grow with load, and
+            # a lone row isn't held back waiting for company.
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: list[tuple]) -> None:
+        rows = [row for row, _ in batch if row is not None]
+        errors: Dict[int, BaseException] = {}
+        if rows:
+            try:
+                _insert_rows(rows)
+                self._bump("written", len(rows))
+                self._bump("batches")
+            except Exception:
+                # Retry one by one so a single bad row doesn't take the batch down with it.
+                logger.exception("Audit batch of %d row(s) failed; retrying individually", len(rows))
+                for row in rows:
+                    try:
+                        _insert_rows([row])
+                        self._bump("written")
+                    except Exception as e:
+                        logger.exception("Dropping audit row %s", row.get("id"))
+                        self._bump("failed")
+                        errors[id(row)] = e
+        for row, waiter in batch:
+            if waiter is not None:
+                waiter.error = errors.get(id(row)) if row is not None else None
+                waiter.done.set()
+
+
+audit_sink = AuditSink(
+    max_queue=settings.AUDIT_QUEUE_MAX_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    enqueue_timeout=settings.AUDIT_ENQUEUE_TIMEOUT_SECONDS,
+    wait_timeout=settings.AUDIT_WAIT_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,325 @@
+import json
+import logging
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.audit import AuditArchiveSegment, AuditEvent, AuditPayload
+
+try:
+    import zstandard
+except ImportError:  # optional; payloads are zlib-compressed without it
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_FIELDS = ("request_payload", "response_payload")
+# What callers put in an audit row: the slim event columns plus the two payloads.
+AUDIT_ROW_FIELDS = tuple(
+    c.key for c in AuditEvent.__table__.columns if c.key not in ("summary", "archive_segment_id")
+) + PAYLOAD_FIELDS
+_EVENT_COLUMNS = tuple(c.key for c in AuditEvent.__table__.columns)
+
+SUMMARY_MAX_CHARS = 500
+_ZLIB_LEVEL = 6
+_ZSTD_LEVEL = 3
+# Decoded archive segments kept in memory; segments never change once written.
+_SEGMENT_CACHE_SIZE = 4
+_MIGRATION_BATCH_SIZE = 1000
+
+
+def _codec() -> str:
+    if settings.AUDIT_PAYLOAD_CODEC.lower() == "zstd" and zstandard is not None:
+        return "zstd"
+    return "zlib"
+
+
+def _compress(raw: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(raw)
+    return zlib.compress(raw, _ZLIB_LEVEL)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Audit payload is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown audit payload codec: {codec!r}")
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def summarize(action: str, response_payload: Any) -> str:
+    summary = action
+    if response_payload and isinstance(response_payload, dict):
+        reasons = response_payload.get("reasons")
+        if isinstance(reasons, list) and reasons:
+            summary += " – " + "; ".join(str(r) for r in reasons[:2])
+    return summary[:SUMMARY_MAX_CHARS]
+
+
+def split_audit_rows(rows: Iterable[Dict[str, Any]]) -> tuple[list[Dict[str, Any]], list[Dict[str, Any]]]:
+    """
+    Turn audit rows (AUDIT_ROW_FIELDS) into audit_events rows with their
+    summary filled in, and compressed audit_payloads rows for the events that
+    carry a payload.
+    """
+    codec = _codec()
+    events: list[Dict[str, Any]] = []
+    payloads: list[Dict[str, Any]] = []
+    for row in rows:
+        event = {key: row.get(key) for key in _EVENT_COLUMNS}
+        event["summary"] = row.get("summary") or summarize(row["action"], row.get("response_payload"))
+        events.append(event)
+        request, response = row.get("request_payload"), row.get("response_payload")
+        if request is None and response is None:
+            continue
+        raw = _dumps({"request": request, "response": response})
+        payloads.append(
+            {"event_id": row["id"], "codec": codec, "data": _compress(raw, codec), "raw_size": len(raw)}
+        )
+    return events, payloads
+
+
+def insert_audit_rows(conn, rows: list[Dict[str, Any]]) -> None:
+    """Insert audit rows with one executemany per table, in the caller's transaction."""
+    if not rows:
+        return
+    events, payloads = split_audit_rows(rows)
+    conn.execute(AuditEvent.__table__.insert(), events)
+    if payloads:
+        conn.execute(AuditPayload.__table__.insert(), payloads)
+
+
+_segment_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_segment_cache_lock = threading.Lock()
+
+
+def _load_segment(db: Session, segment_id: str) -> Dict[str, Any] | None:
+    with _segment_cache_lock:
+        entries = _segment_cache.get(segment_id)
+        if entries is not None:
+            _segment_cache.move_to_end(segment_id)
+            return entries
+    segment = db.get(AuditArchiveSegment, segment_id)
+    if segment is None:
+        return None
+    entries = json.loads(_decompress(segment.data, segment.codec))
+    with _segment_cache_lock:
+        _segment_cache[segment_id] = entries
+        while len(_segment_cache) > _SEGMENT_CACHE_SIZE:
+            _segment_cache.popitem(last=False)
+    return entries
+
+
+def get_audit_payloads(db: Session, events: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Payloads for many events at once, keyed by event id. `events` are rows
+    with `id` and `archive_segment_id`. Costs one query for the live
+    payloads plus one per archive segment not already cached.
+    """
+    live: list[str] = []
+    by_segment: Dict[str, list[str]] = {}
+    for ev in events:
+        if ev.archive_segment_id:
+            by_segment.setdefault(ev.archive_segment_id, []).append(ev.id)
+        else:
+            live.append(ev.id)
+    out: Dict[str, Dict[str, Any]] = {}
+    if live:
+        rows = db.execute(
+            select(AuditPayload.event_id, AuditPayload.codec, AuditPayload.data).where(
+                AuditPayload.event_id.in_(live)
+            )
+        ).all()
+        for row in rows:
+            out[row.event_id] = json.loads(_decompress(row.data, row.codec))
+    for segment_id, ids in by_segment.items():
+        entries = _load_segment(db, segment_id) or {}
+        for event_id in ids:
+            if event_id in entries:
+                out[event_id] = entries[event_id]
+    return out
+
+
+def get_audit_payload(db: Session, event_id: str) -> Dict[str, Any] | None:
+    """
+    The request/response payloads of one event, read from audit_payloads or
+    its archive segment. None if the event does not exist.
+    """
+    found = db.execute(
+        select(AuditEvent.id, AuditEvent.archive_segment_id).where(AuditEvent.id == event_id)
+    ).first()
+    if found is None:
+        return None
+    payload = get_audit_payloads(db, [found]).get(event_id, {})
+    return {
+        "id": event_id,
+        "archived": bool(found.archive_segment_id),
+        "request_payload": payload.get("request"),
+        "response_payload": payload.get("response"),
+    }
+
+
+def archive_audit_payloads(
+    db: Session, older_than_days: int | None = None, project_id: str | None = None
+) -> Dict[str, int]:
+    """
+    Compact payloads of events older than `older_than_days` (default
+    AUDIT_ARCHIVE_AFTER_DAYS) into per-project segments of at most
+    AUDIT_ARCHIVE_SEGMENT_MAX_EVENTS events. Events compress far better
+    together than one by one. Commits once per segment. Events without a
+    project are left in audit_payloads.
+    """
+    days = settings.AUDIT_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = datetime.utcnow() - timedelta(days=max(0, days))
+    segment_size = max(1, settings.AUDIT_ARCHIVE_SEGMENT_MAX_EVENTS)
+    codec = _codec()
+    stats = {"segments": 0, "events": 0, "bytes_before": 0, "bytes_after": 0}
+
+    eligible = (
+        select(AuditEvent.project_id)
+        .join(AuditPayload, AuditPayload.event_id == AuditEvent.id)
+        .where(AuditEvent.created_at < cutoff, AuditEvent.project_id.is_not(None))
+    )
+    if project_id is not None:
+        eligible = eligible.where(AuditEvent.project_id == project_id)
+    project_ids = db.execute(eligible.distinct()).scalars().all()
+
+    for pid in project_ids:
+        while True:
+            batch = db.execute(
+                select(AuditEvent.id, AuditEvent.created_at, AuditPayload.codec, AuditPayload.data)
+                .join(AuditPayload, AuditPayload.event_id == AuditEvent.id)
+                .where(AuditEvent.project_id == pid, AuditEvent.created_at < cutoff)
+                .order_by(AuditEvent.created_at, AuditEvent.id)
+                .limit(segment_size)
+            ).all()
+            if not batch:
+                break
+            entries = {row.id: json.loads(_decompress(row.data, row.codec)) for row in batch}
+            raw = _dumps(entries)
+            segment = AuditArchiveSegment(
+                project_id=pid,
+                codec=codec,
+                data=_compress(raw, codec),
+                raw_size=len(raw),
+                event_count=len(batch),
+                first_event_at=batch[0].created_at,
+                last_event_at=batch[-1].created_at,
+            )
+            db.add(segment)
+            db.flush()
+            ids = list(entries)
+            db.execute(
+                AuditEvent.__table__.update()
+                .where(AuditEvent.id.in_(ids))
+                .values(archive_segment_id=segment.id)
+            )
+            db.execute(AuditPayload.__table__.delete().where(AuditPayload.event_id.in_(ids)))
+            db.commit()
+            stats["segments"] += 1
+            stats["events"] += len(batch)
+            stats["bytes_before"] += sum(len(row.data) for row in batch)
+            stats["bytes_after"] += len(segment.data)
+    return stats
+
+
+class _ArchiveWorker:
+    def __init__(self):
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self, interval_seconds: float) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval_seconds,), name="audit-archiver", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self, interval_seconds: float) -> None:
+        while not self._stop.is_set():
+            try:
+                with SessionLocal() as db:
+                    stats = archive_audit_payloads(db)
+                if stats["events"]:
+                    logger.info("Archived %d audit payload(s) into %d segment(s)", stats["events"], stats["segments"])
+            except Exception:
+                logger.exception("Audit payload archiving failed")
+            self._stop.wait(max(1.0, interval_seconds))
+
+
+archive_worker = _ArchiveWorker()
+
+
+def ensure_audit_storage(engine: Engine) -> None:
+    """
+    Bring audit_events created before payloads moved out up to date: add the
+    new columns and indexes, then move inline request/response payloads into
+    audit_payloads (filling in summaries) in batches. The old JSON columns
+    are left in place, empty.
+    """
+    columns = {c["name"] for c in inspect(engine).get_columns("audit_events")}
+    with engine.begin() as conn:
+        if "summary" not in columns:
+            conn.execute(text("ALTER TABLE audit_events ADD COLUMN summary VARCHAR"))
+        if "archive_segment_id" not in columns:
+            conn.execute(text("ALTER TABLE audit_events ADD COLUMN archive_segment_id VARCHAR"))
+        # create_all only builds indexes together with a new table.
+        for index in AuditEvent.__table__.indexes:
+            index.create(conn, checkfirst=True)
+    if "request_payload" not in columns:
+        return
+
+    moved = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT id, action, request_payload, response_payload FROM audit_events "
+                    "WHERE request_payload IS NOT NULL OR response_payload IS NOT NULL LIMIT :n"
+                ),
+                {"n": _MIGRATION_BATCH_SIZE},
+            ).all()
+            if not rows:
+                break
+            audit_rows = []
+            for row in rows:
+                request, response = row.request_payload, row.response_payload
+                # SQLite hands back JSON columns as text.
+                request = json.loads(request) if isinstance(request, str) else request
+                response = json.loads(response) if isinstance(response, str) else response
+                audit_rows.append({"id": row.id, "action": row.action, "request_payload": request, "response_payload": response})
+            _, payloads = split_audit_rows(audit_rows)
+            if payloads:
+                conn.execute(AuditPayload.__table__.insert(), payloads)
+            conn.execute(
+                text(
+                    "UPDATE audit_events SET summary = :summary, request_payload = NULL, "
+                    "response_payload = NULL WHERE id = :id"
+                ),
+                [{"id": r["id"], "summary": summarize(r["action"], r["response_payload"])} for r in audit_rows],
+            )
+            moved += len(rows)
+    if moved:
+        logger.info("Moved %d inline audit payload(s) to audit_payloads", moved)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE audit_events SET summary = action WHERE summary IS NULL"))
@@ -0,0 +1,144 @@
+import argparse
+import sys
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.current_decision import CurrentDecision
+from app.models.decision import Decision, DecisionStage
+from app.models.file import File
+from app.models.record import Record
+
+
+def set_current_decision(db: Session, dec: Decision) -> None:
+    """
+    Point (record, stage) at `dec`. Call before committing the Decision so both
+    land in the same transaction.
+    """
+    if dec.id is None:
+        db.flush()
+    db.merge(
+        CurrentDecision(
+            record_id=dec.record_id,
+            stage=dec.stage,
+            decision_id=dec.id,
+            updated_at=dec.created_at or datetime.utcnow(),
+        )
+    )
+
+
+def upsert_current_decisions(db: Session, rows: list[dict]) -> None:
+    """
+    Bulk form of set_current_decision for rows of record_id, stage,
+    decision_id, updated_at: one INSERT .. ON CONFLICT on SQLite/Postgres,
+    a merge per row elsewhere. Runs in the caller's transaction.
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(CurrentDecision.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["record_id", "stage"],
+            set_={"decision_id": stmt.excluded.decision_id, "updated_at": stmt.excluded.updated_at},
+        )
+        db.execute(stmt, rows)
+        return
+    for row in rows:
+        db.merge(CurrentDecision(**row))
+
+
+def current_decision_join(stage: DecisionStage):
+    """
+    ON clause for `outerjoin(CurrentDecision, ...)` from Record, followed by
+    `outerjoin(Decision, Decision.id == CurrentDecision.decision_id)`.
+    """
+    return (CurrentDecision.record_id == Record.id) & (CurrentDecision.stage == stage)
+
+
+def decided_record_ids(db: Session, project_id: str, stage: DecisionStage) -> set[str]:
+    rows = (
+        db.query(CurrentDecision.record_id)
+        .join(Record, CurrentDecision.record_id == Record.id)
+        .join(File, Record.file_id == File.id)
+        .filter(File.project_id == project_id, CurrentDecision.stage == stage)
+        .all()
+    )
+    return {record_id for (record_id,) in rows}
+
+
+def rebuild_current_decisions(db: Session, project_id: str | None = None) -> int:
+    """
+    Recompute the table from `decisions` (latest created_at wins), for one
+    project or for everything.
+    """
+    ranked = db.query(
+        Decision.id.label("decision_id"),
+        Decision.record_id.label("record_id"),
+        Decision.stage.label("stage"),
+        Decision.created_at.label("created_at"),
+        func.row_number()
+        .over(
+            partition_by=(Decision.record_id, Decision.stage),
+            order_by=(Decision.created_at.desc(), Decision.id.desc()),
+        )
+        .label("rn"),
+    )
+    stale = db.query(CurrentDecision)
+    if project_id is not None:
+        project_records = (
+            db.query(Record.id)
+            .join(File, Record.file_id == File.id)
+            .filter(File.project_id == project_id)
+            .subquery()
+        )
+        ranked = ranked.filter(Decision.record_id.in_(project_records.select()))
+        stale = stale.filter(CurrentDecision.record_id.in_(project_records.select()))
+    ranked = ranked.subquery()
+
+    stale.delete(synchronize_session=False)
+    latest = db.query(
+        ranked.c.record_id, ranked.c.stage, ranked.c.decision_id, ranked.c.created_at
+    ).filter(ranked.c.rn == 1)
+    result = db.execute(
+        CurrentDecision.__table__.insert().from_select(
+            ["record_id", "stage", "decision_id", "updated_at"], latest.statement
+        )
+    )
+    db.commit()
+    return result.rowcount or 0
+
+
+def ensure_current_decisions(db: Session) -> int:
+    # Backfill once for databases that have decisions but predate the table.
+    if db.query(CurrentDecision.record_id).first() is not None:
+        return 0
+    if db.query(Decision.id).first() is None:
+        return 0
+    return rebuild_current_decisions(db)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain the current_decisions table.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild = sub.add_parser("rebuild", help="Recompute current decisions from the decisions table.")
+    rebuild.add_argument("--project-id", default=None)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        n = rebuild_current_decisions(db, project_id=args.project_id)
+    finally:
+        db.close()
+    print(f"current_decisions rebuilt: {n} row(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+import hashlib
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, Iterable
+
+from sqlalchemy import bindparam, func
+from sqlalchemy.orm import Session
+
+from app.models.decision import DecisionStage
+from app.models.file import File
+from app.models.record import Record
+from app.services.current_decisions import decided_record_ids
+
+# One-permutation MinHash over title word shingles, banded for LSH.
+MINHASH_BINS = 16
+BAND_ROWS = 2
+# Near-duplicate titles must share at least this fraction of their shingles.
+TITLE_JACCARD_THRESHOLD = 0.8
+# Buckets larger than this are boilerplate titles ("Editorial", "Reply") and are not expanded pairwise.
+MAX_BUCKET_SIZE = 200
+
+_DOI_PREFIX = re.compile(r"^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)", re.IGNORECASE)
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "at", "by", "for", "from", "in", "of", "on", "or", "the", "to", "with",
+}
+
+
+def normalize_doi(doi: str | None) -> str | None:
+    if not doi:
+        return None
+    doi = _DOI_PREFIX.sub("", doi.strip()).strip().rstrip(".;,").lower()
+    return doi if doi.startswith("10.") else None
+
+
+def _title_shingles(title: str | None) -> frozenset[str]:
+    if not title:
+        return frozenset()
+    text = unicodedata.normalize("NFKD", title).encode("ascii", "ignore").decode("ascii").lower()
+    words = [w for w in _WORD.findall(text) if w not in _STOPWORDS]
+    return frozenset(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+
+def _first_author(authors: str | None) -> str | None:
+    if not authors:
+        return None
+    first = authors.split(";", 1)[0]
+    surname = first.split(",", 1)[0].strip().lower()
+    return re.sub(r"[^a-z]", "", surname) or None
+
+
+def _shingle_hash(shingle: str) -> int:
+    # Not hash(): str hashes are salted per process, so buckets would change on every restart.
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=6).digest(), "big")
+
+
+def _band_keys(shingles: frozenset[str]) -> Iterable[tuple]:
+    bins: list[int | None] = [None] * MINHASH_BINS
+    for s in shingles:
+        h = _shingle_hash(s)
+        b = h % MINHASH_BINS
+        v = h // MINHASH_BINS
+        cur = bins[b]
+        if cur is None or v < cur:
+            bins[b] = v
+    for band in range(0, MINHASH_BINS, BAND_ROWS):
+        rows = tuple(bins[band : band + BAND_ROWS])
+        if None not in rows:
+            yield (band,) + rows
+
+
+def _is_near_duplicate(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    if a["year"] and b["year"] and abs(a["year"] - b["year"]) > 1:
+        return False
+    if a["author"] and b["author"] and a["author"] != b["author"]:
+        return False
+    sa, sb = a["shingles"], b["shingles"]
+    inter = len(sa & sb)
+    return inter / (len(sa) + len(sb) - inter) >= TITLE_JACCARD_THRESHOLD
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> bool:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return False
+        self.parent[rb] = ra
+        return True
+
+
+def find_duplicate_clusters(rows: list[Dict[str, Any]]) -> tuple[Dict[int, str], _UnionFind]:
+    """
+    Group rows into duplicate clusters. Returns {row index: reason} for every
+    row that was linked to another one ("doi" wins over "title"), plus the
+    union-find holding the clusters.
+    """
+    uf = _UnionFind(len(rows))
+    reasons: Dict[int, str] = {}
+
+    by_doi: Dict[str, int] = {}
+    for i, row in enumerate(rows):
+        doi = row["doi"]
+        if doi is None:
+            continue
+        j = by_doi.setdefault(doi, i)
+        if j != i:
+            uf.union(j, i)
+            reasons[i] = reasons[j] = "doi"
+
+    buckets: Dict[tuple, list[int]] = defaultdict(list)
+    for i, row in enumerate(rows):
+        if len(row["shingles"]) < 3:
+            continue
+        for key in _band_keys(row["shingles"]):
+            buckets[key].append(i)
+
+    for members in buckets.values():
+        if len(members) < 2 or len(members) > MAX_BUCKET_SIZE:
+            continue
+        for x in range(len(members)):
+            i = members[x]
+            for y in range(x + 1, len(members)):
+                j = members[y]
+                if uf.find(i) == uf.find(j):
+                    continue
+                if _is_near_duplicate(rows[i], rows[j]):
+                    uf.union(i, j)
+                    reasons.setdefault(i, "title")
+                    reasons.setdefault(j, "title")
+
+    return reasons, uf
+
+
+def deduplicate_project(db: Session, project_id: str) -> Dict[str, Any]:
+    """
+    Link every duplicate record of the project to a canonical one
+    (Record.canonical_id). Exact matches on normalized DOI first, then
+    near-duplicate titles (with compatible year and first author) found
+    through MinHash-LSH, so the work is roughly linear in project size.
+    """
+    started = time.perf_counter()
+    q = (
+        db.query(
+            Record.id,
+            Record.title,
+            Record.authors,
+            Record.year,
+            Record.doi,
+            Record.metadata_quality,
+            func.length(Record.abstract).label("abstract_len"),
+            Record.canonical_id,
+            Record.duplicate_reason,
+        )
+        .join(File, Record.file_id == File.id)
+        .filter(File.project_id == project_id)
+        .order_by(File.created_at, Record.order_index, Record.id)
+    )
+    decided = decided_record_ids(db, project_id, DecisionStage.title_abstract)
+
+    rows: list[Dict[str, Any]] = []
+    for r in q:
+        rows.append(
+            {
+                "id": r.id,
+                "doi": normalize_doi(r.doi),
+                "shingles": _title_shingles(r.title),
+                "author": _first_author(r.authors),
+                "year": r.year,
+                # Prefer a record that already has a decision, then the most complete one.
+                "rank": (r.id in decided, r.metadata_quality or 0.0, r.abstract_len or 0),
+                "canonical_id": r.canonical_id,
+                "duplicate_reason": r.duplicate_reason,
+            }
+        )
+
+    reasons, uf = find_duplicate_clusters(rows)
+
+    clusters: Dict[int, list[int]] = defaultdict(list)
+    for i in reasons:
+        clusters[uf.find(i)].append(i)
+
+    target: Dict[int, tuple[str | None, str | None]] = {}
+    by_doi = by_title = 0
+    for members in clusters.values():
+        # Ties go to the earliest imported record (members are in import order).
+        canonical = max(members, key=lambda i: (rows[i]["rank"], -i))
+        for i in members:
+            if i == canonical:
+                continue
+            target[i] = (rows[canonical]["id"], reasons[i])
+            if reasons[i] == "doi":
+                by_doi += 1
+            else:
+                by_title += 1
+
+    updates = []
+    for i, row in enumerate(rows):
+        canonical_id, reason = target.get(i, (None, None))
+        if (row["canonical_id"], row["duplicate_reason"]) != (canonical_id, reason):
+            updates.append({"b_id": row["id"], "canonical_id": canonical_id, "duplicate_reason": reason})
+
+    if updates:
+        table = Record.__table__
+        stmt = (
+            table.update()
+            .where(table.c.id == bindparam("b_id"))
+            .values(canonical_id=bindparam("canonical_id"), duplicate_reason=bindparam("duplicate_reason"))
+        )
+        db.execute(stmt, updates)
+    db.commit()
+
+    return {
+        "project_id": project_id,
+        "records": len(rows),
+        "clusters": len(clusters),
+        "duplicates": len(target),
+        "duplicates_by_doi": by_doi,
+        "duplicates_by_title": by_title,
+        "updated": len(updates),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
@@ -0,0 +1,57 @@
+import hashlib
+import os
+import tempfile
+from typing import Tuple
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+# Bytes read from the client per await; only one chunk is in memory at a time.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def content_path(upload_dir: str, sha256: str, ext: str) -> str:
+    return os.path.join(upload_dir, "sha256", sha256[:2], f"{sha256}{ext}")
+
+
+def _write_chunk(f, chunk: bytes) -> None:
+    f.write(chunk)
+
+
+def _move_into_place(tmp_path: str, final_path: str) -> None:
+    if os.path.exists(final_path):
+        # Same bytes are already stored.
+        os.remove(tmp_path)
+        return
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    os.replace(tmp_path, final_path)
+
+
+async def store_upload(upload: UploadFile, upload_dir: str, default_ext: str) -> Tuple[str, str, int]:
+    """
+    Stream an upload to disk while hashing it, then move it to its
+    content-addressed path. Returns (path, sha256 hex digest, size in bytes).
+    Disk writes run in the threadpool so the event loop keeps serving others.
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    ext = os.path.splitext(upload.filename or "")[1].lower() or default_ext
+    fd, tmp_path = tempfile.mkstemp(dir=upload_dir, prefix=".upload-")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                await run_in_threadpool(_write_chunk, f, chunk)
+        sha256 = digest.hexdigest()
+        final_path = content_path(upload_dir, sha256, ext)
+        await run_in_threadpool(_move_into_place, tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return final_path, sha256, size
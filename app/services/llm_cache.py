@@ -0,0 +1,125 @@
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.llm_cache import LLMCacheEntry
+
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+_stats_lock = threading.Lock()
+
+
+def _bump(name: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += n
+
+
+def cache_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def cache_key(system_prompt: str, user_prompt: str, model_name: str, prompt_version: str) -> str:
+    h = hashlib.sha256()
+    for part in (model_name, prompt_version, system_prompt, user_prompt):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _is_expired(entry: LLMCacheEntry, now: datetime) -> bool:
+    ttl = settings.LLM_CACHE_TTL_SECONDS
+    return bool(ttl) and entry.created_at is not None and entry.created_at < now - timedelta(seconds=ttl)
+
+
+def get_cached(db: Session, key: str) -> Dict[str, Any] | None:
+    entry = db.get(LLMCacheEntry, key)
+    now = datetime.utcnow()
+    if entry is None or _is_expired(entry, now):
+        _bump("misses")
+        return None
+    entry.hit_count = (entry.hit_count or 0) + 1
+    entry.last_hit_at = now
+    _bump("hits")
+    return dict(entry.response)
+
+
+def cache_entry(key: str, model_name: str, prompt_version: str, response: Dict[str, Any]) -> Dict[str, Any]:
+    """A fresh llm_cache row, for put_cached."""
+    now = datetime.utcnow()
+    return {
+        "key": key,
+        "model_name": model_name,
+        "prompt_version": prompt_version,
+        "response": response,
+        "hit_count": 0,
+        "created_at": now,
+        "last_hit_at": now,
+    }
+
+
+def put_cached(db: Session, entries: list[Dict[str, Any]]) -> None:
+    """
+    Store cache_entry rows, replacing existing entries with the same key: one
+    INSERT .. ON CONFLICT DO UPDATE on SQLite/Postgres, a merge per row
+    elsewhere. Keys must be unique within `entries`. Runs in the caller's
+    transaction, so entries are committed together with their Decisions.
+    """
+    if not entries:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(LLMCacheEntry.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["key"],
+            set_={name: stmt.excluded[name] for name in entries[0] if name != "key"},
+        )
+        db.execute(stmt, entries)
+    else:
+        for entry in entries:
+            db.merge(LLMCacheEntry(**entry))
+    _bump("stores", len(entries))
+
+
+def evict(db: Session) -> int:
+    """
+    Drop entries past the TTL, then the least recently used ones beyond
+    LLM_CACHE_MAX_ENTRIES.
+    """
+    removed = 0
+    ttl = settings.LLM_CACHE_TTL_SECONDS
+    if ttl:
+        cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+        removed += (
+            db.query(LLMCacheEntry)
+            .filter(LLMCacheEntry.created_at < cutoff)
+            .delete(synchronize_session=False)
+        )
+
+    max_entries = settings.LLM_CACHE_MAX_ENTRIES
+    if max_entries:
+        excess = db.query(LLMCacheEntry).count() - max_entries
+        if excess > 0:
+            oldest = (
+                db.query(LLMCacheEntry.key)
+                .order_by(LLMCacheEntry.last_hit_at.asc())
+                .limit(excess)
+                .subquery()
+            )
+            removed += (
+                db.query(LLMCacheEntry)
+                .filter(LLMCacheEntry.key.in_(oldest.select()))
+                .delete(synchronize_session=False)
+            )
+
+    db.commit()
+    if removed:
+        _bump("evictions", removed)
+    return removed
@@ -0,0 +1,267 @@
+import abc
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, NamedTuple
+
+from app.core.config import settings
+from app.services.token_budget import estimate_tokens
+
+
+class LLMResponse(NamedTuple):
+    content: str
+    model: str
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+
+
+class LLMProviderError(Exception):
+    """
+    An error response from a provider. `http_status` and `headers` are what
+    the scheduler looks at to decide on retries and Retry-After.
+    """
+
+    def __init__(self, message: str, http_status: int | None = None, headers: Dict[str, str] | None = None):
+        super().__init__(message)
+        self.http_status = http_status
+        self.headers = headers or {}
+
+
+class LLMProvider(abc.ABC):
+    """
+    A chat-completion backend. `complete` is called from screening worker
+    threads and must be thread-safe; it raises on failure and leaves retries
+    to the scheduler.
+    """
+
+    name = "base"
+
+    def unavailable_reason(self) -> str | None:
+        """Why the provider can't be called (e.g. missing credentials), or None."""
+        return None
+
+    def qualified_model(self, model: str) -> str:
+        # Keeps cache entries and rate limits of different backends apart.
+        return f"{self.name}/{model}"
+
+    @abc.abstractmethod
+    def complete(
+        self, system_prompt: str, user_prompt: str, model: str, timeout: float, temperature: float = 0.1
+    ) -> LLMResponse:
+        ...
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def __init__(self, api_key: str | None):
+        self.api_key = api_key
+
+    def unavailable_reason(self) -> str | None:
+        return None if self.api_key else "OPENAI_API_KEY is not configured"
+
+    def qualified_model(self, model: str) -> str:
+        # Unprefixed, so cache entries written before providers existed stay valid.
+        return model
+
+    def complete(
+        self, system_prompt: str, user_prompt: str, model: str, timeout: float, temperature: float = 0.1
+    ) -> LLMResponse:
+        import openai
+
+        resp = openai.ChatCompletion.create(
+            api_key=self.api_key,
+            model=model,
+            temperature=temperature,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            request_timeout=timeout,
+        )
+        usage = getattr(resp, "usage", None) or {}
+        return LLMResponse(
+            content=resp.choices[0].message["content"],
+            model=getattr(resp, "model", model),
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+        )
+
+
+class HTTPProvider(LLMProvider):
+    """
+    Any server speaking the OpenAI chat-completions wire format (vLLM,
+    llama.cpp, Ollama, a mock server), e.g. a local model for load tests.
+    """
+
+    name = "http"
+
+    def __init__(self, base_url: str, api_key: str | None = None, model: str | None = None):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+
+    def complete(
+        self, system_prompt: str, user_prompt: str, model: str, timeout: float, temperature: float = 0.1
+    ) -> LLMResponse:
+        body = json.dumps(
+            {
+                "model": self.model or model,
+                "temperature": temperature,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+            }
+        ).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        req = urllib.request.Request(
+            f"{self.base_url}/v1/chat/completions", data=body, headers=headers, method="POST"
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                payload = json.load(resp)
+        except urllib.error.HTTPError as e:
+            raise LLMProviderError(
+                f"{self.base_url} returned HTTP {e.code}", http_status=e.code, headers=dict(e.headers or {})
+            ) from e
+        except urllib.error.URLError as e:
+            if isinstance(e.reason, TimeoutError):
+                raise TimeoutError(f"{self.base_url} timed out") from e
+            raise ConnectionError(f"{self.base_url} unreachable: {e.reason}") from e
+
+        usage = payload.get("usage") or {}
+        return LLMResponse(
+            content=payload["choices"][0]["message"]["content"],
+            model=payload.get("model") or self.model or model,
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+        )
+
+
+class FakeProvider(LLMProvider):
+    """
+    Offline, deterministic stand-in. Answers are derived from a hash of the
+    prompt, so the same record always gets the same decision; screening
+    prompts (single record or JSON batch) get well-formed answers, anything
+    else gets "{}". Latency and errors are injected from a seeded RNG, which
+    makes throughput and retry behaviour reproducible without a network.
+    """
+
+    name = "fake"
+
+    _DECISIONS = ("include", "exclude", "unclear")
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        latency_jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _decide(self, text: str) -> Dict[str, Any]:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        decision = self._DECISIONS[digest[0] % len(self._DECISIONS)]
+        words = text.split()
+        return {
+            "decision": decision,
+            "reasons": [f"Deterministic fake decision ({decision})."],
+            "verbatim_quote": " ".join(words[:8]),
+            "quote_location": "Title",
+            "qc_flag": decision == "unclear",
+            "human_action_required": decision == "unclear",
+        }
+
+    def _answer(self, user_prompt: str) -> str:
+        try:
+            records = json.loads(user_prompt)
+        except ValueError:
+            records = None
+        if isinstance(records, list):
+            return json.dumps(
+                [
+                    {"record_id": r.get("id"), **self._decide(f"{r.get('title', '')}\n{r.get('abstract', '')}")}
+                    for r in records
+                    if isinstance(r, dict)
+                ]
+            )
+        match = re.search(r"^Title: (.*)$", user_prompt, re.MULTILINE)
+        if match:
+            abstract = user_prompt.split("Abstract:", 1)[-1].strip()
+            return json.dumps(self._decide(f"{match.group(1)}\n{abstract}"))
+        return "{}"
+
+    def complete(
+        self, system_prompt: str, user_prompt: str, model: str, timeout: float, temperature: float = 0.1
+    ) -> LLMResponse:
+        with self._lock:
+            delay = self.latency_ms + self._rng.uniform(0, self.latency_jitter_ms)
+            fail = self._rng.random() < self.error_rate
+        delay /= 1000.0
+        if delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("fake provider timed out")
+        time.sleep(delay)
+        if fail:
+            headers = {"Retry-After": "1"} if self.error_status == 429 else {}
+            raise LLMProviderError(
+                f"injected HTTP {self.error_status}", http_status=self.error_status, headers=headers
+            )
+
+        content = self._answer(user_prompt)
+        return LLMResponse(
+            content=content,
+            model=f"fake-{model}",
+            prompt_tokens=estimate_tokens(system_prompt) + estimate_tokens(user_prompt),
+            completion_tokens=estimate_tokens(content),
+        )
+
+
+_provider: LLMProvider | None = None
+_provider_lock = threading.Lock()
+
+
+def _build_provider(name: str) -> LLMProvider:
+    if name == "openai":
+        return OpenAIProvider(settings.OPENAI_API_KEY)
+    if name == "http":
+        return HTTPProvider(settings.LLM_HTTP_BASE_URL, settings.LLM_HTTP_API_KEY, settings.LLM_HTTP_MODEL)
+    if name == "fake":
+        return FakeProvider(
+            latency_ms=settings.LLM_FAKE_LATENCY_MS,
+            latency_jitter_ms=settings.LLM_FAKE_LATENCY_JITTER_MS,
+            error_rate=settings.LLM_FAKE_ERROR_RATE,
+            error_status=settings.LLM_FAKE_ERROR_STATUS,
+            seed=settings.LLM_FAKE_SEED,
+        )
+    raise ValueError(f"Unknown LLM_PROVIDER {name!r}; expected openai, http or fake")
+
+
+def get_provider() -> LLMProvider:
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = _build_provider(settings.LLM_PROVIDER)
+        return _provider
+
+
+def set_provider(provider: LLMProvider | None) -> None:
+    """Swap the process-wide provider (benchmarks, load tests); None rebuilds it from settings."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
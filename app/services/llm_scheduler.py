@@ -0,0 +1,358 @@
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, TypeVar
+
+from app.core.config import settings
+from app.core.metrics import observe_llm_call
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Added to the prompt estimate when charging the token bucket, for the completion.
+COMPLETION_TOKENS_ESTIMATE = 500
+
+# HTTP statuses worth retrying; anything else (400, 401, 404, ...) fails at once.
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+_RETRYABLE_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "InternalServerError",
+    "RateLimitError",
+    "ServiceUnavailableError",
+    "Timeout",
+    "TryAgain",
+}
+
+
+class LLMUnavailableError(RuntimeError):
+    """
+    The provider could not be reached within the retry budget, or the circuit
+    breaker is open. `retry_after` is a hint in seconds, when one is known.
+    """
+
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(LLMUnavailableError):
+    pass
+
+
+def _status_of(exc: BaseException) -> int | None:
+    for attr in ("http_status", "status_code", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def _headers_of(exc: BaseException) -> Any:
+    headers = getattr(exc, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+    return headers or {}
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    """
+    Seconds to wait according to the error's Retry-After (or retry-after-ms)
+    header, if the provider sent one.
+    """
+    headers = _headers_of(exc)
+    try:
+        ms = headers.get("retry-after-ms") or headers.get("Retry-After-Ms")
+        value = headers.get("retry-after") or headers.get("Retry-After")
+    except AttributeError:
+        return None
+    if ms:
+        try:
+            return max(0.0, float(ms) / 1000.0)
+        except ValueError:
+            pass
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _is_timeout(exc: BaseException) -> bool:
+    return isinstance(exc, TimeoutError) or "Timeout" in type(exc).__name__
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    status = _status_of(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    return (
+        isinstance(exc, (TimeoutError, ConnectionError))
+        or type(exc).__name__ in _RETRYABLE_ERROR_NAMES
+    )
+
+
+class _TokenBucket:
+    """
+    Refills continuously at `per_minute` / 60 per second up to one minute's
+    worth. Callers reserve what they need and get back how long to wait, so
+    concurrent callers queue up fairly instead of spinning.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        with self.lock:
+            now = time.monotonic()
+            self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+            self.updated = now
+            self.available -= min(amount, self.capacity)
+            return 0.0 if self.available >= 0 else -self.available / self.rate
+
+
+class _CircuitBreaker:
+    """
+    Opens after `threshold` consecutive transient failures and rejects calls
+    for `reset_seconds`; then lets a single probe through (half-open) and
+    closes again on its success.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                return "open"
+            return "half_open"
+
+    def before_call(self) -> None:
+        with self.lock:
+            if self.opened_at is None:
+                return
+            remaining = self.reset_seconds - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                raise CircuitOpenError("LLM circuit breaker is open", retry_after=remaining)
+            if self.probing:
+                raise CircuitOpenError("LLM circuit breaker is half-open, probe in flight", retry_after=1.0)
+            self.probing = True
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self) -> bool:
+        """Returns True if this failure opened the circuit."""
+        with self.lock:
+            self.failures += 1
+            was_open = self.opened_at is not None
+            if self.probing or (self.threshold and self.failures >= self.threshold):
+                self.opened_at = time.monotonic()
+                self.probing = False
+                return not was_open
+            return False
+
+    def release_probe(self) -> None:
+        with self.lock:
+            self.probing = False
+
+
+class LLMScheduler:
+    """
+    Client-side traffic control for one model: request and token buckets
+    sized to the provider's RPM/TPM limits, a per-call timeout, retries with
+    exponential backoff and full jitter (Retry-After wins when present), and
+    a circuit breaker so an outage fails fast instead of piling up threads.
+
+    Thread-safe; every screening worker for a model shares one instance.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_retries: int,
+        timeout_seconds: float,
+        backoff_base_seconds: float,
+        backoff_max_seconds: float,
+        circuit_failure_threshold: int,
+        circuit_reset_seconds: float,
+    ):
+        self.model = model
+        self.requests = _TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = _TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_retries = max_retries
+        self.timeout_seconds = timeout_seconds
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.circuit = _CircuitBreaker(circuit_failure_threshold, circuit_reset_seconds)
+        # Set from a 429's Retry-After so every caller backs off, not just the one that got it.
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, float] = {
+            "calls": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "timeouts": 0,
+            "throttled": 0,
+            "throttle_delay_seconds": 0.0,
+            "backoff_delay_seconds": 0.0,
+            "circuit_opened": 0,
+            "circuit_rejected": 0,
+        }
+
+    def _bump(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self._stats[name] += n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+        out["throttle_delay_seconds"] = round(out["throttle_delay_seconds"], 3)
+        out["backoff_delay_seconds"] = round(out["backoff_delay_seconds"], 3)
+        out["circuit_state"] = self.circuit.state
+        return out
+
+    def _throttle(self, tokens: int) -> None:
+        delay = 0.0
+        if self.requests is not None:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens is not None and tokens:
+            delay = max(delay, self.tokens.reserve(tokens))
+        with self._lock:
+            delay = max(delay, self._paused_until - time.monotonic())
+        if delay > 0:
+            self._bump("throttled")
+            self._bump("throttle_delay_seconds", delay)
+            time.sleep(delay)
+
+    def _backoff(self, attempt: int, retry_after: float | None) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max_seconds) + random.uniform(0, self.backoff_base_seconds)
+        ceiling = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def call(self, request: Callable[[float], T], prompt_tokens: int = 0) -> T:
+        """
+        Run `request(timeout_seconds)` under the model's limits. Transient
+        failures (429, 5xx, timeouts, connection errors) are retried; other
+        errors propagate unchanged. Raises LLMUnavailableError when retries
+        run out or the circuit is open.
+        """
+        tokens = prompt_tokens + COMPLETION_TOKENS_ESTIMATE
+        attempt = 0
+        while True:
+            try:
+                self.circuit.before_call()
+            except CircuitOpenError:
+                self._bump("circuit_rejected")
+                raise
+
+            self._throttle(tokens)
+            self._bump("calls")
+            call_started = time.perf_counter()
+            try:
+                result = request(self.timeout_seconds)
+            except Exception as e:
+                observe_llm_call(self.model, time.perf_counter() - call_started, type(e).__name__)
+                if not _is_retryable(e):
+                    self.circuit.release_probe()
+                    self._bump("failed")
+                    raise
+
+                status = _status_of(e)
+                retry_after = _retry_after(e)
+                if status == 429:
+                    # Throttling is the provider working as intended, not an outage.
+                    self.circuit.release_probe()
+                    self._bump("rate_limited")
+                    if retry_after is not None:
+                        with self._lock:
+                            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                else:
+                    if _is_timeout(e):
+                        self._bump("timeouts")
+                    if self.circuit.record_failure():
+                        self._bump("circuit_opened")
+                        logger.warning("LLM circuit opened for %s after: %r", self.model, e)
+
+                if attempt >= self.max_retries:
+                    self._bump("failed")
+                    raise LLMUnavailableError(
+                        f"LLM call to {self.model} failed after {attempt + 1} attempt(s): {e}",
+                        retry_after=retry_after,
+                    ) from e
+
+                delay = self._backoff(attempt, retry_after)
+                attempt += 1
+                self._bump("retries")
+                self._bump("backoff_delay_seconds", delay)
+                logger.info("Retrying %s call in %.2fs (attempt %d): %r", self.model, delay, attempt, e)
+                time.sleep(delay)
+                continue
+
+            observe_llm_call(self.model, time.perf_counter() - call_started, "ok", result)
+            self.circuit.record_success()
+            self._bump("succeeded")
+            return result
+
+
+_schedulers: Dict[str, LLMScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(model: str) -> LLMScheduler:
+    with _schedulers_lock:
+        scheduler = _schedulers.get(model)
+        if scheduler is None:
+            scheduler = LLMScheduler(
+                model,
+                requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+                tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+                max_retries=settings.LLM_MAX_RETRIES,
+                timeout_seconds=settings.LLM_TIMEOUT_SECONDS,
+                backoff_base_seconds=settings.LLM_BACKOFF_BASE_SECONDS,
+                backoff_max_seconds=settings.LLM_BACKOFF_MAX_SECONDS,
+                circuit_failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+                circuit_reset_seconds=settings.LLM_CIRCUIT_RESET_SECONDS,
+            )
+            _schedulers[model] = scheduler
+        return scheduler
+
+
+def scheduler_stats() -> Dict[str, Dict[str, Any]]:
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return {s.model: s.stats() for s in schedulers}
@@ -1,18 +1,247 @@
+import hashlib
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterator, Sequence
+
 import fitz
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.pdf_text import PdfDocument, PdfPageText
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class PdfExtractionError(RuntimeError):
+    """A PDF kept killing the extraction workers, so its text is not available."""
+
+    def __init__(self, paths: Sequence[str]):
+        self.paths = list(paths)
+        super().__init__(f"PDF extraction crashed the worker pool: {', '.join(self.paths)}")
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ---- Worker side: runs in the pool processes, touches only the PDF ----
+
+def _page_count(path: str) -> int:
+    with fitz.open(path) as doc:
+        return doc.page_count
+
+
+def _extract_span(path: str, first: int, last: int) -> list[tuple[int, str]]:
+    """Text of pages first..last (1-based, inclusive)."""
+    with fitz.open(path) as doc:
+        last = min(last, doc.page_count)
+        return [(p, doc.load_page(p - 1).get_text("text")) for p in range(first, last + 1)]
+
+
+# ---- Pool ----
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ProcessPoolExecutor | None:
+    global _pool
+    if settings.PDF_EXTRACTION_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the server process has threads (screening jobs, audit writer).
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
 
-def extract_text_with_pages(pdf_path: str, max_chars: int = 20000):
-    doc = fitz.open(pdf_path)
+
+def _run_all(fn: Callable[..., Any], calls: list[tuple]) -> list[Any]:
+    """`fn(*args)` for every args tuple, spread over the pool; results in order."""
+    if not calls:
+        return []
+    pool = _executor()
+    if pool is None:
+        return [fn(*args) for args in calls]
+    results: list[Any] = [None] * len(calls)
+    pending = list(range(len(calls)))
+    for attempt in (1, 2):
+        failed = []
+        futures = {}
+        for i in pending:
+            try:
+                futures[i] = pool.submit(fn, *calls[i])
+            except BrokenProcessPool:
+                failed.append(i)
+        for i, f in futures.items():
+            try:
+                results[i] = f.result()
+            except (BrokenProcessPool, CancelledError):
+                failed.append(i)
+        if not failed:
+            return results
+        # A worker died (e.g. a PDF crashed MuPDF). Never rerun in-process: the
+        # same PDF would take the server down with it. One retry in a fresh pool.
+        shutdown_pool()
+        pending = sorted(failed)
+        if attempt == 1:
+            logger.warning("PDF extraction pool broke; retrying %d task(s) in a fresh pool", len(pending))
+            pool = _executor()
+    raise PdfExtractionError(sorted({calls[i][0] for i in pending}))
+
+
+# ---- Cache ----
+
+def _insert_ignore(db: Session, model, rows: list[dict]) -> None:
+    """Insert rows, skipping keys another request has already stored."""
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        db.execute(insert(model.__table__).on_conflict_do_nothing(), rows)
+        return
+    for row in rows:
+        db.merge(model(**row))
+
+
+def _spans(pages: Sequence[int], size: int) -> list[tuple[int, int]]:
+    """Sorted page numbers -> (first, last) runs of consecutive pages, at most `size` long."""
+    spans: list[tuple[int, int]] = []
+    for p in pages:
+        if spans and p == spans[-1][1] + 1 and p - spans[-1][0] < size:
+            spans[-1] = (spans[-1][0], p)
+        else:
+            spans.append((p, p))
+    return spans
+
+
+def _page_counts(db: Session, docs: Dict[str, str]) -> Dict[str, int]:
+    counts = dict(
+        db.execute(
+            select(PdfDocument.sha256, PdfDocument.page_count).where(PdfDocument.sha256.in_(list(docs)))
+        ).all()
+    )
+    unknown = [sha for sha in docs if sha not in counts]
+    if unknown:
+        found = _run_all(_page_count, [(docs[sha],) for sha in unknown])
+        counts.update(zip(unknown, found))
+        _insert_ignore(db, PdfDocument, [{"sha256": sha, "page_count": counts[sha]} for sha in unknown])
+        db.commit()
+    return counts
+
+
+def extract_documents(
+    docs: Sequence[tuple[str, str]], first: int = 1, last: int | None = None
+) -> Dict[str, list[Dict[str, Any]]]:
+    """
+    Per-page text of pages first..last (1-based, inclusive; last=None means
+    to the end) for many PDFs given as (path, sha256). Cached pages cost a
+    lookup; the rest are split into runs of PDF_PAGES_PER_TASK pages and
+    extracted in parallel across the pool, then cached. Returns
+    {sha256: [{"page", "text"}, ...]}.
+    """
+    paths = {sha: path for path, sha in docs}
+    if not paths:
+        return {}
+    first = max(1, first)
+    with SessionLocal() as db:
+        counts = _page_counts(db, paths)
+        wanted = {sha: range(first, min(last or counts[sha], counts[sha]) + 1) for sha in paths}
+
+        texts: Dict[str, Dict[int, str]] = {sha: {} for sha in paths}
+        upper = max((r.stop - 1 for r in wanted.values()), default=0)
+        if upper >= first:
+            rows = db.execute(
+                select(PdfPageText.sha256, PdfPageText.page, PdfPageText.text).where(
+                    PdfPageText.sha256.in_(list(paths)),
+                    PdfPageText.page >= first,
+                    PdfPageText.page <= upper,
+                )
+            ).all()
+            for row in rows:
+                texts[row.sha256][row.page] = row.text
+
+        tasks: list[tuple[str, int, int]] = []
+        for sha, pages in wanted.items():
+            missing = [p for p in pages if p not in texts[sha]]
+            tasks.extend((sha, a, b) for a, b in _spans(missing, max(1, settings.PDF_PAGES_PER_TASK)))
+        if tasks:
+            results = _run_all(_extract_span, [(paths[sha], a, b) for sha, a, b in tasks])
+            new_rows = []
+            for (sha, _, _), pages in zip(tasks, results):
+                for page, text in pages:
+                    texts[sha][page] = text
+                    new_rows.append({"sha256": sha, "page": page, "text": text})
+            _insert_ignore(db, PdfPageText, new_rows)
+            db.commit()
+
+    return {sha: [{"page": p, "text": texts[sha].get(p, "")} for p in pages] for sha, pages in wanted.items()}
+
+
+def get_pages(
+    path: str, sha256: str | None = None, first: int = 1, last: int | None = None
+) -> list[Dict[str, Any]]:
+    sha = sha256 or file_sha256(path)
+    return extract_documents([(path, sha)], first, last)[sha]
+
+
+def iter_pages(path: str, sha256: str | None = None, first: int = 1) -> Iterator[Dict[str, Any]]:
+    """
+    Pages from `first` on, extracted one window at a time so a caller that
+    stops early never pays for the rest of the file. A window is one run of
+    PDF_PAGES_PER_TASK pages per pool worker, so a single long PDF still
+    keeps every worker busy.
+    """
+    sha = sha256 or file_sha256(path)
+    step = max(1, settings.PDF_PAGES_PER_TASK) * max(1, settings.PDF_EXTRACTION_WORKERS)
+    while True:
+        pages = get_pages(path, sha, first, first + step - 1)
+        if not pages:
+            return
+        yield from pages
+        first += step
+
+
+def extract_text_with_pages(pdf_path: str, max_chars: int = 20000, sha256: str | None = None):
     pages = []
     total = 0
-    for i, page in enumerate(doc):
-        text = page.get_text("text")
+    for p in iter_pages(pdf_path, sha256):
+        text = p["text"]
         if not text:
             continue
         if total + len(text) > max_chars:
-            text = text[: max_chars - total]
-            pages.append({"page": i + 1, "text": text})
+            pages.append({"page": p["page"], "text": text[: max_chars - total]})
             break
-        pages.append({"page": i + 1, "text": text})
+        pages.append({"page": p["page"], "text": text})
         total += len(text)
     full_text = "\n".join(p["text"] for p in pages)
     return {"pages": pages, "full_text": full_text}
+
+
+def extract_text(pdf_path: str, max_chars: int = 20000, sha256: str | None = None) -> str:
+    return extract_text_with_pages(pdf_path, max_chars, sha256)["full_text"]
@@ -1,9 +1,10 @@
-import fitz
-import openai
 import json
-from app.core.config import settings
+from app.services.llm_provider import get_provider
+from app.services.pdf_extractor import extract_text
+from app.services.llm_scheduler import get_scheduler
+from app.services.token_budget import estimate_tokens
 
-openai.api_key = settings.OPENAI_API_KEY
+LLM_MODEL = "gpt-4o"
 
 SYSTEM_PROMPT = "You are a professional systematic reviewer. Extract structured inclusion/exclusion config from a protocol. Return ONLY valid JSON."
 
@@ -58,37 +59,21 @@ SCHEMA_HINT = '''
 }
 '''
 
-def _extract_text_from_pdf(path: str, max_chars: int = 12000) -> str:
-    doc = fitz.open(path)
-    texts = []
-    total = 0
-    for page in doc:
-        t = page.get_text("text")
-        if not t:
-            continue
-        if total + len(t) > max_chars:
-            t = t[: max_chars - total]
-            texts.append(t)
-            break
-        texts.append(t)
-        total += len(t)
-    return "\n".join(texts)
+# Protocol text sent to the model; the eligibility criteria are near the start.
+PROTOCOL_MAX_CHARS = 12000
 
-def extract_protocol_config(path: str) -> dict:
-    if not settings.OPENAI_API_KEY:
+def extract_protocol_config(path: str, sha256: str | None = None) -> dict:
+    provider = get_provider()
+    if provider.unavailable_reason():
         return {}
 
-    text = _extract_text_from_pdf(path)
+    text = extract_text(path, max_chars=PROTOCOL_MAX_CHARS, sha256=sha256)
     user_prompt = f"Protocol text:\n{text}\n\nSchema:\n{SCHEMA_HINT}\n\nReturn ONLY JSON."
-    resp = openai.ChatCompletion.create(
-        model="gpt-4o",
-        temperature=0.1,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": user_prompt},
-        ],
+    resp = get_scheduler(provider.qualified_model(LLM_MODEL)).call(
+        lambda timeout: provider.complete(SYSTEM_PROMPT, user_prompt, LLM_MODEL, timeout),
+        prompt_tokens=estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(user_prompt),
     )
-    raw = resp.choices[0].message["content"]
+    raw = resp.content
     try:
         data = json.loads(raw)
     except json.JSONDecodeError:
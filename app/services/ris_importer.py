@@ -1,9 +1,34 @@
+import logging
+import time
+import uuid
+from typing import Any, Dict, Iterator
+
 import rispy
 from sqlalchemy.orm import Session
-from typing import List
 from app.models.record import Record
 from app.models.file import File
 from app.models.project import Project
+from app.services.search_index import index_records_for_file
+
+logger = logging.getLogger(__name__)
+
+# Rows per executemany INSERT; the parsed file is never held in memory as a whole.
+IMPORT_BATCH_SIZE = 5000
+
+def iter_ris_entries(path: str) -> Iterator[dict]:
+    """
+    Entries of a RIS file, each yielded as soon as its ER tag is read. The
+    lines of one entry at a time go through rispy's public parse_lines, so
+    the file is never held in memory as a whole.
+    """
+    parser = rispy.RisParser()
+    entry: list[str] = []
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            entry.append(line)
+            if parser.parse_line(line)[0] == parser.END_TAG:
+                yield from parser.parse_lines(iter(entry))
+                entry = []
 
 def _compute_metadata_quality(title, abstract, year, language) -> float:
     score = 0
@@ -18,46 +43,67 @@ def _compute_metadata_quality(title, abstract, year, language) -> float:
         score += 1
     return score / total if total else 0.0
 
-def import_ris_for_file(db: Session, file: File) -> int:
+def _record_row(file_id: str, idx: int, entry: dict) -> Dict[str, Any]:
+    title = entry.get("title")
+    abstract = entry.get("abstract")
+    year = None
+    if "year" in entry:
+        try:
+            year = int(entry["year"])
+        except Exception:
+            year = None
+    language = entry.get("language")
+    journal = entry.get("journal_name") or entry.get("journal_name_full")
+    doi = entry.get("doi")
+    authors = None
+    if "authors" in entry and isinstance(entry["authors"], list):
+        authors = "; ".join(entry["authors"])
+
+    return {
+        "id": str(uuid.uuid4()),
+        "file_id": file_id,
+        "order_index": idx,
+        "title": title,
+        "abstract": abstract,
+        "year": year,
+        "language": language,
+        "sample_size": None,
+        "doi": doi,
+        "journal": journal,
+        "authors": authors,
+        "metadata_quality": _compute_metadata_quality(title, abstract, year, language),
+    }
+
+def import_ris_for_file(db: Session, file: File) -> Dict[str, Any]:
     project = db.get(Project, file.project_id)
     if not project:
         raise ValueError("Project not found for this file")
 
-    with open(file.path, "r", encoding="utf-8") as f:
-        entries: List[dict] = rispy.load(f)
-
+    started = time.perf_counter()
+    insert_stmt = Record.__table__.insert()
+    batch: list[Dict[str, Any]] = []
     count = 0
-    for idx, entry in enumerate(entries):
-        title = entry.get("title")
-        abstract = entry.get("abstract")
-        year = None
-        if "year" in entry:
-            try:
-                year = int(entry["year"])
-            except Exception:
-                year = None
-        language = entry.get("language")
-        journal = entry.get("journal_name") or entry.get("journal_name_full")
-        doi = entry.get("doi")
-        authors = None
-        if "authors" in entry and isinstance(entry["authors"], list):
-            authors = "; ".join(entry["authors"])
-
-        record = Record(
-            file_id=file.id,
-            order_index=idx,
-            title=title,
-            abstract=abstract,
-            year=year,
-            language=language,
-            sample_size=None,
-            doi=doi,
-            journal=journal,
-            authors=authors,
-            metadata_quality=_compute_metadata_quality(title, abstract, year, language),
-        )
-        db.add(record)
-        count += 1
 
+    for idx, entry in enumerate(iter_ris_entries(file.path)):
+        batch.append(_record_row(file.id, idx, entry))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            db.execute(insert_stmt, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.execute(insert_stmt, batch)
+        count += len(batch)
+
+    index_records_for_file(db, file.id)
+
+    # One transaction per file: a failed import leaves no partial records behind.
     db.commit()
-    return count
+
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed > 0 else float(count)
+    logger.info("Imported %d RIS records from %s in %.2fs (%.0f records/s)", count, file.path, elapsed, rate)
+    return {
+        "imported": count,
+        "seconds": round(elapsed, 3),
+        "records_per_second": round(rate, 1),
+    }
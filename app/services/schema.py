@@ -0,0 +1,108 @@
+import hashlib
+import logging
+import os
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from app.core.database import Base
+from app.models.file import File
+from app.models.project import Project
+from app.models.record import Record
+from app.models.screening_job import ScreeningJob
+
+logger = logging.getLogger(__name__)
+
+# Columns added to tables that databases created by earlier versions already have.
+# create_all only creates missing tables, so these are added here at startup.
+ADDED_COLUMNS = {
+    Project.__table__: ("screening_batch_size", "protocol_sha256"),
+    File.__table__: ("sha256", "size_bytes"),
+    Record.__table__: ("canonical_id", "duplicate_reason"),
+    ScreeningJob.__table__: ("active_key", "owner", "heartbeat_at"),
+}
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def add_missing_columns(engine: Engine, table, names: tuple[str, ...]) -> list[str]:
+    """
+    ALTER TABLE ... ADD COLUMN for each of `names` the table does not have
+    yet, typed as in the model. New columns are nullable, so no backfill is
+    needed for the ALTER to succeed. Returns the columns added.
+    """
+    existing = {c["name"] for c in inspect(engine).get_columns(table.name)}
+    added = []
+    with engine.begin() as conn:
+        for name in names:
+            if name in existing:
+                continue
+            column = table.columns[name]
+            ddl_type = column.type.compile(dialect=engine.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} {ddl_type}"))
+            added.append(name)
+    if added:
+        logger.info("Added column(s) %s to %s", ", ".join(added), table.name)
+    return added
+
+
+def create_missing_indexes(engine: Engine) -> list[str]:
+    """CREATE INDEX for every model index an existing table lacks. Returns the indexes created."""
+    insp = inspect(engine)
+    created = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {i["name"] for i in insp.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+                    created.append(index.name)
+    if created:
+        logger.info("Created index(es) %s", ", ".join(created))
+    return created
+
+
+def fill_record_order_keys(engine: Engine) -> None:
+    """
+    GET /records pages on (files.created_at, files.id, records.order_index,
+    records.id); a NULL there would drop rows from the keyset. Older
+    databases may have them, so they get the position they sorted at before.
+    """
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE records SET order_index = -1 WHERE order_index IS NULL"))
+        conn.execute(text("UPDATE files SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL"))
+
+
+def ensure_schema(engine: Engine) -> None:
+    """Bring tables created by earlier versions up to the current models. Idempotent."""
+    for table, names in ADDED_COLUMNS.items():
+        add_missing_columns(engine, table, names)
+    created = create_missing_indexes(engine)
+    if "ix_files_project_created" in created:
+        # First start on a database from before the (file, order) keyset.
+        fill_record_order_keys(engine)
+    backfill_file_hashes(engine)
+
+
+def backfill_file_hashes(engine: Engine) -> int:
+    """
+    Fill in sha256/size_bytes for files stored before uploads were hashed,
+    so they take part in identical-upload reuse. Files whose bytes are gone
+    keep NULL, which never matches an upload's digest.
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, path FROM files WHERE sha256 IS NULL")).all()
+    updates = []
+    for file_id, path in rows:
+        if not path or not os.path.isfile(path):
+            continue
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        updates.append({"id": file_id, "sha256": digest.hexdigest(), "size_bytes": os.path.getsize(path)})
+    if updates:
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE files SET sha256 = :sha256, size_bytes = :size_bytes WHERE id = :id"), updates)
+        logger.info("Hashed %d file(s) stored before content addressing", len(updates))
+    return len(updates)
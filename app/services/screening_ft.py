@@ -0,0 +1,599 @@
+import json
+import logging
+import math
+import re
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, NamedTuple, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.audit import ActorType
+from app.models.current_decision import CurrentDecision
+from app.models.decision import Decision, DecisionOutcome, DecisionStage
+from app.models.file import File
+from app.models.project import Project
+from app.models.record import Record
+from app.models.record_fulltext import RecordFullText
+from app.services import llm_cache
+from app.services.current_decisions import current_decision_join, decided_record_ids
+from app.services.llm_provider import get_provider
+from app.services.pdf_extractor import PdfExtractionError, extract_documents, file_sha256
+from app.services.screening_ta import PREFIX_TEMPLATE, LLM_MODEL, _DecisionWriter, _call_llm
+from app.services.token_budget import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+LLM_PROMPT_VERSION = "ft_llm_v1"
+
+# Records go to full-text screening when their title/abstract decision is one of these.
+ELIGIBLE_TA_OUTCOMES = (DecisionOutcome.include, DecisionOutcome.unclear)
+
+SYSTEM_PROMPT = """
+You are a professional systematic reviewer (PRISMA 2020, Cochrane).
+You are screening FULL-TEXT articles according to a given protocol configuration.
+You are NOT a chatbot; you are a decision engine.
+Conservative behavior:
+- If key information is missing, prefer UNCLEAR rather than inventing details.
+- Always explain your reasoning in structured, concise reasons.
+- Always provide at least one verbatim quote used for the decision.
+"""
+
+
+INSTRUCTIONS = """
+Task:
+The user message contains one record's metadata and numbered passages from its full text.
+Decide whether it should be INCLUDED, EXCLUDED, or marked UNCLEAR with respect to the protocol.
+
+Rules:
+- Use ONLY information from the passages shown. They are the passages most relevant to the
+  protocol's population, intervention, outcomes and study design, not the whole article.
+- If critical information (population, intervention, outcome, design) is not in the passages, mark UNCLEAR.
+- Always provide one verbatim quote, copied exactly from a single passage, that supports your decision,
+  and the id of that passage (e.g. "C4").
+
+Return ONLY valid JSON with this schema:
+
+{
+  "decision": "include" | "exclude" | "unclear",
+  "reasons": [string],
+  "verbatim_quote": string,
+  "quote_chunk": string,
+  "qc_flag": boolean,
+  "human_action_required": boolean
+}
+"""
+
+
+USER_TEMPLATE = """Record metadata:
+Title: {title}
+Year: {year}
+Language: {language}
+
+Full-text passages ({shown} of {total}, in page order):
+
+{passages}
+"""
+
+
+# ---- Chunking ----
+
+_SECTION_NAMES = (
+    "abstract", "summary", "background", "introduction", "objectives?", "aims?",
+    "methods?", "materials and methods", "patients and methods", "methodology", "study design",
+    "design", "setting", "participants", "population", "eligibility criteria", "interventions?",
+    "outcomes?", "outcome measures", "statistical analysis", "results", "findings", "discussion",
+    "conclusions?", "limitations", "references", "bibliography", "acknowledge?ments",
+    "funding", "conflicts? of interest", "appendix", "supplementary material",
+)
+_HEADING_RE = re.compile(
+    r"^\s*(?:\d+(?:\.\d+)*\.?\s+)?(" + "|".join(_SECTION_NAMES) + r")\s*:?\s*$", re.IGNORECASE
+)
+# Sections that never help an eligibility decision and would only take up the token budget.
+_SKIPPED_SECTIONS = {"references", "bibliography", "acknowledgements", "acknowledgments"}
+
+
+class Chunk(NamedTuple):
+    id: str
+    page: int
+    section: str | None
+    text: str
+
+
+def _clean(text: str) -> str:
+    text = re.sub(r"-\n(?=[a-z])", "", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def chunk_pages(pages: list[Dict[str, Any]], max_tokens: int) -> list[Chunk]:
+    """
+    Split extracted pages into chunks that never cross a page or a section
+    heading, of at most about `max_tokens` tokens each. The section carries
+    over page breaks; reference lists and acknowledgements are dropped.
+    """
+    chunks: list[Chunk] = []
+    limit = max(1, max_tokens)
+    section: str | None = None
+
+    def flush(page: int, lines: list[str]) -> None:
+        text = _clean("\n".join(lines))
+        if not text or (section or "").lower() in _SKIPPED_SECTIONS:
+            return
+        while text:
+            part, _ = truncate_to_tokens(text, limit)
+            if part.endswith(" [...]"):
+                part = part[: -len(" [...]")]
+            text = text[len(part):].strip()
+            chunks.append(Chunk(f"C{len(chunks) + 1}", page, section, part))
+
+    for p in pages:
+        lines: list[str] = []
+        for line in (p["text"] or "").splitlines():
+            m = _HEADING_RE.match(line) if len(line) < 60 else None
+            if m:
+                flush(p["page"], lines)
+                lines = []
+                section = m.group(1).strip().lower()
+                continue
+            lines.append(line)
+        flush(p["page"], lines)
+    return chunks
+
+
+# ---- Ranking ----
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or than that the their "
+    "there these this those to was were which with within without who whom not no any all".split()
+)
+
+
+def _stem(token: str) -> str:
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def _tokens(text: str) -> list[str]:
+    return [_stem(t) for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS and len(t) > 1]
+
+
+def protocol_facets(protocol_config: Dict[str, Any] | None) -> Dict[str, list[str]]:
+    """Query terms per PICO/design facet of the protocol."""
+    cfg = protocol_config or {}
+
+    def gather(section: str, *keys: str) -> list[str]:
+        block = cfg.get(section) or {}
+        if not isinstance(block, dict):
+            return []
+        parts: list[str] = []
+        for key in keys:
+            value = block.get(key)
+            if isinstance(value, str):
+                parts.append(value)
+            elif isinstance(value, list):
+                parts.extend(str(v) for v in value if isinstance(v, str))
+        return _tokens(" ".join(parts))
+
+    facets = {
+        "population": gather("population", "free_text", "include_keywords"),
+        "intervention": gather("interventions", "free_text", "include_keywords"),
+        "comparator": gather("comparators", "free_text"),
+        "outcome": gather("outcomes", "required_topics"),
+        "design": gather("study_design", "include"),
+    }
+    return {name: terms for name, terms in facets.items() if terms}
+
+
+class _BM25:
+    """Okapi BM25 over one paper's chunks; the corpus statistics are the paper's own."""
+
+    def __init__(self, docs: list[list[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.tf = [Counter(d) for d in docs]
+        self.lengths = [len(d) for d in docs]
+        self.avg_len = (sum(self.lengths) / len(docs)) if docs else 0.0
+        df: Counter = Counter()
+        for counts in self.tf:
+            df.update(counts.keys())
+        n = len(docs)
+        self.idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    def scores(self, query: list[str]) -> list[float]:
+        terms = set(query)
+        out = []
+        for counts, length in zip(self.tf, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_len) if self.avg_len else self.k1
+            score = 0.0
+            for t in terms:
+                f = counts.get(t)
+                if f:
+                    score += self.idf[t] * f * (self.k1 + 1) / (f + norm)
+            out.append(score)
+        return out
+
+
+def select_chunks(
+    chunks: list[Chunk], facets: Dict[str, list[str]], top_k: int
+) -> list[Tuple[Chunk, float]]:
+    """
+    Up to `top_k` chunks, in page order, with their BM25 score against all
+    protocol terms. The first chunk (title and abstract, usually) is always
+    kept, then the best chunk for each facet so that every criterion gets
+    evidence, then the best remaining chunks overall.
+    """
+    if not chunks or top_k <= 0:
+        return []
+    index = _BM25([_tokens(c.text) for c in chunks])
+    overall = index.scores([t for terms in facets.values() for t in terms])
+
+    chosen: list[int] = [0]
+    for terms in facets.values():
+        if len(chosen) >= top_k:
+            break
+        facet_scores = index.scores(terms)
+        best = max(range(len(chunks)), key=lambda i: (facet_scores[i], -i))
+        if facet_scores[best] > 0 and best not in chosen:
+            chosen.append(best)
+    for i in sorted(range(len(chunks)), key=lambda i: (-overall[i], i)):
+        if len(chosen) >= top_k:
+            break
+        if i not in chosen and overall[i] > 0:
+            chosen.append(i)
+    return [(chunks[i], overall[i]) for i in sorted(chosen[:top_k])]
+
+
+# ---- Prompting ----
+
+def build_system_prompt(protocol_config: Dict[str, Any] | None) -> str:
+    # Same layout as the title/abstract prefix: byte-identical for a protocol, so it caches.
+    protocol_json = json.dumps(protocol_config or {}, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+    return PREFIX_TEMPLATE.format(system_prompt=SYSTEM_PROMPT, protocol_json=protocol_json, instructions=INSTRUCTIONS)
+
+
+def _location(chunk: Chunk) -> str:
+    return f"Page {chunk.page}, {chunk.section.title()}" if chunk.section else f"Page {chunk.page}"
+
+
+def _build_user_prompt(record: Record, selected: list[Tuple[Chunk, float]], total_chunks: int) -> str:
+    passages = "\n\n".join(f"[{c.id}] {_location(c)}\n{c.text}" for c, _ in selected)
+    return USER_TEMPLATE.format(
+        title=record.title or "",
+        year=record.year or "",
+        language=record.language or "",
+        shown=len(selected),
+        total=total_chunks,
+        passages=passages,
+    )
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def _quote_chunk(data: Dict[str, Any], selected: list[Tuple[Chunk, float]]) -> Chunk | None:
+    """
+    The passage the quote comes from: the one the model named if the quote is
+    really in it, otherwise whichever shown passage contains the quote.
+    """
+    quote = _normalize(str(data.get("verbatim_quote") or ""))
+    if not quote:
+        return None
+    by_id = {c.id: c for c, _ in selected}
+    named = by_id.get(str(data.get("quote_chunk") or "").strip().strip("[]"))
+    if named is not None and quote in _normalize(named.text):
+        return named
+    for c, _ in selected:
+        if quote in _normalize(c.text):
+            return c
+    return None
+
+
+class _Prepared(NamedTuple):
+    record: Record
+    sha256: str
+    system_prompt: str
+    user_prompt: str
+    selected: list[Tuple[Chunk, float]]
+    total_chunks: int
+    pages: int
+    tokens_unsent: int
+
+
+def _prepare(
+    record: Record, sha256: str, pages: list[Dict[str, Any]], system_prompt: str, facets: Dict[str, list[str]]
+) -> _Prepared:
+    chunks = chunk_pages(pages, settings.SCREENING_FT_CHUNK_TOKENS)
+    selected = select_chunks(chunks, facets, settings.SCREENING_FT_TOP_K_CHUNKS)
+    sent = {c.id for c, _ in selected}
+    return _Prepared(
+        record=record,
+        sha256=sha256,
+        system_prompt=system_prompt,
+        user_prompt=_build_user_prompt(record, selected, len(chunks)),
+        selected=selected,
+        total_chunks=len(chunks),
+        pages=len(pages),
+        tokens_unsent=sum(estimate_tokens(c.text) for c in chunks if c.id not in sent),
+    )
+
+
+def _persist_ft_decision(
+    writer: _DecisionWriter,
+    project_id: str,
+    prep: _Prepared,
+    data: Dict[str, Any],
+    cache_key: str | None = None,
+    cache_hit: bool = False,
+) -> str:
+    decision_value = data.get("decision", "unclear")
+    if decision_value not in ["include", "exclude", "unclear"]:
+        decision_value = "unclear"
+
+    reasons = data.get("reasons") or []
+    if not isinstance(reasons, list):
+        reasons = [str(reasons)]
+
+    verbatim_quote = data.get("verbatim_quote") or ""
+    source = _quote_chunk(data, prep.selected)
+    # A quote we cannot place in the text shown to the model needs a human check.
+    qc_flag = bool(data.get("qc_flag", False)) or source is None
+    quote_location = _location(source) if source is not None else "Full text"
+    model_name = data.get("_model_name", LLM_MODEL)
+
+    if cache_key and not cache_hit and not data.get("_fallback"):
+        writer.cache(cache_key, LLM_PROMPT_VERSION, data)
+
+    request_payload: Dict[str, Any] = {
+        "record_id": prep.record.id,
+        "file_sha256": prep.sha256,
+        "pages": prep.pages,
+        "chunks_total": prep.total_chunks,
+        "chunks_sent": [
+            {"chunk": c.id, "page": c.page, "section": c.section, "score": round(score, 3)}
+            for c, score in prep.selected
+        ],
+    }
+    if cache_hit:
+        request_payload.update({"cache_hit": True, "cache_key": cache_key})
+
+    now = datetime.utcnow()
+    decision_id = str(uuid.uuid4())
+    writer.add(
+        {
+            "id": decision_id,
+            "record_id": prep.record.id,
+            "stage": DecisionStage.full_text,
+            "decision": DecisionOutcome(decision_value),
+            "reasons": reasons,
+            "verbatim_quote": verbatim_quote,
+            "quote_location": quote_location,
+            "qc_flag": qc_flag,
+            "created_by": "AI",
+            "created_at": now,
+            "model_name": model_name,
+            "prompt_version": LLM_PROMPT_VERSION,
+        },
+        {
+            "id": str(uuid.uuid4()),
+            "decision_id": decision_id,
+            "record_id": prep.record.id,
+            "project_id": project_id,
+            "actor_type": ActorType.AI,
+            "actor_id": "AI_FT",
+            "action": "LLM_FT_DECISION_CACHED" if cache_hit else "LLM_FT_DECISION",
+            "model_name": model_name,
+            "prompt_version": LLM_PROMPT_VERSION,
+            "request_payload": request_payload,
+            "response_payload": data,
+            "created_at": now,
+        },
+        stat="screened_by_llm",
+    )
+    return decision_id
+
+
+def _lookup_cache(db: Session, prep: _Prepared, use_cache: bool = True) -> Tuple[str | None, Dict[str, Any] | None]:
+    if not (use_cache and settings.LLM_CACHE_ENABLED):
+        return None, None
+    key = llm_cache.cache_key(
+        prep.system_prompt, prep.user_prompt, get_provider().qualified_model(LLM_MODEL), LLM_PROMPT_VERSION
+    )
+    return key, llm_cache.get_cached(db, key)
+
+
+def _full_text_of(db: Session, record_id: str) -> File | None:
+    return (
+        db.query(File)
+        .join(RecordFullText, RecordFullText.file_id == File.id)
+        .filter(RecordFullText.record_id == record_id)
+        .first()
+    )
+
+
+def screen_record_full_text(db: Session, project: Project, record: Record) -> Decision | None:
+    """Screen one record's attached full text now. None if it has no full text."""
+    pdf = _full_text_of(db, record.id)
+    if pdf is None:
+        return None
+    sha = pdf.sha256 or file_sha256(pdf.path)
+    pages = extract_documents([(pdf.path, sha)])[sha]
+    prep = _prepare(record, sha, pages, build_system_prompt(project.protocol_config), protocol_facets(project.protocol_config))
+    writer = _DecisionWriter(db, batch_size=1, async_audit=True)
+    key, cached = _lookup_cache(db, prep)
+    if cached is not None:
+        decision_id = _persist_ft_decision(writer, project.id, prep, cached, cache_key=key, cache_hit=True)
+    else:
+        data = _call_llm(prep.system_prompt, prep.user_prompt)
+        decision_id = _persist_ft_decision(writer, project.id, prep, data, cache_key=key)
+    return db.get(Decision, decision_id)
+
+
+def _extract_window(part: list[Tuple[Record, str, str]], stats: Dict[str, Any]) -> Dict[str, list]:
+    """Page texts for a window of PDFs; a PDF that crashes the extraction pool is left out."""
+    docs = [(path, sha) for _, path, sha in part]
+    try:
+        return extract_documents(docs)
+    except PdfExtractionError:
+        pass
+    # Some PDF in the window crashes the workers: find it by extracting one at a time.
+    texts: Dict[str, list] = {}
+    for path, sha in docs:
+        try:
+            texts.update(extract_documents([(path, sha)]))
+        except PdfExtractionError as e:
+            logger.warning("Skipping full text %s: %s", path, e)
+    stats["skipped_unreadable_pdf"] += sum(1 for _, _, sha in part if sha not in texts)
+    return texts
+
+
+def run_full_text_screening_for_project(
+    db: Session,
+    project_id: str,
+    max_concurrency: int | None = None,
+    on_progress: Callable[[Dict[str, Any]], None] | None = None,
+    should_cancel: Callable[[], bool] | None = None,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    """
+    Screen the full texts of records included (or left unclear) at title/
+    abstract. Records are handled in windows: the window's PDFs are extracted
+    in parallel by the PDF pool, each paper is chunked and ranked locally,
+    and only the selected passages go to the model, with up to
+    `max_concurrency` calls in flight.
+    """
+    project = db.get(Project, project_id)
+    if not project:
+        raise ValueError("Project not found")
+
+    max_concurrency = max(1, max_concurrency or settings.SCREENING_MAX_CONCURRENCY)
+
+    rows = (
+        db.query(Record, Decision.decision, RecordFullText.file_id)
+        .join(File, Record.file_id == File.id)
+        .outerjoin(CurrentDecision, current_decision_join(DecisionStage.title_abstract))
+        .outerjoin(Decision, Decision.id == CurrentDecision.decision_id)
+        .outerjoin(RecordFullText, RecordFullText.record_id == Record.id)
+        .filter(File.project_id == project_id)
+        .order_by(File.created_at, Record.order_index, Record.id)
+        .all()
+    )
+    pdf_files = {
+        f.id: (f.path, f.sha256)
+        for f in db.query(File).filter(File.id.in_([r.file_id for r in rows if r.file_id])).all()
+    }
+    for row in rows:
+        db.expunge(row.Record)
+
+    stats: Dict[str, Any] = {
+        "total_records_seen": len(rows),
+        "skipped_already_decided": 0,
+        "screened_by_rules": 0,
+        "screened_by_llm": 0,
+        "skipped_duplicates": 0,
+        "skipped_not_eligible": 0,
+        "skipped_without_full_text": 0,
+        "skipped_unreadable_pdf": 0,
+        "cache_hits": 0,
+        "cache_misses": 0,
+        "pages_extracted": 0,
+        "chunks_total": 0,
+        "chunks_sent": 0,
+        "prompt_tokens_estimated": 0,
+        "prompt_tokens_saved": 0,
+    }
+
+    def report() -> None:
+        if on_progress is not None:
+            on_progress(stats)
+
+    decided_ids = decided_record_ids(db, project_id, DecisionStage.full_text)
+    todo: list[Tuple[Record, str, str]] = []
+    for row in rows:
+        rec = row.Record
+        if rec.id in decided_ids:
+            stats["skipped_already_decided"] += 1
+        elif rec.canonical_id is not None:
+            stats["skipped_duplicates"] += 1
+        elif row.decision not in ELIGIBLE_TA_OUTCOMES:
+            stats["skipped_not_eligible"] += 1
+        elif row.file_id is None:
+            stats["skipped_without_full_text"] += 1
+        else:
+            path, sha = pdf_files[row.file_id]
+            todo.append((rec, path, sha or file_sha256(path)))
+    report()
+
+    system_prompt = build_system_prompt(project.protocol_config)
+    facets = protocol_facets(project.protocol_config)
+    writer = _DecisionWriter(db, settings.SCREENING_COMMIT_BATCH_SIZE, stats)
+    window = max_concurrency * 4
+    cancelled = False
+    first_error: Exception | None = None
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="ft-screening") as pool:
+            for start in range(0, len(todo), window):
+                if first_error is not None:
+                    break
+                if should_cancel is not None and should_cancel():
+                    cancelled = True
+                    break
+                part = todo[start : start + window]
+                texts = _extract_window(part, stats)
+
+                calls = []
+                for rec, _, sha in part:
+                    if sha not in texts:
+                        continue
+                    prep = _prepare(rec, sha, texts[sha], system_prompt, facets)
+                    stats["pages_extracted"] += prep.pages
+                    stats["chunks_total"] += prep.total_chunks
+                    stats["chunks_sent"] += len(prep.selected)
+                    stats["prompt_tokens_saved"] += prep.tokens_unsent
+                    key, cached = _lookup_cache(db, prep, use_cache)
+                    if cached is not None:
+                        _persist_ft_decision(writer, project_id, prep, cached, cache_key=key, cache_hit=True)
+                        stats["cache_hits"] += 1
+                        continue
+                    if key is not None:
+                        stats["cache_misses"] += 1
+                    stats["prompt_tokens_estimated"] += estimate_tokens(prep.system_prompt) + estimate_tokens(
+                        prep.user_prompt
+                    )
+                    calls.append((prep, key, pool.submit(_call_llm, prep.system_prompt, prep.user_prompt)))
+
+                # Results are persisted on this thread; the workers never touch the session.
+                for prep, key, fut in calls:
+                    try:
+                        data = fut.result()
+                    except Exception as e:
+                        # Stop starting new windows but keep the answers already paid for.
+                        if first_error is None:
+                            first_error = e
+                        continue
+                    _persist_ft_decision(writer, project_id, prep, data, cache_key=key)
+                report()
+    finally:
+        writer.flush()
+    if first_error is not None:
+        raise first_error
+    if use_cache and settings.LLM_CACHE_ENABLED:
+        llm_cache.evict(db)
+    report()
+
+    return {
+        "project_id": project_id,
+        **stats,
+        "max_concurrency": max_concurrency,
+        "top_k_chunks": settings.SCREENING_FT_TOP_K_CHUNKS,
+        "chunk_tokens": settings.SCREENING_FT_CHUNK_TOKENS,
+        "cancelled": cancelled,
+    }
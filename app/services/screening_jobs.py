@@ -0,0 +1,366 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any
+
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.decision import DecisionStage
+from app.models.screening_job import ScreeningJob, JobStatus, ACTIVE_JOB_STATUSES
+from app.services.screening_ft import run_full_text_screening_for_project
+from app.services.screening_ta import run_title_abstract_screening_for_project
+
+logger = logging.getLogger(__name__)
+
+# Progress rows and cancel flags are read/written at most this often per job,
+# so a fast rules-only pass doesn't turn into one UPDATE per record.
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+# A running job belongs to the process that claimed it for as long as that
+# process renews the lease; after this long without a renewal any process
+# may take the job over. Leases are renewed (and orphaned jobs picked up)
+# every JOB_HEARTBEAT_SECONDS.
+JOB_LEASE_SECONDS = 60.0
+JOB_HEARTBEAT_SECONDS = 15.0
+
+# The screening run behind each job stage; all take the same arguments.
+STAGE_RUNNERS = {
+    DecisionStage.title_abstract: run_title_abstract_screening_for_project,
+    DecisionStage.full_text: run_full_text_screening_for_project,
+}
+
+# Identifies this process as a job owner; every API worker process has its own.
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Jobs this process is running, and those whose lease another process has since taken.
+_running: set[str] = set()
+_lost: set[str] = set()
+_running_lock = threading.Lock()
+
+
+def _active_key(project_id: str, stage: DecisionStage) -> str:
+    return f"{project_id}:{DecisionStage(stage).value}"
+
+
+def _lease_expired(now: datetime):
+    return or_(ScreeningJob.heartbeat_at.is_(None), ScreeningJob.heartbeat_at < now - timedelta(seconds=JOB_LEASE_SECONDS))
+
+
+def _claimable(now: datetime):
+    """Queued, or running under a lease nobody has renewed (its process is gone)."""
+    return or_(
+        ScreeningJob.status == JobStatus.queued,
+        and_(ScreeningJob.status == JobStatus.running, _lease_expired(now)),
+    )
+
+
+def get_active_job_for_project(
+    db: Session, project_id: str, stage: DecisionStage = DecisionStage.title_abstract
+) -> ScreeningJob | None:
+    return (
+        db.query(ScreeningJob)
+        .filter(
+            ScreeningJob.project_id == project_id,
+            ScreeningJob.stage == stage,
+            ScreeningJob.status.in_(ACTIVE_JOB_STATUSES),
+        )
+        .order_by(ScreeningJob.created_at.desc())
+        .first()
+    )
+
+
+def create_screening_job(
+    db: Session,
+    project_id: str,
+    max_concurrency: int | None = None,
+    use_cache: bool = True,
+    stage: DecisionStage = DecisionStage.title_abstract,
+) -> tuple[ScreeningJob, bool]:
+    """
+    Queue a job unless the project already has an active one for the stage.
+    Returns (job, created); when another request won the race, that request's
+    job is returned with created=False.
+    """
+    while True:
+        job = ScreeningJob(
+            project_id=project_id,
+            stage=stage,
+            status=JobStatus.queued,
+            active_key=_active_key(project_id, stage),
+            max_concurrency=max_concurrency,
+            use_cache=use_cache,
+            created_at=datetime.utcnow(),
+            updated_at=datetime.utcnow(),
+        )
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            active = get_active_job_for_project(db, project_id, stage)
+            if active is not None:
+                return active, False
+            continue  # it finished in between; try again
+        db.refresh(job)
+        return job, True
+
+
+def request_cancel(db: Session, job: ScreeningJob) -> ScreeningJob:
+    if job.status not in ACTIVE_JOB_STATUSES:
+        return job
+    now = datetime.utcnow()
+    job.cancel_requested = True
+    job.updated_at = now
+    db.commit()
+    # Nobody will pick the flag up from a queued job or one whose owner is gone,
+    # so finish those here. The same condition a claim checks keeps the two atomic.
+    db.execute(
+        update(ScreeningJob)
+        .where(ScreeningJob.id == job.id, _claimable(now))
+        .values(status=JobStatus.cancelled, active_key=None, finished_at=now, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _claim(job_id: str) -> bool:
+    """Atomically make this process the job's owner; False if it is not claimable."""
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        claimed = db.execute(
+            update(ScreeningJob)
+            .where(ScreeningJob.id == job_id, _claimable(now))
+            .values(
+                status=JobStatus.running,
+                owner=WORKER_ID,
+                heartbeat_at=now,
+                attempts=func.coalesce(ScreeningJob.attempts, 0) + 1,
+                started_at=func.coalesce(ScreeningJob.started_at, now),
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+    return claimed == 1
+
+
+def start_screening_job(job_id: str) -> bool:
+    """
+    Claim the job and run it on a daemon thread. Returns False if it is not
+    claimable: finished, or running under a live lease (in any process).
+    """
+    with _running_lock:
+        if job_id in _running:
+            return False
+        _running.add(job_id)
+    if not _claim(job_id):
+        with _running_lock:
+            _running.discard(job_id)
+        return False
+    thread = threading.Thread(
+        target=_run_job, args=(job_id,), name=f"screening-job-{job_id}", daemon=True
+    )
+    thread.start()
+    return True
+
+
+def resume_interrupted_jobs() -> int:
+    """
+    Take over jobs left queued, or running under an expired lease, by a
+    process that is gone. Screening skips records that already have a
+    decision, so each one resumes where it stopped. Every worker process
+    runs this; the claim makes sure only one of them gets each job.
+    """
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        job_ids = [
+            job_id
+            for (job_id,) in db.query(ScreeningJob.id)
+            .filter(_claimable(now))
+            .order_by(ScreeningJob.created_at)
+            .all()
+        ]
+    finally:
+        db.close()
+
+    resumed = 0
+    for job_id in job_ids:
+        if start_screening_job(job_id):
+            resumed += 1
+    if resumed:
+        logger.info("Resumed %d interrupted screening job(s)", resumed)
+    return resumed
+
+
+def renew_leases() -> None:
+    """Renew the lease of every job this process runs; a job whose lease was taken over is marked lost."""
+    with _running_lock:
+        job_ids = list(_running - _lost)
+    if not job_ids:
+        return
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        for job_id in job_ids:
+            renewed = db.execute(
+                update(ScreeningJob)
+                .where(
+                    ScreeningJob.id == job_id,
+                    ScreeningJob.owner == WORKER_ID,
+                    ScreeningJob.status == JobStatus.running,
+                )
+                .values(heartbeat_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            if not renewed:
+                with _running_lock:
+                    if job_id in _running:
+                        _lost.add(job_id)
+
+
+class _JobLeaseWorker:
+    """Renews this process's leases and picks up jobs orphaned by dead processes."""
+
+    def __init__(self):
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="screening-job-leases", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                renew_leases()
+                resume_interrupted_jobs()
+            except Exception:
+                logger.exception("Screening job lease renewal failed")
+            self._stop.wait(JOB_HEARTBEAT_SECONDS)
+
+
+job_lease_worker = _JobLeaseWorker()
+
+
+def _lease_lost(job_id: str) -> bool:
+    with _running_lock:
+        return job_id in _lost
+
+
+def _run_job(job_id: str) -> None:
+    db = SessionLocal()
+    try:
+        job = db.get(ScreeningJob, job_id)
+        if job is None or job.owner != WORKER_ID or job.status != JobStatus.running:
+            return
+        if job.cancel_requested:
+            _finish(db, job, JobStatus.cancelled)
+            return
+
+        # Counters carried over from an earlier attempt of the same job; those
+        # records show up as "already decided" in this attempt.
+        base_rules = job.screened_by_rules or 0
+        base_llm = job.screened_by_llm or 0
+
+        last_write = 0.0
+        last_cancel_check = 0.0
+        cancel_seen = False
+
+        def on_progress(stats: Dict[str, Any]) -> None:
+            nonlocal last_write
+            now = time.monotonic()
+            if now - last_write < PROGRESS_INTERVAL_SECONDS or _lease_lost(job_id):
+                return
+            last_write = now
+            _write_progress(db, job, stats, base_rules, base_llm)
+
+        def should_cancel() -> bool:
+            nonlocal last_cancel_check, cancel_seen
+            # Another process owns the job now: stop without touching its row.
+            if _lease_lost(job_id):
+                return True
+            now = time.monotonic()
+            if cancel_seen or now - last_cancel_check < PROGRESS_INTERVAL_SECONDS:
+                return cancel_seen
+            last_cancel_check = now
+            flag = (
+                db.query(ScreeningJob.cancel_requested)
+                .filter(ScreeningJob.id == job.id)
+                .scalar()
+            )
+            cancel_seen = bool(flag)
+            return cancel_seen
+
+        run = STAGE_RUNNERS[DecisionStage(job.stage or DecisionStage.title_abstract)]
+        summary = run(
+            db,
+            job.project_id,
+            max_concurrency=job.max_concurrency,
+            on_progress=on_progress,
+            should_cancel=should_cancel,
+            use_cache=job.use_cache is not False,
+        )
+        if _lease_lost(job_id):
+            logger.warning("Screening job %s was taken over by another process", job_id)
+            return
+        _write_progress(db, job, summary, base_rules, base_llm)
+        _finish(db, job, JobStatus.cancelled if summary.get("cancelled") else JobStatus.completed)
+    except Exception as e:
+        logger.exception("Screening job %s failed", job_id)
+        db.rollback()
+        job = db.get(ScreeningJob, job_id)
+        if job is not None and job.owner == WORKER_ID and not _lease_lost(job_id):
+            job.error = str(e)
+            _finish(db, job, JobStatus.failed)
+    finally:
+        db.close()
+        with _running_lock:
+            _running.discard(job_id)
+            _lost.discard(job_id)
+
+
+def _write_progress(
+    db: Session, job: ScreeningJob, stats: Dict[str, Any], base_rules: int, base_llm: int
+) -> None:
+    by_rules = base_rules + stats["screened_by_rules"]
+    by_llm = base_llm + stats["screened_by_llm"]
+    skipped = max(0, stats["skipped_already_decided"] - base_rules - base_llm)
+
+    job.total_records = stats["total_records_seen"]
+    job.screened_by_rules = by_rules
+    job.screened_by_llm = by_llm
+    job.skipped_already_decided = skipped
+    job.processed_records = (
+        by_rules
+        + by_llm
+        + skipped
+        + stats.get("skipped_duplicates", 0)
+        + stats.get("skipped_not_eligible", 0)
+        + stats.get("skipped_without_full_text", 0)
+    )
+    job.updated_at = datetime.utcnow()
+    db.commit()
+
+
+def _finish(db: Session, job: ScreeningJob, status: JobStatus) -> None:
+    job.status = status
+    job.active_key = None
+    job.finished_at = datetime.utcnow()
+    job.updated_at = job.finished_at
+    db.commit()
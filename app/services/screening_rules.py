@@ -0,0 +1,226 @@
+from collections import Counter
+from typing import Any, Dict, Iterable, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.decision import DecisionStage
+from app.models.file import File
+from app.models.record import Record
+from app.services.current_decisions import decided_record_ids
+
+RULES_PROMPT_VERSION = "ta_rules_v2"
+
+
+class _KeywordMatcher:
+    """
+    Aho-Corasick automaton over lower-cased terms. One pass over a text finds
+    every term that occurs as whole words, whatever the number of terms.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self._goto: list[Dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[str]] = [[]]
+        for term in terms:
+            self._add(term)
+        self._build()
+
+    def _add(self, term: str) -> None:
+        node = 0
+        for ch in term:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(term)
+
+    def _build(self) -> None:
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> set[str]:
+        found: set[str] = set()
+        node = 0
+        n = len(text)
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for term in self._out[node]:
+                start = i - len(term) + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (
+                    i + 1 == n or not text[i + 1].isalnum()
+                ):
+                    found.add(term)
+        return found
+
+
+def _terms(values: Any) -> list[str]:
+    if not isinstance(values, list):
+        return []
+    return [str(v).strip().lower() for v in values if isinstance(v, str) and v.strip()]
+
+
+class RulePlan:
+    """
+    The locally enforceable part of a protocol_config, compiled once per run.
+
+    Keyword-type criteria (keyword_exclusions, population / intervention
+    exclude_keywords, study_design.exclude) share a single matcher, so each
+    record's title and abstract are scanned once.
+    """
+
+    def __init__(self, protocol_config: Dict[str, Any] | None):
+        cfg = protocol_config or {}
+
+        yw = cfg.get("year_window") or {}
+        self.year_min = yw.get("min") if yw.get("enabled") else None
+        self.year_max = yw.get("max") if yw.get("enabled") else None
+
+        lang = cfg.get("language") or {}
+        allowed = (lang.get("allow") or []) if lang.get("enabled") else []
+        self.languages_allowed = list(allowed)
+        self.languages_upper = {str(a).upper() for a in allowed}
+
+        # Only records with a sample_size can hit this; RIS imports leave it
+        # empty, so until sample sizes are filled in it excludes nothing.
+        ss = cfg.get("sample_size") or {}
+        self.sample_size_min = (
+            ss.get("min") if ss.get("enabled") and ss.get("required_for_exclusion") else None
+        )
+
+        # term -> criterion names it belongs to
+        self.keyword_rules: Dict[str, list[str]] = {}
+        kw = cfg.get("keyword_exclusions") or {}
+        if kw.get("enabled"):
+            self._add_terms("keyword_exclusions", kw.get("terms"))
+        self._add_terms("population.exclude_keywords", (cfg.get("population") or {}).get("exclude_keywords"))
+        self._add_terms(
+            "interventions.exclude_keywords", (cfg.get("interventions") or {}).get("exclude_keywords")
+        )
+        design = cfg.get("study_design") or {}
+        if design.get("enabled"):
+            self._add_terms("study_design.exclude", design.get("exclude"))
+
+        self.matcher = _KeywordMatcher(self.keyword_rules) if self.keyword_rules else None
+
+    def _add_terms(self, rule: str, values: Any) -> None:
+        for term in _terms(values):
+            rules = self.keyword_rules.setdefault(term, [])
+            if rule not in rules:
+                rules.append(rule)
+
+    def evaluate(self, record: Any) -> Tuple[str | None, list[str], list[str]]:
+        """
+        Returns (decision or None, reasons, criteria hit) for anything with
+        Record's title/abstract/year/language/sample_size attributes.
+        """
+        reasons: list[str] = []
+        hit: list[str] = []
+
+        year = record.year
+        if year is not None:
+            if self.year_min is not None and year < self.year_min:
+                reasons.append(f"Publication year {year} is below minimum {self.year_min} in protocol.")
+                hit.append("year_window")
+            if self.year_max is not None and year > self.year_max:
+                reasons.append(f"Publication year {year} is above maximum {self.year_max} in protocol.")
+                hit.append("year_window")
+
+        if self.languages_upper and record.language:
+            if record.language.upper() not in self.languages_upper:
+                reasons.append(
+                    f"Language {record.language} not in allowed languages {self.languages_allowed} in protocol."
+                )
+                hit.append("language")
+
+        if self.sample_size_min is not None and record.sample_size is not None:
+            if record.sample_size < self.sample_size_min:
+                reasons.append(
+                    f"Sample size {record.sample_size} is below minimum {self.sample_size_min} in protocol."
+                )
+                hit.append("sample_size")
+
+        if self.matcher is not None:
+            text = f"{record.title or ''}\n{record.abstract or ''}".lower()
+            by_rule: Dict[str, list[str]] = {}
+            for term in sorted(self.matcher.find(text)):
+                for rule in self.keyword_rules[term]:
+                    by_rule.setdefault(rule, []).append(term)
+            for rule, terms in by_rule.items():
+                quoted = ", ".join(f"'{t}'" for t in terms)
+                reasons.append(f"Title/abstract mentions {quoted}, excluded by protocol ({rule}).")
+                hit.append(rule)
+
+        return ("exclude" if reasons else None), reasons, list(dict.fromkeys(hit))
+
+
+def compile_rule_plan(protocol_config: Dict[str, Any] | None) -> RulePlan:
+    return RulePlan(protocol_config)
+
+
+def dry_run_rules(db: Session, project_id: str, protocol_config: Dict[str, Any] | None) -> Dict[str, Any]:
+    """
+    Evaluate the rule plan over every record of the project without writing
+    anything. Already-decided and duplicate records are counted separately,
+    as a screening run would skip them. A criterion listed under
+    `inactive_rules` is configured but cannot match any record, e.g.
+    sample_size when no record has a sample size.
+    """
+    plan = compile_rule_plan(protocol_config)
+    decided = decided_record_ids(db, project_id, DecisionStage.title_abstract)
+    rows = (
+        db.query(
+            Record.id,
+            Record.title,
+            Record.abstract,
+            Record.year,
+            Record.language,
+            Record.sample_size,
+            Record.canonical_id,
+        )
+        .join(File, Record.file_id == File.id)
+        .filter(File.project_id == project_id)
+        .yield_per(2000)
+    )
+
+    total = already_decided = duplicates = would_exclude = with_sample_size = 0
+    by_rule: Counter = Counter()
+    for row in rows:
+        total += 1
+        if row.sample_size is not None:
+            with_sample_size += 1
+        if row.id in decided:
+            already_decided += 1
+            continue
+        if row.canonical_id is not None:
+            duplicates += 1
+            continue
+        decision, _, hit = plan.evaluate(row)
+        if decision is not None:
+            would_exclude += 1
+            by_rule.update(hit)
+
+    return {
+        "project_id": project_id,
+        "total_records": total,
+        "already_decided": already_decided,
+        "duplicates": duplicates,
+        "would_exclude_by_rules": would_exclude,
+        "would_send_to_llm": total - already_decided - duplicates - would_exclude,
+        "by_rule": dict(by_rule),
+        "records_with_sample_size": with_sample_size,
+        "inactive_rules": ["sample_size"] if plan.sample_size_min is not None and not with_sample_size else [],
+    }
@@ -1,8 +1,10 @@
 import json
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, Callable
 
-import openai
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
@@ -10,9 +12,18 @@ from app.models.project import Project
 from app.models.record import Record
 from app.models.file import File
 from app.models.decision import Decision, DecisionStage, DecisionOutcome
-from app.models.audit import AuditEvent, ActorType
-
-openai.api_key = settings.OPENAI_API_KEY
+from app.models.audit import ActorType
+from app.services import llm_cache
+from app.services.audit_sink import audit_sink
+from app.services.audit_store import insert_audit_rows
+from app.services.llm_provider import get_provider
+from app.services.llm_scheduler import get_scheduler
+from app.services.current_decisions import upsert_current_decisions, decided_record_ids
+from app.services.screening_rules import compile_rule_plan, RULES_PROMPT_VERSION
+from app.services.token_budget import estimate_tokens, truncate_to_tokens
+
+LLM_MODEL = "gpt-4o"
+LLM_PROMPT_VERSION = "ta_llm_v2"
 
 SYSTEM_PROMPT = """
 You are a professional systematic reviewer (PRISMA 2020, Cochrane).
@@ -25,21 +36,16 @@ Conservative behavior:
 """
 
 
-USER_TEMPLATE = """
+PREFIX_TEMPLATE = """{system_prompt}
 Protocol configuration (JSON):
 
 {protocol_json}
+{instructions}"""
 
-Record metadata:
-Title: {title}
-Year: {year}
-Language: {language}
-
-Abstract:
-{abstract}
 
+SINGLE_INSTRUCTIONS = """
 Task:
-Decide whether this record should be INCLUDED, EXCLUDED, or marked UNCLEAR with respect to the protocol.
+The user message contains one record. Decide whether it should be INCLUDED, EXCLUDED, or marked UNCLEAR with respect to the protocol.
 
 Rules:
 - Use ONLY information from title and abstract.
@@ -47,6 +53,7 @@ Rules:
 - If critical information (population, intervention, outcome, design) is missing or ambiguous, mark UNCLEAR.
 - Always provide at least one verbatim quote from the title or abstract that supports your decision.
 - Quote location is either "Title" or "Abstract".
+- An abstract ending in "[...]" was truncated; do not assume anything about the missing part.
 
 Return ONLY valid JSON with this schema:
 
@@ -61,71 +68,128 @@ Return ONLY valid JSON with this schema:
 """
 
 
-def _apply_simple_guards(record: Record, protocol_config: Dict[str, Any]) -> Tuple[str | None, list[str]]:
-    reasons: list[str] = []
-    decision: str | None = None
-
-    # Year guard
-    yw = (protocol_config or {}).get("year_window") or {}
-    if yw.get("enabled") and record.year is not None:
-        min_y = yw.get("min")
-        max_y = yw.get("max")
-        if min_y is not None and record.year < min_y:
-            decision = "exclude"
-            reasons.append(f"Publication year {record.year} is below minimum {min_y} in protocol.")
-        if max_y is not None and record.year > max_y:
-            decision = "exclude"
-            reasons.append(f"Publication year {record.year} is above maximum {max_y} in protocol.")
-
-    # Language guard
-    lang_cfg = (protocol_config or {}).get("language") or {}
-    if lang_cfg.get("enabled") and record.language:
-        allowed = lang_cfg.get("allow") or []
-        if allowed:
-            allowed_upper = [a.upper() for a in allowed]
-            if record.language.upper() not in allowed_upper:
-                decision = "exclude"
-                reasons.append(
-                    f"Language {record.language} not in allowed languages {allowed} in protocol."
-                )
+BATCH_INSTRUCTIONS = """
+Task:
+The user message contains a JSON array of records; every record has an "id".
+For EACH record, decide whether it should be INCLUDED, EXCLUDED, or marked UNCLEAR with respect to the protocol.
+Judge every record independently of the others.
 
+Rules:
+- Use ONLY information from the record's own title and abstract.
+- If publication year or language clearly violate the protocol, you may EXCLUDE.
+- If critical information (population, intervention, outcome, design) is missing or ambiguous, mark UNCLEAR.
+- Always provide at least one verbatim quote from the record's title or abstract that supports your decision.
+- Quote location is either "Title" or "Abstract".
+- An abstract ending in "[...]" was truncated; do not assume anything about the missing part.
+
+Return ONLY a valid JSON array with exactly one object per record, using this schema:
+
+[
+  {
+    "record_id": string,
+    "decision": "include" | "exclude" | "unclear",
+    "reasons": [string],
+    "verbatim_quote": string,
+    "quote_location": "Title" | "Abstract",
+    "qc_flag": boolean,
+    "human_action_required": boolean
+  }
+]
+"""
+
+
+USER_TEMPLATE = """Record metadata:
+Title: {title}
+Year: {year}
+Language: {language}
+
+Abstract:
+{abstract}
+"""
+
+
+class PromptPrefix:
+    """
+    The static part of the screening prompts (system prompt, minified
+    protocol, task instructions), rendered once per run. It is sent as the
+    system message, ahead of anything record-specific, so the provider's
+    prompt-prefix caching applies from the second call on.
+    """
+
+    def __init__(self, protocol_config: Dict[str, Any] | None):
+        cfg = protocol_config or {}
+        # sort_keys keeps the prefix byte-identical for the same protocol.
+        protocol_json = json.dumps(cfg, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+        self.single = PREFIX_TEMPLATE.format(
+            system_prompt=SYSTEM_PROMPT, protocol_json=protocol_json, instructions=SINGLE_INSTRUCTIONS
+        )
+        self.batch = PREFIX_TEMPLATE.format(
+            system_prompt=SYSTEM_PROMPT, protocol_json=protocol_json, instructions=BATCH_INSTRUCTIONS
+        )
+        # Per call, compared with the pretty-printed protocol the prompts used to embed.
+        self.tokens_saved_per_call = max(
+            0, estimate_tokens(json.dumps(cfg, indent=2)) - estimate_tokens(protocol_json)
+        )
+
+
+def compile_prompt_prefix(protocol_config: Dict[str, Any] | None) -> PromptPrefix:
+    return PromptPrefix(protocol_config)
+
+
+def _apply_simple_guards(record: Record, protocol_config: Dict[str, Any]) -> Tuple[str | None, list[str]]:
+    # Single-record entry point; runs compile the plan once and call plan.evaluate directly.
+    decision, reasons, _ = compile_rule_plan(protocol_config).evaluate(record)
     return decision, reasons
 
 
-def _run_llm_for_record(project: Project, record: Record) -> Dict[str, Any]:
-    protocol_json = json.dumps(project.protocol_config or {}, indent=2)
-    user_prompt = USER_TEMPLATE.format(
-        protocol_json=protocol_json,
+def _abstract_for_prompt(record: Record) -> Tuple[str, int]:
+    """
+    The abstract as sent to the model and the estimated tokens cut from it
+    to stay within LLM_MAX_ABSTRACT_TOKENS.
+    """
+    return truncate_to_tokens(record.abstract, settings.LLM_MAX_ABSTRACT_TOKENS)
+
+
+def _build_user_prompt(record: Record) -> str:
+    abstract, _ = _abstract_for_prompt(record)
+    return USER_TEMPLATE.format(
         title=record.title or "",
         year=record.year or "",
         language=record.language or "",
-        abstract=record.abstract or "",
+        abstract=abstract,
+    )
+
+
+def _chat(system_prompt: str, user_prompt: str) -> Tuple[str, str]:
+    provider = get_provider()
+    resp = get_scheduler(provider.qualified_model(LLM_MODEL)).call(
+        lambda timeout: provider.complete(system_prompt, user_prompt, LLM_MODEL, timeout),
+        prompt_tokens=estimate_tokens(system_prompt) + estimate_tokens(user_prompt),
     )
+    return resp.content, resp.model
 
-    if not settings.OPENAI_API_KEY:
+
+def _call_llm(system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+    # Runs on screening worker threads: must not touch the DB session or ORM objects.
+    unavailable = get_provider().unavailable_reason()
+    if unavailable:
         return {
             "decision": "unclear",
-            "reasons": ["OPENAI_API_KEY is not configured; LLM not called."],
+            "reasons": [f"{unavailable}; LLM not called."],
             "verbatim_quote": "",
             "quote_location": "Abstract",
             "qc_flag": True,
             "human_action_required": True,
             "_model_name": "none",
+            "_fallback": True,
         }
 
-    resp = openai.ChatCompletion.create(
-        model="gpt-4o",
-        temperature=0.1,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": user_prompt},
-        ],
-    )
-
-    raw = resp.choices[0].message["content"]
+    raw, model_name = _chat(system_prompt, user_prompt)
     try:
         data = json.loads(raw)
     except json.JSONDecodeError:
+        data = None
+    if not isinstance(data, dict):
         data = {
             "decision": "unclear",
             "reasons": ["Model did not return valid JSON."],
@@ -133,50 +197,211 @@ def _run_llm_for_record(project: Project, record: Record) -> Dict[str, Any]:
             "quote_location": "Abstract",
             "qc_flag": True,
             "human_action_required": True,
+            "_fallback": True,
         }
-    data["_model_name"] = getattr(resp, "model", "gpt-4o")
+    data["_model_name"] = model_name
     return data
 
 
-def screen_record_title_abstract(db: Session, project: Project, record: Record) -> Decision:
-    proto_cfg = project.protocol_config or {}
-    guard_decision, guard_reasons = _apply_simple_guards(record, proto_cfg)
+def _build_batch_prompt(records: list[Record]) -> str:
+    return json.dumps(
+        [
+            {
+                "id": rec.id,
+                "title": rec.title or "",
+                "year": rec.year or "",
+                "language": rec.language or "",
+                "abstract": _abstract_for_prompt(rec)[0],
+            }
+            for rec in records
+        ],
+        ensure_ascii=False,
+    )
 
-    if guard_decision is not None:
-        dec = Decision(
-            record_id=record.id,
-            stage=DecisionStage.title_abstract,
-            decision=DecisionOutcome(guard_decision),
-            reasons=guard_reasons,
-            verbatim_quote=None,
-            quote_location=None,
-            qc_flag=False,
-            created_by="SYSTEM_RULES",
-            created_at=datetime.utcnow(),
-            model_name="rules_only",
-            prompt_version="ta_rules_v1",
+
+def _is_valid_batch_entry(entry: Any) -> bool:
+    if not isinstance(entry, dict):
+        return False
+    if entry.get("decision") not in ["include", "exclude", "unclear"]:
+        return False
+    reasons = entry.get("reasons")
+    if not isinstance(reasons, list) or not reasons:
+        return False
+    return isinstance(entry.get("verbatim_quote", ""), str)
+
+
+def _call_llm_batch(system_prompt: str, user_prompt: str, record_ids: list[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Screen several records with one call. Returns the valid entries keyed by
+    record id; anything missing, duplicated or malformed is left out so the
+    caller can retry those records one at a time.
+    """
+    if get_provider().unavailable_reason():
+        return {}
+
+    raw, model_name = _chat(system_prompt, user_prompt)
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        return {}
+    if isinstance(data, dict):
+        # Tolerate {"results": [...]}-style wrappers around the array.
+        data = next((v for v in data.values() if isinstance(v, list)), None)
+    if not isinstance(data, list):
+        return {}
+
+    wanted = set(record_ids)
+    seen: set[str] = set()
+    results: Dict[str, Dict[str, Any]] = {}
+    for entry in data:
+        rec_id = entry.get("record_id") if isinstance(entry, dict) else None
+        if rec_id not in wanted:
+            continue
+        if rec_id in seen:
+            results.pop(rec_id, None)
+            continue
+        seen.add(rec_id)
+        if _is_valid_batch_entry(entry):
+            entry = dict(entry)
+            entry["_model_name"] = model_name
+            entry["_batch_size"] = len(record_ids)
+            results[rec_id] = entry
+    return results
+
+
+def _screen_unit(system_prompt: str, user_prompt: str, record_ids: list[str]) -> Dict[str, Dict[str, Any]]:
+    if len(record_ids) == 1:
+        return {record_ids[0]: _call_llm(system_prompt, user_prompt)}
+    return _call_llm_batch(system_prompt, user_prompt, record_ids)
+
+
+class _DecisionWriter:
+    """
+    Buffers the rows screening produces (decisions, audit events,
+    current_decisions pointers) and writes them with one executemany per
+    table and a single commit every `batch_size` records. Ids are generated
+    here, so nothing is read back. A crash loses at most the unflushed batch,
+    whose records are still undecided and are screened again on resume.
+
+    `stats` counters passed to `add` are only bumped once the batch is
+    committed, so job progress never runs ahead of the database. Fresh
+    LLM answers are cached with the same commit, one entry per cache key
+    (two records with the same prompt can land in one batch). With
+    `async_audit`, audit rows are handed to the audit sink after the commit
+    instead of being inserted in the same transaction.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        batch_size: int,
+        stats: Dict[str, Any] | None = None,
+        async_audit: bool = False,
+    ):
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self.stats = stats
+        self.async_audit = async_audit
+        self._decisions: list[Dict[str, Any]] = []
+        self._audits: list[Dict[str, Any]] = []
+        self._current: list[Dict[str, Any]] = []
+        self._cache_entries: Dict[str, Dict[str, Any]] = {}
+        self._pending_stats: Dict[str, int] = {}
+
+    def add(self, decision: Dict[str, Any], audit: Dict[str, Any], stat: str | None = None) -> None:
+        self._decisions.append(decision)
+        self._audits.append(audit)
+        self._current.append(
+            {
+                "record_id": decision["record_id"],
+                "stage": decision["stage"],
+                "decision_id": decision["id"],
+                "updated_at": decision["created_at"],
+            }
         )
-        db.add(dec)
-        db.commit()
-        db.refresh(dec)
-
-        audit = AuditEvent(
-            decision_id=dec.id,
-            record_id=record.id,
-            project_id=project.id,
-            actor_type=ActorType.SYSTEM,
-            actor_id="SYSTEM_RULES",
-            action="RULES_TA_DECISION",
-            model_name="rules_only",
-            prompt_version="ta_rules_v1",
-            request_payload={"record_id": record.id},
-            response_payload={"decision": guard_decision, "reasons": guard_reasons},
+        if stat:
+            self._pending_stats[stat] = self._pending_stats.get(stat, 0) + 1
+        if len(self._decisions) >= self.batch_size:
+            self.flush()
+
+    def cache(self, key: str, prompt_version: str, response: Dict[str, Any]) -> None:
+        """Cache a fresh LLM answer with the next commit; a later answer for the same key wins."""
+        self._cache_entries[key] = llm_cache.cache_entry(
+            key, get_provider().qualified_model(LLM_MODEL), prompt_version, response
         )
-        db.add(audit)
-        db.commit()
-        return dec
 
-    data = _run_llm_for_record(project, record)
+    def flush(self) -> None:
+        if self._decisions:
+            self.db.execute(Decision.__table__.insert(), self._decisions)
+            upsert_current_decisions(self.db, self._current)
+            if not self.async_audit:
+                insert_audit_rows(self.db, self._audits)
+        llm_cache.put_cached(self.db, list(self._cache_entries.values()))
+        # Also commits cache hit counters updated on the session since the last batch.
+        self.db.commit()
+        if self.async_audit:
+            audit_sink.emit_many(self._audits)
+        if self.stats is not None:
+            for name, n in self._pending_stats.items():
+                self.stats[name] += n
+        self._decisions, self._audits, self._current = [], [], []
+        self._cache_entries = {}
+        self._pending_stats = {}
+
+
+def _persist_rules_decision(
+    writer: _DecisionWriter,
+    project_id: str,
+    record: Record,
+    guard_decision: str,
+    guard_reasons: list[str],
+    rules_hit: list[str] | None = None,
+) -> str:
+    now = datetime.utcnow()
+    decision_id = str(uuid.uuid4())
+    writer.add(
+        {
+            "id": decision_id,
+            "record_id": record.id,
+            "stage": DecisionStage.title_abstract,
+            "decision": DecisionOutcome(guard_decision),
+            "reasons": guard_reasons,
+            "verbatim_quote": None,
+            "quote_location": None,
+            "qc_flag": False,
+            "created_by": "SYSTEM_RULES",
+            "created_at": now,
+            "model_name": "rules_only",
+            "prompt_version": RULES_PROMPT_VERSION,
+        },
+        {
+            "id": str(uuid.uuid4()),
+            "decision_id": decision_id,
+            "record_id": record.id,
+            "project_id": project_id,
+            "actor_type": ActorType.SYSTEM,
+            "actor_id": "SYSTEM_RULES",
+            "action": "RULES_TA_DECISION",
+            "model_name": "rules_only",
+            "prompt_version": RULES_PROMPT_VERSION,
+            "request_payload": {"record_id": record.id},
+            "response_payload": {"decision": guard_decision, "reasons": guard_reasons, "rules": rules_hit or []},
+            "created_at": now,
+        },
+        stat="screened_by_rules",
+    )
+    return decision_id
+
+
+def _persist_llm_decision(
+    writer: _DecisionWriter,
+    project_id: str,
+    record: Record,
+    data: Dict[str, Any],
+    cache_key: str | None = None,
+    cache_hit: bool = False,
+    abstract_truncated: bool = False,
+) -> str:
     decision_value = data.get("decision", "unclear")
     if decision_value not in ["include", "exclude", "unclear"]:
         decision_value = "unclear"
@@ -187,89 +412,313 @@ def screen_record_title_abstract(db: Session, project: Project, record: Record)
 
     verbatim_quote = data.get("verbatim_quote") or ""
     quote_location = data.get("quote_location") or "Abstract"
-    qc_flag = bool(data.get("qc_flag", False))
-    model_name = data.get("_model_name", "gpt-4o")
-
-    dec = Decision(
-        record_id=record.id,
-        stage=DecisionStage.title_abstract,
-        decision=DecisionOutcome(decision_value),
-        reasons=reasons,
-        verbatim_quote=verbatim_quote,
-        quote_location=quote_location,
-        qc_flag=qc_flag,
-        created_by="AI",
-        created_at=datetime.utcnow(),
-        model_name=model_name,
-        prompt_version="ta_llm_v1",
+    # The model only saw part of the abstract, so a human should look at it.
+    qc_flag = bool(data.get("qc_flag", False)) or abstract_truncated
+    model_name = data.get("_model_name", LLM_MODEL)
+
+    if cache_key and not cache_hit and not data.get("_fallback"):
+        writer.cache(cache_key, LLM_PROMPT_VERSION, {k: v for k, v in data.items() if k != "_batch_size"})
+
+    request_payload: Dict[str, Any] = {"record_id": record.id}
+    if cache_hit:
+        request_payload.update({"cache_hit": True, "cache_key": cache_key})
+    else:
+        request_payload["batch_size"] = data.get("_batch_size", 1)
+    if abstract_truncated:
+        request_payload["abstract_truncated"] = True
+
+    now = datetime.utcnow()
+    decision_id = str(uuid.uuid4())
+    writer.add(
+        {
+            "id": decision_id,
+            "record_id": record.id,
+            "stage": DecisionStage.title_abstract,
+            "decision": DecisionOutcome(decision_value),
+            "reasons": reasons,
+            "verbatim_quote": verbatim_quote,
+            "quote_location": quote_location,
+            "qc_flag": qc_flag,
+            "created_by": "AI",
+            "created_at": now,
+            "model_name": model_name,
+            "prompt_version": LLM_PROMPT_VERSION,
+        },
+        {
+            "id": str(uuid.uuid4()),
+            "decision_id": decision_id,
+            "record_id": record.id,
+            "project_id": project_id,
+            "actor_type": ActorType.AI,
+            "actor_id": "AI_TA",
+            "action": "LLM_TA_DECISION_CACHED" if cache_hit else "LLM_TA_DECISION",
+            "model_name": model_name,
+            "prompt_version": LLM_PROMPT_VERSION,
+            "request_payload": request_payload,
+            "response_payload": data,
+            "created_at": now,
+        },
+        stat="screened_by_llm",
     )
-    db.add(dec)
-    db.commit()
-    db.refresh(dec)
-
-    audit = AuditEvent(
-        decision_id=dec.id,
-        record_id=record.id,
-        project_id=project.id,
-        actor_type=ActorType.AI,
-        actor_id="AI_TA",
-        action="LLM_TA_DECISION",
-        model_name=model_name,
-        prompt_version="ta_llm_v1",
-        request_payload={"record_id": record.id},
-        response_payload=data,
+    return decision_id
+
+
+def _lookup_cache(
+    db: Session, prefix: PromptPrefix, record: Record, use_cache: bool = True
+) -> Tuple[str | None, Dict[str, Any] | None]:
+    # The single-record prompt is the content address even when the record is
+    # later screened inside a batch.
+    if not (use_cache and settings.LLM_CACHE_ENABLED):
+        return None, None
+    key = llm_cache.cache_key(
+        prefix.single,
+        _build_user_prompt(record),
+        get_provider().qualified_model(LLM_MODEL),
+        LLM_PROMPT_VERSION,
     )
-    db.add(audit)
-    db.commit()
+    return key, llm_cache.get_cached(db, key)
 
-    return dec
 
+def screen_record_title_abstract(db: Session, project: Project, record: Record) -> Decision:
+    proto_cfg = project.protocol_config or {}
+    guard_decision, guard_reasons = _apply_simple_guards(record, proto_cfg)
+    writer = _DecisionWriter(db, batch_size=1, async_audit=True)
 
-def run_title_abstract_screening_for_project(db: Session, project_id: str) -> Dict[str, Any]:
+    if guard_decision is not None:
+        decision_id = _persist_rules_decision(writer, project.id, record, guard_decision, guard_reasons)
+        return db.get(Decision, decision_id)
+
+    prefix = compile_prompt_prefix(proto_cfg)
+    truncated = _abstract_for_prompt(record)[1] > 0
+    key, cached = _lookup_cache(db, prefix, record)
+    if cached is not None:
+        decision_id = _persist_llm_decision(
+            writer, project.id, record, cached, cache_key=key, cache_hit=True, abstract_truncated=truncated
+        )
+    else:
+        data = _call_llm(prefix.single, _build_user_prompt(record))
+        decision_id = _persist_llm_decision(
+            writer, project.id, record, data, cache_key=key, abstract_truncated=truncated
+        )
+    return db.get(Decision, decision_id)
+
+
+def _screen_with_llm_concurrently(
+    writer: _DecisionWriter,
+    project_id: str,
+    prefix: PromptPrefix,
+    records: list[Record],
+    max_concurrency: int,
+    batch_size: int,
+    cache_keys: Dict[str, str | None],
+    truncated_ids: set[str],
+    stats: Dict[str, Any],
+    report: Callable[[], None],
+    should_cancel: Callable[[], bool] | None = None,
+) -> bool:
+    """
+    Overlap the LLM round-trips on a bounded thread pool.
+
+    Records are sent `batch_size` at a time; any record a batch answer leaves
+    out or gets wrong is queued again on its own. Prompts are rendered and
+    results handed to `writer` on the calling thread, so the session is only ever used
+    by one thread; workers only talk to the provider. At most
+    `max_concurrency` calls are in flight at any time. Returns True if the run
+    was cancelled before every record was submitted.
+    """
+    first_error: Exception | None = None
+    cancelled = False
+    units: deque[list[Record]] = deque(
+        records[i : i + batch_size] for i in range(0, len(records), batch_size)
+    )
+    in_flight: Dict[Any, list[Record]] = {}
+
+    def submit_next(pool: ThreadPoolExecutor) -> bool:
+        nonlocal cancelled
+        if first_error is not None or cancelled or not units:
+            return False
+        if should_cancel is not None and should_cancel():
+            cancelled = True
+            return False
+        unit = units.popleft()
+        if len(unit) == 1:
+            system_prompt, prompt = prefix.single, _build_user_prompt(unit[0])
+        else:
+            system_prompt, prompt = prefix.batch, _build_batch_prompt(unit)
+        stats["prompt_tokens_estimated"] += estimate_tokens(system_prompt) + estimate_tokens(prompt)
+        stats["prompt_tokens_saved"] += prefix.tokens_saved_per_call
+        in_flight[pool.submit(_screen_unit, system_prompt, prompt, [rec.id for rec in unit])] = unit
+        return True
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="ta-screening") as pool:
+        while len(in_flight) < max_concurrency and submit_next(pool):
+            pass
+
+        while in_flight:
+            done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+            for fut in done:
+                unit = in_flight.pop(fut)
+                try:
+                    results = fut.result()
+                except Exception as e:
+                    # Stop feeding new work but keep the results of calls already in flight.
+                    if first_error is None:
+                        first_error = e
+                    continue
+                for rec in unit:
+                    data = results.get(rec.id)
+                    if data is None:
+                        units.appendleft([rec])
+                        stats["retried_individually"] += 1
+                        continue
+                    _persist_llm_decision(
+                        writer,
+                        project_id,
+                        rec,
+                        data,
+                        cache_key=cache_keys.get(rec.id),
+                        abstract_truncated=rec.id in truncated_ids,
+                    )
+                report()
+                while len(in_flight) < max_concurrency and submit_next(pool):
+                    pass
+
+    if first_error is not None:
+        raise first_error
+    return cancelled
+
+
+def run_title_abstract_screening_for_project(
+    db: Session,
+    project_id: str,
+    max_concurrency: int | None = None,
+    on_progress: Callable[[Dict[str, Any]], None] | None = None,
+    should_cancel: Callable[[], bool] | None = None,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
     project = db.get(Project, project_id)
     if not project:
         raise ValueError("Project not found")
 
+    max_concurrency = max(1, max_concurrency or settings.SCREENING_MAX_CONCURRENCY)
+    batch_size = max(1, project.screening_batch_size or settings.SCREENING_BATCH_SIZE)
+
+    # Stable order so an interrupted run resumes at the first undecided record.
     records = (
         db.query(Record)
         .join(File, Record.file_id == File.id)
         .filter(File.project_id == project_id)
+        .order_by(File.created_at, Record.order_index, Record.id)
         .all()
     )
-
-    total = 0
-    skipped_already_decided = 0
-    by_rules = 0
-    by_llm = 0
-
+    # Detached, so the per-batch commits don't expire them and reload each one.
     for rec in records:
-        total += 1
-        existing = (
-            db.query(Decision)
-            .filter(
-                Decision.record_id == rec.id,
-                Decision.stage == DecisionStage.title_abstract,
-            )
-            .order_by(Decision.created_at.desc())
-            .first()
-        )
-        if existing:
-            skipped_already_decided += 1
-            continue
+        db.expunge(rec)
+    protocol_config = project.protocol_config
+
+    stats: Dict[str, Any] = {
+        "total_records_seen": len(records),
+        "skipped_already_decided": 0,
+        "screened_by_rules": 0,
+        "screened_by_llm": 0,
+        "skipped_duplicates": 0,
+        "retried_individually": 0,
+        "cache_hits": 0,
+        "cache_misses": 0,
+        "abstracts_truncated": 0,
+        "prompt_tokens_estimated": 0,
+        "prompt_tokens_saved": 0,
+    }
 
-        before_count = db.query(Decision).count()
-        dec = screen_record_title_abstract(db, project, rec)
-        after_count = db.query(Decision).count()
+    def report() -> None:
+        if on_progress is not None:
+            on_progress(stats)
+
+    report()
+    writer = _DecisionWriter(db, settings.SCREENING_COMMIT_BATCH_SIZE, stats)
+    cancelled = False
+    llm_queue: list[Record] = []
+    cache_keys: Dict[str, str | None] = {}
+    truncated_ids: set[str] = set()
+    plan = compile_rule_plan(protocol_config)
+    prefix = compile_prompt_prefix(protocol_config)
+    rules_hit_counts: Dict[str, int] = {}
+    decided_ids = decided_record_ids(db, project_id, DecisionStage.title_abstract)
 
-        if after_count == before_count + 1 and dec.model_name == "rules_only":
-            by_rules += 1
-        else:
-            by_llm += 1
+    try:
+        for rec in records:
+            if should_cancel is not None and should_cancel():
+                cancelled = True
+                break
+
+            if rec.id in decided_ids:
+                stats["skipped_already_decided"] += 1
+                continue
+            if rec.canonical_id is not None:
+                # Duplicates inherit the screening of their canonical record.
+                stats["skipped_duplicates"] += 1
+                continue
+
+            guard_decision, guard_reasons, rules_hit = plan.evaluate(rec)
+            if guard_decision is not None:
+                _persist_rules_decision(writer, project_id, rec, guard_decision, guard_reasons, rules_hit)
+                for rule in rules_hit:
+                    rules_hit_counts[rule] = rules_hit_counts.get(rule, 0) + 1
+                report()
+                continue
+
+            tokens_cut = _abstract_for_prompt(rec)[1]
+            if tokens_cut:
+                truncated_ids.add(rec.id)
+                stats["abstracts_truncated"] += 1
+                stats["prompt_tokens_saved"] += tokens_cut
+
+            key, cached = _lookup_cache(db, prefix, rec, use_cache)
+            if cached is not None:
+                _persist_llm_decision(
+                    writer,
+                    project_id,
+                    rec,
+                    cached,
+                    cache_key=key,
+                    cache_hit=True,
+                    abstract_truncated=tokens_cut > 0,
+                )
+                stats["cache_hits"] += 1
+                report()
+                continue
+            if key is not None:
+                stats["cache_misses"] += 1
+            cache_keys[rec.id] = key
+            llm_queue.append(rec)
+
+        if not cancelled:
+            cancelled = _screen_with_llm_concurrently(
+                writer,
+                project_id,
+                prefix,
+                llm_queue,
+                max_concurrency,
+                batch_size,
+                cache_keys,
+                truncated_ids,
+                stats,
+                report,
+                should_cancel,
+            )
+    finally:
+        # Whatever was decided before a cancel or an error is kept.
+        writer.flush()
+    if use_cache and settings.LLM_CACHE_ENABLED:
+        llm_cache.evict(db)
+    report()
 
     return {
         "project_id": project_id,
-        "total_records_seen": total,
-        "skipped_already_decided": skipped_already_decided,
-        "screened_by_rules": by_rules,
-        "screened_by_llm": by_llm,
+        **stats,
+        "max_concurrency": max_concurrency,
+        "batch_size": batch_size,
+        "prompt_prefix_tokens": estimate_tokens(prefix.single),
+        "rules_hit": rules_hit_counts,
+        "cancelled": cancelled,
     }
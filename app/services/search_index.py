@@ -0,0 +1,154 @@
+import html
+from typing import Any, Dict
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# SQLite: an FTS5 table kept next to `records`, filled at import time.
+# Postgres: an expression GIN index on records, maintained by the database itself.
+SQLITE_FTS_TABLE = "records_fts"
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+# Private-use characters the database wraps matches in; record text is HTML-escaped
+# before they become <mark> tags, so snippets carry no markup from the records themselves.
+_MATCH_START = "\ue000"
+_MATCH_END = "\ue001"
+
+
+def _dialect(bind) -> str:
+    return bind.dialect.name
+
+
+def _pg_tsvector(alias: str = "") -> str:
+    # Must be the same expression in the index and in queries for the GIN index to be used.
+    p = f"{alias}." if alias else ""
+    return (
+        f"to_tsvector('english', coalesce({p}title, '') || ' ' || coalesce({p}abstract, '') || ' ' "
+        f"|| coalesce({p}authors, '') || ' ' || coalesce({p}journal, ''))"
+    )
+
+
+def ensure_search_index(engine: Engine) -> None:
+    with engine.begin() as conn:
+        if _dialect(conn) == "sqlite":
+            exists = conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": SQLITE_FTS_TABLE},
+            ).first()
+            if exists:
+                return
+            conn.execute(
+                text(
+                    f"CREATE VIRTUAL TABLE {SQLITE_FTS_TABLE} USING fts5("
+                    "record_id UNINDEXED, project_id UNINDEXED, title, abstract, authors, journal, "
+                    "tokenize = 'unicode61 remove_diacritics 2')"
+                )
+            )
+            # Backfill records imported before the index existed.
+            conn.execute(
+                text(
+                    f"INSERT INTO {SQLITE_FTS_TABLE} "
+                    "(record_id, project_id, title, abstract, authors, journal) "
+                    "SELECT r.id, f.project_id, r.title, r.abstract, r.authors, r.journal "
+                    "FROM records r JOIN files f ON r.file_id = f.id"
+                )
+            )
+        elif _dialect(conn) == "postgresql":
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_records_fulltext ON records USING GIN "
+                    f"(({_pg_tsvector()}))"
+                )
+            )
+
+
+def index_records_for_file(db: Session, file_id: str) -> None:
+    """
+    Add a file's records to the search index inside the caller's transaction.
+    """
+    if _dialect(db.get_bind()) != "sqlite":
+        return
+    db.execute(
+        text(
+            f"INSERT INTO {SQLITE_FTS_TABLE} "
+            "(record_id, project_id, title, abstract, authors, journal) "
+            "SELECT r.id, f.project_id, r.title, r.abstract, r.authors, r.journal "
+            "FROM records r JOIN files f ON r.file_id = f.id "
+            "WHERE r.file_id = :file_id"
+        ),
+        {"file_id": file_id},
+    )
+
+
+def _fts5_query(q: str) -> str:
+    # Quote every term so user input can't hit FTS5 syntax errors; terms are ANDed.
+    terms = [t.replace('"', '""') for t in q.split() if t.strip('"')]
+    return " ".join(f'"{t}"' for t in terms)
+
+
+def _safe_snippet(snippet: str | None) -> str | None:
+    """HTML-escape a snippet, then turn the match markers into <mark> tags."""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(_MATCH_START, HIGHLIGHT_START).replace(_MATCH_END, HIGHLIGHT_END)
+
+
+def search_records(db: Session, project_id: str, q: str, limit: int, offset: int) -> list[Dict[str, Any]]:
+    """
+    Ranked matches for `q` in the project's records (best first), with
+    highlighted title/abstract snippets. Returns up to `limit` rows.
+    """
+    if _dialect(db.get_bind()) == "postgresql":
+        rows = db.execute(
+            text(
+                f"SELECT r.id, r.title, r.year, "
+                f"ts_rank_cd({_pg_tsvector('r')}, query) AS rank, "
+                "ts_headline('english', coalesce(r.title, ''), query, "
+                "'StartSel=' || :hs || ', StopSel=' || :he || ', HighlightAll=true') AS title_snippet, "
+                "ts_headline('english', coalesce(r.abstract, ''), query, "
+                "'StartSel=' || :hs || ', StopSel=' || :he || ', MaxWords=30, MinWords=10') AS abstract_snippet "
+                "FROM records r JOIN files f ON r.file_id = f.id, "
+                "websearch_to_tsquery('english', :q) AS query "
+                f"WHERE f.project_id = :pid AND {_pg_tsvector('r')} @@ query "
+                "ORDER BY rank DESC, r.id LIMIT :limit OFFSET :offset"
+            ),
+            {"q": q, "pid": project_id, "hs": _MATCH_START, "he": _MATCH_END, "limit": limit, "offset": offset},
+        ).fetchall()
+    else:
+        match = _fts5_query(q)
+        if not match:
+            return []
+        # bm25 weights follow column order: record_id, project_id, title, abstract, authors, journal.
+        rows = db.execute(
+            text(
+                f"SELECT s.record_id AS id, r.title, r.year, "
+                f"-bm25({SQLITE_FTS_TABLE}, 0, 0, 10.0, 4.0, 2.0, 1.0) AS rank, "
+                f"highlight({SQLITE_FTS_TABLE}, 2, :hs, :he) AS title_snippet, "
+                f"snippet({SQLITE_FTS_TABLE}, 3, :hs, :he, '…', 24) AS abstract_snippet "
+                f"FROM {SQLITE_FTS_TABLE} s JOIN records r ON r.id = s.record_id "
+                f"WHERE {SQLITE_FTS_TABLE} MATCH :match AND s.project_id = :pid "
+                "ORDER BY rank DESC, s.record_id LIMIT :limit OFFSET :offset"
+            ),
+            {
+                "match": match,
+                "pid": project_id,
+                "hs": _MATCH_START,
+                "he": _MATCH_END,
+                "limit": limit,
+                "offset": offset,
+            },
+        ).fetchall()
+
+    return [
+        {
+            "id": row.id,
+            "title": row.title,
+            "year": row.year,
+            "rank": float(row.rank or 0.0),
+            "title_snippet": _safe_snippet(row.title_snippet),
+            "abstract_snippet": _safe_snippet(row.abstract_snippet),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,32 @@
+import math
+from typing import Tuple
+
+# Rough average for English prose with GPT-style tokenizers. Good enough to
+# budget prompts before a call; the provider's usage numbers stay authoritative.
+CHARS_PER_TOKEN = 4
+
+TRUNCATION_MARKER = " [...]"
+
+
+def estimate_tokens(text: str | None) -> int:
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str | None, max_tokens: int) -> Tuple[str, int]:
+    """
+    Cut `text` down to roughly `max_tokens` tokens, at a word boundary when
+    possible. Returns (text, estimated tokens removed); a `max_tokens` of 0
+    or less disables truncation.
+    """
+    text = text or ""
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text, 0
+
+    limit = max_tokens * CHARS_PER_TOKEN
+    cut = text.rfind(" ", 0, limit)
+    if cut < limit // 2:
+        cut = limit
+    kept = text[:cut].rstrip() + TRUNCATION_MARKER
+    return kept, estimate_tokens(text) - estimate_tokens(kept)
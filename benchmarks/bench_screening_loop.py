@@ -0,0 +1,120 @@
+"""
+Screening-loop overhead vs. size of the decisions table.
+
+Seeds an unrelated project with an increasing number of decisions, then
+times a title/abstract run over a fixed-size project with the LLM answered
+by the offline fake provider, so what is measured is the loop's own DB
+work. Per-record cost should stay flat as the background table grows.
+
+    python -m benchmarks.bench_screening_loop --records 500 --background 0 100000 500000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+
+def _setup_env() -> str:
+    tmp = tempfile.mkdtemp(prefix="te-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    # Offline, zero-latency answers and no client-side rate limits: only the loop is measured.
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["LLM_REQUESTS_PER_MINUTE"] = "0"
+    os.environ["LLM_TOKENS_PER_MINUTE"] = "0"
+    return tmp
+
+
+def _seed_project(db, n_records: int, protocol_config: dict):
+    from app.models.project import Project
+    from app.models.file import File, FileType
+    from app.models.record import Record
+
+    project = Project(name="bench", protocol_config=protocol_config)
+    db.add(project)
+    db.flush()
+    file_row = File(project_id=project.id, name="bench.ris", type=FileType.ris, path="bench.ris")
+    db.add(file_row)
+    db.flush()
+    db.execute(
+        Record.__table__.insert(),
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "file_id": file_row.id,
+                "order_index": i,
+                "title": f"Record {i}",
+                "abstract": "Randomised trial of an intervention in adults.",
+                "year": 2015,
+                "language": "eng",
+            }
+            for i in range(n_records)
+        ],
+    )
+    db.commit()
+    return project, file_row.id
+
+
+def _grow_background(db, target: int, current: int) -> int:
+    from app.models.decision import Decision, DecisionStage, DecisionOutcome
+    from app.models.record import Record
+
+    missing = target - current
+    if missing <= 0:
+        return current
+    _, file_id = _seed_project(db, missing, {})
+    record_ids = [rid for (rid,) in db.query(Record.id).filter(Record.file_id == file_id).all()]
+    chunk = 20000
+    now = datetime.utcnow()
+    for i in range(0, len(record_ids), chunk):
+        db.execute(
+            Decision.__table__.insert(),
+            [
+                {
+                    "id": str(uuid.uuid4()),
+                    "record_id": rid,
+                    "stage": DecisionStage.title_abstract.name,
+                    "decision": DecisionOutcome.include.name,
+                    "reasons": ["background"],
+                    "qc_flag": False,
+                    "created_at": now,
+                    "created_by": "bench",
+                }
+                for rid in record_ids[i : i + chunk]
+            ],
+        )
+    db.commit()
+    return target
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=500)
+    parser.add_argument("--background", type=int, nargs="+", default=[0, 50000, 200000])
+    args = parser.parse_args(argv)
+
+    _setup_env()
+    from app.core.database import Base, engine, SessionLocal
+    import app.models  # noqa: F401  (register tables)
+    from app.services import screening_ta
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    background = 0
+    print(f"{'background_decisions':>22} {'records':>8} {'seconds':>9} {'ms/record':>10}")
+    for target in sorted(args.background):
+        background = _grow_background(db, target, background)
+        project, _ = _seed_project(db, args.records, {"year_window": {"enabled": False}})
+        start = time.perf_counter()
+        screening_ta.run_title_abstract_screening_for_project(db, project.id, max_concurrency=4)
+        elapsed = time.perf_counter() - start
+        print(f"{background:>22} {args.records:>8} {elapsed:>9.3f} {1000 * elapsed / args.records:>10.3f}")
+    db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+"""
+End-to-end benchmark suite over synthetic corpora.
+
+For each corpus size, in a fresh process and database: import a synthetic
+RIS file, then time record listing, record detail, RIS export and decision
+override against it, and a title/abstract screening run answered by the
+offline fake LLM provider. Reports p50/p95 latency, SQL statements per call
+and peak RSS, and writes everything to a JSON file so runs can be compared.
+
+    python -m benchmarks.bench_suite --sizes 1000 10000 100000
+    python -m benchmarks.bench_suite --sizes 1000 --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from queue import Empty
+from typing import Any, Callable, Dict
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class _QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args) -> None:
+        self.count += 1
+
+
+def _measure(name: str, fn: Callable[[int], Any], iterations: int, counter: _QueryCounter) -> Dict[str, Any]:
+    timings: list[float] = []
+    queries_before = counter.count
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    timings.sort()
+    result = {
+        "iterations": iterations,
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p95_ms": round(_percentile(timings, 95), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "max_ms": round(timings[-1], 3),
+        "queries_per_call": round((counter.count - queries_before) / iterations, 2),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    print(f"  {name:<26} p50 {result['p50_ms']:>10.3f} ms  p95 {result['p95_ms']:>10.3f} ms  "
+          f"{result['queries_per_call']:>8} q/call  rss {result['peak_rss_mb']} MB", flush=True)
+    return result
+
+
+def _seed_decisions(db, project_id: str, fraction: float, seed: int) -> None:
+    """Give a share of the records an AI decision so listing and export exercise the join."""
+    from app.models.decision import Decision, DecisionStage, DecisionOutcome
+    from app.models.file import File
+    from app.models.record import Record
+    from app.services.current_decisions import rebuild_current_decisions
+
+    rng = random.Random(seed)
+    ids = [
+        rid
+        for (rid,) in db.query(Record.id).join(File, Record.file_id == File.id).filter(File.project_id == project_id)
+        if rng.random() < fraction
+    ]
+    outcomes = [DecisionOutcome.include.name, DecisionOutcome.exclude.name, DecisionOutcome.unclear.name]
+    now = datetime.utcnow()
+    for i in range(0, len(ids), 20000):
+        db.execute(
+            Decision.__table__.insert(),
+            [
+                {
+                    "id": str(uuid.uuid4()),
+                    "record_id": rid,
+                    "stage": DecisionStage.title_abstract.name,
+                    "decision": rng.choice(outcomes),
+                    "reasons": ["bench"],
+                    "qc_flag": False,
+                    "created_at": now,
+                    "created_by": "AI",
+                    "model_name": "bench",
+                }
+                for rid in ids[i : i + 20000]
+            ],
+        )
+    db.commit()
+    rebuild_current_decisions(db, project_id)
+
+
+def _new_project(db, name: str, protocol_config: dict, ris_path: str):
+    from app.models.file import File, FileType
+    from app.models.project import Project
+
+    project = Project(name=name, protocol_config=protocol_config)
+    db.add(project)
+    db.commit()
+    file_row = File(project_id=project.id, name=os.path.basename(ris_path), type=FileType.ris, path=ris_path)
+    db.add(file_row)
+    db.commit()
+    return project, file_row
+
+
+def _run_size(n: int, args: argparse.Namespace) -> Dict[str, Any]:
+    # Runs in its own process: settings are read from the environment at import time.
+    workdir = tempfile.mkdtemp(prefix="te-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["UPLOAD_DIR"] = os.path.join(workdir, "uploads")
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["LLM_FAKE_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["LLM_REQUESTS_PER_MINUTE"] = "0"
+    os.environ["LLM_TOKENS_PER_MINUTE"] = "0"
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+
+    try:
+        from benchmarks.synthetic import write_synthetic_ris
+        from app.core.database import Base, SessionLocal, engine
+        import app.models  # noqa: F401  (register tables)
+        from app.api.routes_decisions import DecisionOverrideRequest, override_decision
+        from app.api.routes_export import export_ris_with_decisions
+        from app.api.routes_records import get_record_detail, list_records
+        from app.models.decision import DecisionOutcome
+        from app.models.file import File
+        from app.models.record import Record
+        from app.services.ris_importer import import_ris_for_file
+        from app.services.screening_ta import run_title_abstract_screening_for_project
+        from app.services.search_index import ensure_search_index
+
+        Base.metadata.create_all(bind=engine)
+        ensure_search_index(engine)
+        counter = _QueryCounter(engine)
+        db = SessionLocal()
+        rng = random.Random(args.seed)
+        print(f"{n} records", flush=True)
+
+        ris_path = os.path.join(workdir, f"corpus_{n}.ris")
+        write_synthetic_ris(ris_path, n, seed=args.seed)
+        protocol = {"year_window": {"enabled": True, "min": 1995, "max": None}}
+        project, file_row = _new_project(db, f"bench-{n}", protocol, ris_path)
+
+        ops: Dict[str, Any] = {}
+        import_stats: Dict[str, Any] = {}
+
+        def do_import(_: int) -> None:
+            import_stats.update(import_ris_for_file(db, file_row))
+
+        ops["import_ris_for_file"] = _measure("import_ris_for_file", do_import, 1, counter)
+        ops["import_ris_for_file"]["records_per_second"] = import_stats.get("records_per_second")
+
+        _seed_decisions(db, project.id, 0.8, args.seed)
+        record_ids = [
+            rid for (rid,) in db.query(Record.id).join(File, Record.file_id == File.id).filter(File.project_id == project.id)
+        ]
+
+        page = {"cursor": None}
+
+        def do_list(_: int) -> None:
+            result = list_records(
+                project_id=project.id, stage="title_abstract", cursor=page["cursor"], limit=100,
+                decision=None, qc_flag=None, year_min=None, year_max=None, undecided_only=False,
+                decided_by=None, db=db,
+            )
+            page["cursor"] = result.next_cursor
+
+        ops["list_records"] = _measure("list_records", do_list, args.iterations, counter)
+
+        def do_list_filtered(_: int) -> None:
+            list_records(
+                project_id=project.id, stage="title_abstract", cursor=None, limit=100,
+                decision=DecisionOutcome.include, qc_flag=None, year_min=2010, year_max=None,
+                undecided_only=False, decided_by="ai", db=db,
+            )
+
+        ops["list_records_filtered"] = _measure("list_records_filtered", do_list_filtered, args.iterations, counter)
+
+        ops["get_record_detail"] = _measure(
+            "get_record_detail",
+            lambda _: get_record_detail(record_id=rng.choice(record_ids), db=db),
+            args.iterations,
+            counter,
+        )
+
+        ops["override_decision"] = _measure(
+            "override_decision",
+            lambda _: override_decision(
+                DecisionOverrideRequest(
+                    record_id=rng.choice(record_ids),
+                    decision=DecisionOutcome.include,
+                    reasons=["bench override"],
+                    created_by="bench",
+                ),
+                db=db,
+            ),
+            args.iterations,
+            counter,
+        )
+
+        async def drain(response) -> int:
+            size = 0
+            async for chunk in response.body_iterator:
+                size += len(chunk)
+            return size
+
+        export_bytes = {"n": 0}
+
+        def do_export(_: int) -> None:
+            response = export_ris_with_decisions(project_id=project.id, stage="title_abstract", db=db)
+            export_bytes["n"] = asyncio.run(drain(response))
+
+        ops["export_ris_with_decisions"] = _measure(
+            "export_ris_with_decisions", do_export, args.export_iterations, counter
+        )
+        ops["export_ris_with_decisions"]["bytes"] = export_bytes["n"]
+
+        # Screening gets its own project, capped in size: it writes every decision.
+        screen_n = min(n, args.screening_max_records)
+        screen_path = os.path.join(workdir, f"screen_{screen_n}.ris")
+        write_synthetic_ris(screen_path, screen_n, seed=args.seed + 1)
+        screen_project, screen_file = _new_project(db, f"bench-screen-{screen_n}", protocol, screen_path)
+        import_ris_for_file(db, screen_file)
+        summary: Dict[str, Any] = {}
+
+        def do_screening(_: int) -> None:
+            summary.update(
+                run_title_abstract_screening_for_project(
+                    db, screen_project.id, max_concurrency=args.max_concurrency, use_cache=False
+                )
+            )
+
+        ops["screening_loop"] = _measure("screening_loop", do_screening, 1, counter)
+        ops["screening_loop"].update(
+            {
+                "records": screen_n,
+                "screened_by_llm": summary.get("screened_by_llm"),
+                "screened_by_rules": summary.get("screened_by_rules"),
+                "records_per_second": round(screen_n / (ops["screening_loop"]["mean_ms"] / 1000.0), 1),
+            }
+        )
+        db.close()
+        return {"records": n, "peak_rss_mb": _peak_rss_mb(), "operations": ops}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _worker(n: int, args: argparse.Namespace, queue) -> None:
+    queue.put(_run_size(n, args))
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(current: Dict[str, Any], baseline_path: str) -> None:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    before = {(r["records"], op): v for r in baseline["results"] for op, v in r.get("operations", {}).items()}
+    print(f"\nvs {baseline_path} ({baseline['meta'].get('git_commit')}):")
+    for r in current["results"]:
+        for op, v in r.get("operations", {}).items():
+            old = before.get((r["records"], op))
+            if not old or not old["p50_ms"]:
+                continue
+            print(f"  {r['records']:>7} {op:<26} p50 x{v['p50_ms'] / old['p50_ms']:.2f}  "
+                  f"p95 x{v['p95_ms'] / max(old['p95_ms'], 1e-9):.2f}  "
+                  f"q/call {old['queries_per_call']} -> {v['queries_per_call']}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--iterations", type=int, default=50, help="calls per latency measurement")
+    parser.add_argument("--export-iterations", type=int, default=3)
+    parser.add_argument("--screening-max-records", type=int, default=2000)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="fake provider latency per call")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier JSON result to compare against")
+    args = parser.parse_args(argv)
+
+    started = datetime.now(timezone.utc)
+    results = []
+    failed = []
+    ctx = multiprocessing.get_context("spawn")
+    for n in args.sizes:
+        # One process per size, so peak RSS belongs to that size alone.
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_worker, args=(n, args, queue))
+        proc.start()
+        result = None
+        while result is None:
+            try:
+                result = queue.get(timeout=1.0)
+            except Empty:
+                # A child that died (exception, OOM kill) never puts a result;
+                # one that just finished may have put it since the get timed out.
+                if not proc.is_alive():
+                    try:
+                        result = queue.get(timeout=1.0)
+                    except Empty:
+                        pass
+                    break
+        proc.join()
+        if result is None:
+            print(f"\n{n} records: benchmark process exited with code {proc.exitcode}", file=sys.stderr)
+            failed.append(n)
+            result = {"records": n, "error": f"exit code {proc.exitcode}"}
+        results.append(result)
+
+    report = {
+        "meta": {
+            "started_at": started.isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": "sqlite",
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, started.strftime("%Y%m%dT%H%M%SZ") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {output}")
+
+    if args.compare:
+        _compare(report, args.compare)
+    if failed:
+        print(f"failed sizes: {', '.join(map(str, failed))}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import os
+import tempfile
+
+# Settings are read at import time: point the app at a scratch database and the offline provider.
+_workdir = tempfile.mkdtemp(prefix="te-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/test.db"
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["AUDIT_ASYNC_ENABLED"] = "false"
+
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.models.current_decision import CurrentDecision  # noqa: E402
+from app.models.decision import DecisionStage  # noqa: E402
+from app.models.file import File, FileType  # noqa: E402
+from app.models.llm_cache import LLMCacheEntry  # noqa: E402
+from app.models.project import Project  # noqa: E402
+from app.models.record import Record  # noqa: E402
+from app.services.screening_ta import run_title_abstract_screening_for_project  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+
+def test_identical_prompts_in_one_batch_share_one_cache_entry():
+    db = SessionLocal()
+    try:
+        project = Project(name="cache", protocol_config={})
+        db.add(project)
+        db.commit()
+        file = File(project_id=project.id, name="a.ris", type=FileType.ris, path="a.ris")
+        db.add(file)
+        db.commit()
+        # Same title and year, no abstract: the same prompt, so the same cache key.
+        db.add_all(
+            [
+                Record(file_id=file.id, order_index=0, title="Editorial", year=2020, authors="Smith, J"),
+                Record(file_id=file.id, order_index=1, title="Editorial", year=2020, authors="Jones, K"),
+                Record(file_id=file.id, order_index=2, title="Metformin in type 2 diabetes", year=2020),
+            ]
+        )
+        db.commit()
+
+        summary = run_title_abstract_screening_for_project(db, project.id)
+
+        assert summary["screened_by_llm"] == 3
+        decided = (
+            db.query(CurrentDecision)
+            .join(Record, CurrentDecision.record_id == Record.id)
+            .filter(Record.file_id == file.id, CurrentDecision.stage == DecisionStage.title_abstract)
+            .count()
+        )
+        assert decided == 3
+        assert db.query(LLMCacheEntry).count() == 2
+    finally:
+        db.close()